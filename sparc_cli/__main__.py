@@ -4,11 +4,18 @@ import uuid
 from rich.panel import Panel
 from rich.console import Console
 from sparc_cli.console.formatting import print_interrupt
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 from sparc_cli.env import validate_environment
-from sparc_cli.tools.memory import _global_memory, get_related_files, get_memory_value
+from sparc_cli.tools.memory import (
+    _global_memory, get_related_files, get_memory_value, set_memory_limits, MEMORY_LIMITS,
+    attach_session_store, persist_memory, set_work_log_sink
+)
+from sparc_cli.session_store import SessionStore
+from sparc_cli.config import DEFAULT_PROMPT_TOKEN_BUDGET, DEFAULT_HISTORY_TOKEN_LIMIT, DEFAULT_COMMAND_TIMEOUT
+from sparc_cli.rate_limit import configure_rate_limits
+from sparc_cli.checkpoint import configure_checkpointer, get_checkpointer
 from sparc_cli.tools.human import ask_human
+from sparc_cli.tools.ripgrep import get_rg_command
 from sparc_cli.console.formatting import print_stage_header, print_error
 from sparc_cli.agent_utils import (
     run_agent_with_retry,
@@ -87,6 +94,92 @@ Examples:
         action='store_true',
         help='Enable chat mode with direct human interaction (implies --hil)'
     )
+    parser.add_argument(
+        '--install-ripgrep',
+        action='store_true',
+        help='Install ripgrep with the system package manager if it is not found (may use sudo)'
+    )
+    parser.add_argument(
+        '--session',
+        type=str,
+        metavar='PATH',
+        help='Save agent memory (facts, snippets, tasks, work log) to this session database as it changes'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Resume from the memory saved in the --session database instead of starting over'
+    )
+    parser.add_argument(
+        '--checkpoint-db',
+        type=str,
+        metavar='PATH',
+        help='Save agent conversation history to this SQLite database instead of keeping it in memory'
+    )
+    parser.add_argument(
+        '--memory-limit',
+        action='append',
+        default=[],
+        metavar='TYPE=N',
+        help='Override the maximum number of items kept for a memory type, e.g. key_facts=100 (repeatable)'
+    )
+    parser.add_argument(
+        '--work-log',
+        type=str,
+        metavar='FILE',
+        help='Append work log events to this file as JSON lines while the agents run'
+    )
+    parser.add_argument(
+        '--prompt-token-budget',
+        type=int,
+        default=DEFAULT_PROMPT_TOKEN_BUDGET,
+        metavar='N',
+        help=f'Estimated token budget for agent prompts; lower priority memory is left out to fit (default: {DEFAULT_PROMPT_TOKEN_BUDGET})'
+    )
+    parser.add_argument(
+        '--history-token-limit',
+        type=int,
+        default=DEFAULT_HISTORY_TOKEN_LIMIT,
+        metavar='N',
+        help=f'Compact conversation history resent to the model beyond N estimated tokens, 0 to never compact (default: {DEFAULT_HISTORY_TOKEN_LIMIT})'
+    )
+    parser.add_argument(
+        '--command-timeout',
+        type=int,
+        default=DEFAULT_COMMAND_TIMEOUT,
+        metavar='SECONDS',
+        help=f'Kill shell commands still running after this many seconds, 0 for no limit (default: {DEFAULT_COMMAND_TIMEOUT})'
+    )
+    parser.add_argument(
+        '--shell-session',
+        action='store_true',
+        help='Run the shell commands of each agent in one long-lived shell, keeping the working directory and environment between commands'
+    )
+    parser.add_argument(
+        '--parallel-tasks',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Let the planner implement up to N independent tasks concurrently (default: 1, one at a time)'
+    )
+    parser.add_argument(
+        '--requests-per-minute',
+        type=int,
+        metavar='N',
+        help='Limit LLM requests per minute for each provider API key'
+    )
+    parser.add_argument(
+        '--tokens-per-minute',
+        type=int,
+        metavar='N',
+        help='Limit LLM tokens per minute for each provider API key'
+    )
+    parser.add_argument(
+        '--rate-limit-db',
+        type=str,
+        metavar='PATH',
+        help='Share the rate limits with other sparc processes through this SQLite database'
+    )
     
     args = parser.parse_args()
     
@@ -105,16 +198,43 @@ Examples:
     if args.expert_provider != 'openai' and not args.expert_model:
         parser.error(f"--expert-model is required when using expert provider '{args.expert_provider}'")
     
+    if args.resume and not args.session:
+        parser.error("--resume requires --session")
+
+    if args.prompt_token_budget < 1:
+        parser.error("--prompt-token-budget must be at least 1")
+
+    if args.history_token_limit < 0:
+        parser.error("--history-token-limit must not be negative")
+
+    if args.command_timeout < 0:
+        parser.error("--command-timeout must not be negative")
+
+    if args.parallel_tasks < 1:
+        parser.error("--parallel-tasks must be at least 1")
+
+    for option in ('requests_per_minute', 'tokens_per_minute'):
+        value = getattr(args, option)
+        if value is not None and value < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+
+    if args.rate_limit_db and not (args.requests_per_minute or args.tokens_per_minute):
+        parser.error("--rate-limit-db requires --requests-per-minute or --tokens-per-minute")
+    
+    # Parse memory limit overrides
+    memory_limits = {}
+    for item in args.memory_limit:
+        memory_type, _, limit = item.partition('=')
+        if memory_type not in MEMORY_LIMITS or not limit.isdigit() or int(limit) < 1:
+            parser.error(f"Invalid --memory-limit '{item}', expected TYPE=N with TYPE one of: {', '.join(MEMORY_LIMITS)}")
+        memory_limits[memory_type] = int(limit)
+    args.memory_limit = memory_limits
+    
     return args
 
 # Create console instance
 console = Console()
 
-# Create individual memory objects for each agent
-research_memory = MemorySaver()
-planning_memory = MemorySaver()
-implementation_memory = MemorySaver()
-
 
 def is_informational_query() -> bool:
     """Determine if the current query is informational based on implementation_requested state."""
@@ -126,6 +246,26 @@ def is_stage_requested(stage: str) -> bool:
         return _global_memory.get('implementation_requested', False)
     return False
 
+def get_thread_id(key: str, resumed: bool) -> str:
+    """Get the agent thread ID stored under key, reusing the saved one when resuming.
+
+    With a checkpoint database this lets a resumed session continue the
+    conversation history of the previous run.
+    """
+    if not (resumed and _global_memory.get(key)):
+        _global_memory[key] = str(uuid.uuid4())
+        persist_memory(key)
+    return _global_memory[key]
+
+def stage_config(config: dict, stage: str) -> dict:
+    """Get a copy of the run config with a thread of its own for a stage.
+
+    Stages may save to the same checkpoint database, so they must not share
+    the conversation thread of the run.
+    """
+    thread_id = f"{config['configurable']['thread_id']}:{stage}"
+    return {**config, "configurable": {**config["configurable"], "thread_id": thread_id}}
+
 def main():
     """Main entry point for the sparc command line tool."""
     try:
@@ -141,9 +281,47 @@ def main():
                 style="yellow"
             ))
         
+        # Look up ripgrep once, so searches do not have to
+        try:
+            get_rg_command(install=args.install_ripgrep)
+        except RuntimeError as e:
+            console.print(Panel(str(e), title="Code Search Disabled", style="yellow"))
+
+        # Rate limits apply to every client created from here on
+        if args.requests_per_minute or args.tokens_per_minute:
+            configure_rate_limits(
+                requests_per_minute=args.requests_per_minute,
+                tokens_per_minute=args.tokens_per_minute,
+                db_path=args.rate_limit_db
+            )
+
         # Create the base model after validation
         model = initialize_llm(args.provider, args.model)
 
+        # Keep agent conversation history in memory or in the checkpoint database
+        configure_checkpointer(args.checkpoint_db)
+
+        # Mirror memory to the session database, restoring it when resuming
+        resumed = False
+        if args.session:
+            resumed = attach_session_store(SessionStore(args.session), resume=args.resume)
+            if resumed:
+                console.print(Panel(
+                    f"Restored memory from session [bold]{args.session}[/bold]",
+                    title="Session Resumed",
+                    style="green"
+                ))
+                # Continue the saved task if no new one was given
+                if not args.message and _global_memory.get('base_task'):
+                    args.message = _global_memory['base_task']
+
+        # Apply per-run memory limits
+        if args.memory_limit:
+            set_memory_limits(args.memory_limit)
+
+        if args.work_log:
+            set_work_log_sink(args.work_log)
+
         # If no message is provided, default to chat mode
         if not args.message:
             args.chat = True
@@ -160,17 +338,22 @@ def main():
             chat_agent = create_react_agent(
                 model,
                 get_chat_tools(expert_enabled=expert_enabled),
-                checkpointer=MemorySaver()
+                checkpointer=get_checkpointer('chat')
             )
             
             # Run chat agent with CHAT_PROMPT
             config = {
-                "configurable": {"thread_id": uuid.uuid4()},
+                "configurable": {"thread_id": get_thread_id('chat_thread_id', resumed)},
                 "recursion_limit": 100,
                 "chat_mode": True,
                 "cowboy_mode": args.cowboy_mode,
                 "hil": True,  # Always true in chat mode
-                "initial_request": initial_request
+                "initial_request": initial_request,
+                "prompt_token_budget": args.prompt_token_budget,
+                "history_token_limit": args.history_token_limit,
+                "command_timeout": args.command_timeout,
+                "shell_session": args.shell_session,
+                "parallel_tasks": args.parallel_tasks
             }
             
             # Store config in global memory
@@ -190,10 +373,15 @@ def main():
             
         base_task = args.message
         config = {
-            "configurable": {"thread_id": uuid.uuid4()},
+            "configurable": {"thread_id": get_thread_id('thread_id', resumed)},
             "recursion_limit": 100,
             "research_only": args.research_only,
-            "cowboy_mode": args.cowboy_mode
+            "cowboy_mode": args.cowboy_mode,
+            "prompt_token_budget": args.prompt_token_budget,
+            "history_token_limit": args.history_token_limit,
+            "command_timeout": args.command_timeout,
+            "shell_session": args.shell_session,
+            "parallel_tasks": args.parallel_tasks
         }
     
         # Store config in global memory for access by is_informational_query
@@ -207,18 +395,31 @@ def main():
         _global_memory['config']['expert_provider'] = args.expert_provider
         _global_memory['config']['expert_model'] = args.expert_model
         
-        # Run research stage
+        # Run research stage, unless a resumed session already completed it for this task
+        research_done = (
+            resumed
+            and _global_memory.get('research_completed', False)
+            and _global_memory.get('base_task') == base_task
+        )
+        _global_memory['base_task'] = base_task
+        persist_memory('base_task')
+        
         print_stage_header("Research Stage")
         
-        run_research_agent(
-            base_task,
-            model,
-            expert_enabled=expert_enabled,
-            research_only=args.research_only,
-            hil=args.hil,
-            memory=research_memory,
-            config=config
-        )
+        if research_done:
+            console.print(Panel("Research already completed in this session, reusing saved memory.", style="green"))
+        else:
+            run_research_agent(
+                base_task,
+                model,
+                expert_enabled=expert_enabled,
+                research_only=args.research_only,
+                hil=args.hil,
+                memory=get_checkpointer('research'),
+                config=stage_config(config, 'research')
+            )
+            _global_memory['research_completed'] = True
+            persist_memory('research_completed')
         
         # Proceed with planning and implementation if not an informational query
         if not is_informational_query():
@@ -228,8 +429,8 @@ def main():
                 model,
                 expert_enabled=expert_enabled,
                 hil=args.hil,
-                memory=planning_memory,
-                config=config
+                memory=get_checkpointer('planning'),
+                config=stage_config(config, 'planning')
             )
 
     except KeyboardInterrupt:
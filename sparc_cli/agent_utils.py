@@ -1,5 +1,6 @@
 """Utility functions for working with agents."""
 
+import asyncio
 import time
 import uuid
 from typing import Optional, Any, List
@@ -7,11 +8,14 @@ from typing import Optional, Any, List
 import signal
 import threading
 import time
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
 
 from langgraph.prebuilt import create_react_agent
 from sparc_cli.console.formatting import print_stage_header, print_error, print_interrupt
 from sparc_cli.console.output import print_agent_output
+from sparc_cli.proc.interactive import interrupt_commands
+from sparc_cli.proc.shell_session import close_shell_session
 from sparc_cli.tool_configs import (
     get_implementation_tools,
     get_research_tools,
@@ -27,22 +31,27 @@ from sparc_cli.prompts import (
     HUMAN_PROMPT_SECTION_RESEARCH,
     PLANNING_PROMPT,
     EXPERT_PROMPT_SECTION_PLANNING,
-    HUMAN_PROMPT_SECTION_PLANNING
+    HUMAN_PROMPT_SECTION_PLANNING,
+    PARALLEL_PROMPT_SECTION_PLANNING
 )
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from sparc_cli.checkpoint import get_checkpointer, compact_checkpoints
+from sparc_cli.history import compact_history, acompact_history
 
 from langchain_core.messages import HumanMessage
 from langchain_core.messages import BaseMessage
-from anthropic import APIError, APITimeoutError, RateLimitError, InternalServerError
+from sparc_cli.retry import RetryPolicy, CircuitBreaker, DEFAULT_RETRY_POLICY, RETRYABLE_ERRORS, get_circuit_breaker
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
 
 from sparc_cli.tools.memory import (
     _global_memory,
-    get_memory_value,
-    get_related_files,
+    get_memory_value_within,
+    memory_lock,
 )
+from sparc_cli.config import DEFAULT_PROMPT_TOKEN_BUDGET
+from sparc_cli.text.tokens import estimate_tokens, truncate_to_tokens, allocate_tokens
 from sparc_cli.tool_configs import get_research_tools
 from sparc_cli.prompts import (
     RESEARCH_PROMPT,
@@ -53,6 +62,109 @@ from sparc_cli.prompts import (
 
 console = Console()
 
+# Maximum number of compiled agents kept for reuse
+AGENT_CACHE_SIZE = 32
+
+_agent_cache: "OrderedDict[Tuple, Any]" = OrderedDict()
+_agent_cache_lock = threading.Lock()
+
+def get_agent(model, tools: List[Any], checkpointer: Any):
+    """Get a compiled ReAct agent, reusing a previously compiled one if possible.
+
+    Compiling an agent builds the LangGraph graph and the tool schemas, which
+    is wasted work when the same sub-agent is spawned repeatedly. Agents are
+    cached by the identity of the model, each tool and the checkpointer; the
+    cached graph keeps those objects alive, so the identities stay unique for
+    as long as the entry exists.
+
+    Args:
+        model: The LLM model the agent uses
+        tools: The tools available to the agent
+        checkpointer: The checkpointer the agent saves its state to
+
+    Returns:
+        The compiled agent
+    """
+    key = (id(model), tuple(id(tool) for tool in tools), id(checkpointer))
+    with _agent_cache_lock:
+        agent = _agent_cache.get(key)
+        if agent is not None:
+            _agent_cache.move_to_end(key)
+            return agent
+
+    agent = create_react_agent(model, tools, checkpointer=checkpointer)
+
+    with _agent_cache_lock:
+        agent = _agent_cache.setdefault(key, agent)
+        _agent_cache.move_to_end(key)
+        while len(_agent_cache) > AGENT_CACHE_SIZE:
+            _agent_cache.popitem(last=False)
+    return agent
+
+def clear_agent_cache() -> None:
+    """Drop all cached compiled agents."""
+    with _agent_cache_lock:
+        _agent_cache.clear()
+
+def _default_checkpointer(agent_type: str) -> BaseCheckpointSaver:
+    """Get the checkpointer shared by all agents of a type run without memory."""
+    return get_checkpointer(agent_type)
+
+def _private_thread_config(run_config: dict, thread_id: str) -> dict:
+    """Pin a run to its own thread, overriding any thread ID from the caller's config."""
+    run_config["configurable"] = {**run_config.get("configurable", {}), "thread_id": thread_id}
+    return run_config
+
+def _release_thread(checkpointer: Any, thread_id: str) -> None:
+    """Delete a finished private thread from a shared checkpointer and close its shell session."""
+    delete_thread = getattr(checkpointer, 'delete_thread', None)
+    if delete_thread is not None:
+        delete_thread(thread_id)
+    close_shell_session(thread_id)
+
+def _compact_thread(agent: Any, config: dict) -> None:
+    """Drop superseded checkpoints of a finished run's thread."""
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if thread_id is not None:
+        compact_checkpoints(getattr(agent, 'checkpointer', None), thread_id)
+
+def get_prompt_token_budget() -> int:
+    """Get the estimated token budget for an agent's initial prompt."""
+    return _global_memory.get('config', {}).get('prompt_token_budget') or DEFAULT_PROMPT_TOKEN_BUDGET
+
+def format_prompt_within_budget(template: str, memory_sections: Dict[str, str], **fields: Any) -> str:
+    """Format a prompt template, sizing memory sections to fit the prompt token budget.
+
+    Tokens left after the fixed fields are shared between the memory sections;
+    sections that do not fit their share drop their lowest priority items
+    first. This keeps oversized prompts from being sent at all, instead of
+    finding out from a failed request.
+
+    Args:
+        template: The prompt template
+        memory_sections: Template field to memory key, e.g. {'code_snippets': 'key_snippets'}
+        fields: Values for the remaining template fields
+
+    Returns:
+        The formatted prompt
+    """
+    budget = get_prompt_token_budget()
+    with memory_lock():
+        fixed = template.format(**fields, **{field: "" for field in memory_sections})
+        full = {field: get_memory_value_within(key, budget) for field, key in memory_sections.items()}
+        allocation = allocate_tokens(
+            {field: estimate_tokens(text) for field, text in full.items()},
+            budget - estimate_tokens(fixed)
+        )
+        sections = {
+            field: text if estimate_tokens(text) <= allocation[field]
+            else get_memory_value_within(memory_sections[field], allocation[field])
+            for field, text in full.items()
+        }
+
+    # Only the fixed fields can still overflow, e.g. a huge task description
+    return truncate_to_tokens(template.format(**fields, **sections), budget)
+
 def run_research_agent(
     base_task_or_query: str,
     model,
@@ -73,7 +185,8 @@ def run_research_agent(
         expert_enabled: Whether expert mode is enabled
         research_only: Whether this is a research-only task
         hil: Whether human-in-the-loop mode is enabled
-        memory: Optional memory instance to use
+        memory: Optional memory instance to use (defaults to a private thread
+            of a checkpointer shared by research agents)
         config: Optional configuration dictionary
         thread_id: Optional thread ID (defaults to new UUID)
         console_message: Optional message to display before running
@@ -89,9 +202,10 @@ def run_research_agent(
             research_only=True
         )
     """
-    # Initialize memory if not provided
-    if memory is None:
-        memory = MemorySaver()
+    # Without caller memory, run on a private thread of the shared checkpointer
+    private_thread = memory is None
+    if private_thread:
+        memory = _default_checkpointer('research')
 
     # Set up thread ID
     if thread_id is None:
@@ -105,26 +219,24 @@ def run_research_agent(
     )
 
     # Create agent
-    agent = create_react_agent(model, tools, checkpointer=memory)
+    agent = get_agent(model, tools, memory)
 
     # Format prompt sections
     expert_section = EXPERT_PROMPT_SECTION_RESEARCH if expert_enabled else ""
     human_section = HUMAN_PROMPT_SECTION_RESEARCH if hil else ""
     
-    # Get research context from memory
-    key_facts = _global_memory.get("key_facts", "")
-    code_snippets = _global_memory.get("code_snippets", "")
-    related_files = _global_memory.get("related_files", "")
-    
-    # Build prompt
-    prompt = (RESEARCH_ONLY_PROMPT if research_only else RESEARCH_PROMPT).format(
+    # Build prompt, with research context from memory sized to the token budget
+    prompt = format_prompt_within_budget(
+        RESEARCH_ONLY_PROMPT if research_only else RESEARCH_PROMPT,
+        {
+            'key_facts': 'key_facts',
+            'code_snippets': 'key_snippets',
+            'related_files': 'related_files'
+        },
         base_task=base_task_or_query,
         research_only_note='' if research_only else ' Only request implementation if the user explicitly asked for changes to be made.',
         expert_section=expert_section,
-        human_section=human_section,
-        key_facts=key_facts,
-        code_snippets=code_snippets,
-        related_files=related_files
+        human_section=human_section
     )
 
     # Set up configuration
@@ -134,13 +246,19 @@ def run_research_agent(
     }
     if config:
         run_config.update(config)
+    if private_thread:
+        _private_thread_config(run_config, thread_id)
 
     # Display console message if provided
     if console_message:
         console.print(Panel(Markdown(console_message), title="🔬 Looking into it..."))
 
     # Run agent with retry logic
-    return run_agent_with_retry(agent, prompt, run_config)
+    try:
+        return run_agent_with_retry(agent, prompt, run_config)
+    finally:
+        if private_thread:
+            _release_thread(memory, thread_id)
 
 def run_planning_agent(
     base_task: str,
@@ -166,33 +284,39 @@ def run_planning_agent(
     Returns:
         Optional[str]: The completion message if planning completed successfully
     """
-    # Initialize memory if not provided
-    if memory is None:
-        memory = MemorySaver()
+    # Without caller memory, run on a private thread of the shared checkpointer
+    private_thread = memory is None
+    if private_thread:
+        memory = _default_checkpointer('planning')
 
     # Set up thread ID
     if thread_id is None:
         thread_id = str(uuid.uuid4())
 
     # Configure tools
-    tools = get_planning_tools(expert_enabled=expert_enabled)
+    parallel = (config or {}).get('parallel_tasks', 1) > 1
+    tools = get_planning_tools(expert_enabled=expert_enabled, parallel=parallel)
 
     # Create agent
-    agent = create_react_agent(model, tools, checkpointer=memory)
+    agent = get_agent(model, tools, memory)
 
     # Format prompt sections
     expert_section = EXPERT_PROMPT_SECTION_PLANNING if expert_enabled else ""
     human_section = HUMAN_PROMPT_SECTION_PLANNING if hil else ""
     
     # Build prompt
-    planning_prompt = PLANNING_PROMPT.format(
+    planning_prompt = format_prompt_within_budget(
+        PLANNING_PROMPT,
+        {
+            'research_notes': 'research_notes',
+            'related_files': 'related_files',
+            'key_facts': 'key_facts',
+            'key_snippets': 'key_snippets'
+        },
         expert_section=expert_section,
         human_section=human_section,
+        parallel_section=PARALLEL_PROMPT_SECTION_PLANNING if parallel else "",
         base_task=base_task,
-        research_notes=get_memory_value('research_notes'),
-        related_files="\n".join(get_related_files()),
-        key_facts=get_memory_value('key_facts'),
-        key_snippets=get_memory_value('key_snippets'),
         research_only_note='' if config.get('research_only') else ' Only request implementation if the user explicitly asked for changes to be made.'
     )
 
@@ -203,43 +327,38 @@ def run_planning_agent(
     }
     if config:
         run_config.update(config)
+    if private_thread:
+        _private_thread_config(run_config, thread_id)
 
     # Run agent with retry logic
     print_stage_header("Planning Stage")
-    return run_agent_with_retry(agent, planning_prompt, run_config)
+    try:
+        return run_agent_with_retry(agent, planning_prompt, run_config)
+    finally:
+        if private_thread:
+            _release_thread(memory, thread_id)
 
-def run_task_implementation_agent(
+def _prepare_task_implementation_agent(
     base_task: str,
     tasks: list,
     task: str,
     plan: str,
     related_files: list,
     model,
-    *,
-    expert_enabled: bool = False,
-    memory: Optional[Any] = None,
-    config: Optional[dict] = None,
-    thread_id: Optional[str] = None
-) -> Optional[str]:
-    """Run an implementation agent for a specific task.
-    
-    Args:
-        base_task: The main task being implemented
-        tasks: List of tasks to implement
-        plan: The implementation plan
-        related_files: List of related files
-        model: The LLM model to use
-        expert_enabled: Whether expert mode is enabled
-        memory: Optional memory instance to use
-        config: Optional configuration dictionary
-        thread_id: Optional thread ID (defaults to new UUID)
-        
+    expert_enabled: bool,
+    memory: Optional[Any],
+    config: Optional[dict],
+    thread_id: Optional[str]
+) -> Tuple[Any, str, dict, Any]:
+    """Build the agent, prompt and run config of an implementation agent.
+
     Returns:
-        Optional[str]: The completion message if task completed successfully
+        Tuple of (agent, prompt, run config, cleanup callable to run afterwards)
     """
-    # Initialize memory if not provided
-    if memory is None:
-        memory = MemorySaver()
+    # Without caller memory, run on a private thread of the shared checkpointer
+    private_thread = memory is None
+    if private_thread:
+        memory = _default_checkpointer('implementation')
 
     # Set up thread ID
     if thread_id is None:
@@ -249,17 +368,20 @@ def run_task_implementation_agent(
     tools = get_implementation_tools(expert_enabled=expert_enabled)
 
     # Create agent
-    agent = create_react_agent(model, tools, checkpointer=memory)
+    agent = get_agent(model, tools, memory)
 
     # Build prompt
-    prompt = IMPLEMENTATION_PROMPT.format(
+    prompt = format_prompt_within_budget(
+        IMPLEMENTATION_PROMPT,
+        {
+            'key_facts': 'key_facts',
+            'key_snippets': 'key_snippets'
+        },
         base_task=base_task,
         task=task,
         tasks=tasks,
         plan=plan,
         related_files=related_files,
-        key_facts=get_memory_value('key_facts'),
-        key_snippets=get_memory_value('key_snippets'),
         expert_section=EXPERT_PROMPT_SECTION_IMPLEMENTATION if expert_enabled else "",
         human_section=HUMAN_PROMPT_SECTION_IMPLEMENTATION if _global_memory.get('config', {}).get('hil', False) else ""
     )
@@ -271,9 +393,78 @@ def run_task_implementation_agent(
     }
     if config:
         run_config.update(config)
+    if private_thread:
+        _private_thread_config(run_config, thread_id)
+
+    def cleanup():
+        if private_thread:
+            _release_thread(memory, thread_id)
+
+    return agent, prompt, run_config, cleanup
+
+def run_task_implementation_agent(
+    base_task: str,
+    tasks: list,
+    task: str,
+    plan: str,
+    related_files: list,
+    model,
+    *,
+    expert_enabled: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None
+) -> Optional[str]:
+    """Run an implementation agent for a specific task.
+    
+    Args:
+        base_task: The main task being implemented
+        tasks: List of tasks to implement
+        plan: The implementation plan
+        related_files: List of related files
+        model: The LLM model to use
+        expert_enabled: Whether expert mode is enabled
+        memory: Optional memory instance to use
+        config: Optional configuration dictionary
+        thread_id: Optional thread ID (defaults to new UUID)
+        
+    Returns:
+        Optional[str]: The completion message if task completed successfully
+    """
+    agent, prompt, run_config, cleanup = _prepare_task_implementation_agent(
+        base_task, tasks, task, plan, related_files, model,
+        expert_enabled, memory, config, thread_id
+    )
 
     # Run agent with retry logic
-    return run_agent_with_retry(agent, prompt, run_config)
+    try:
+        return run_agent_with_retry(agent, prompt, run_config)
+    finally:
+        cleanup()
+
+async def run_task_implementation_agent_async(
+    base_task: str,
+    tasks: list,
+    task: str,
+    plan: str,
+    related_files: list,
+    model,
+    *,
+    expert_enabled: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None
+) -> Optional[str]:
+    """Async version of run_task_implementation_agent, see run_agent_with_retry_async."""
+    agent, prompt, run_config, cleanup = _prepare_task_implementation_agent(
+        base_task, tasks, task, plan, related_files, model,
+        expert_enabled, memory, config, thread_id
+    )
+
+    try:
+        return await run_agent_with_retry_async(agent, prompt, run_config)
+    finally:
+        cleanup()
 
 _CONTEXT_STACK = []
 _INTERRUPT_CONTEXT = None
@@ -282,6 +473,8 @@ def _request_interrupt(signum, frame):
     global _INTERRUPT_CONTEXT
     if _CONTEXT_STACK:
         _INTERRUPT_CONTEXT = _CONTEXT_STACK[-1]
+    # Commands run in their own session and do not see the terminal's Ctrl-C
+    interrupt_commands()
 
 class InterruptibleSection:
     def __enter__(self):
@@ -295,61 +488,206 @@ def check_interrupt():
     if _CONTEXT_STACK and _INTERRUPT_CONTEXT is _CONTEXT_STACK[-1]:
         raise KeyboardInterrupt("Interrupt requested")
 
-def run_agent_with_retry(agent, prompt: str, config: dict) -> Optional[str]:
+def _shorten_oversized_prompt(prompt: str, error: Exception) -> Optional[str]:
+    """Shorten a prompt the API rejected as too long.
+
+    Returns:
+        The shortened prompt, or None if the error is not a prompt size error
+    """
+    error_str = str(error).lower()
+    if 'prompt is too long' in error_str or 'token limit exceeded' in error_str:
+        # Extract current and max tokens from error message
+        import re
+        match = re.search(r'(\d+)\s*tokens?\s*>\s*(\d+)\s*maximum', error_str)
+        if match:
+            current_tokens = int(match.group(1))
+            max_tokens = int(match.group(2))
+            # Calculate reduction ratio to get under limit with 10% buffer
+            reduction_ratio = (max_tokens * 0.9) / current_tokens
+            print_error(f"Prompt truncated to fit within token limit. Continuing with shortened prompt...")
+            # Cut the middle of the prompt, keeping the task and the instructions
+            return truncate_to_tokens(prompt, int(estimate_tokens(prompt) * reduction_ratio))
+    return None
+
+def _interruptible_sleep(delay: float) -> None:
+    """Sleep for delay seconds, waking up to honor interrupt requests."""
+    start = time.monotonic()
+    while time.monotonic() - start < delay:
+        check_interrupt()
+        time.sleep(min(0.1, max(delay - (time.monotonic() - start), 0)))
+
+def _circuit_breaker_for(config: dict) -> CircuitBreaker:
+    """Get the circuit breaker shared by all agents using the configured provider."""
+    return get_circuit_breaker(config.get('provider') or _global_memory.get('config', {}).get('provider') or 'default')
+
+def _can_resume(agent, config: dict) -> bool:
+    """Check whether the agent's checkpoint has unfinished steps to resume."""
+    try:
+        return bool(agent.get_state(config).next)
+    except ValueError:
+        # Agent has no checkpointer
+        return False
+
+async def _can_resume_async(agent, config: dict) -> bool:
+    """Async version of _can_resume."""
+    try:
+        return bool((await agent.aget_state(config)).next)
+    except ValueError:
+        return False
+
+def _compact_history_before_run(agent, config: dict) -> None:
+    """Shrink the thread's saved history if it exceeds the configured token limit."""
+    limit = config.get('history_token_limit')
+    if not limit:
+        return
+    try:
+        compact_history(agent, config, limit)
+    except ValueError:
+        # Agent has no checkpointer
+        pass
+
+async def _compact_history_before_run_async(agent, config: dict) -> None:
+    """Async version of _compact_history_before_run."""
+    limit = config.get('history_token_limit')
+    if not limit:
+        return
+    try:
+        await acompact_history(agent, config, limit)
+    except ValueError:
+        pass
+
+def run_agent_with_retry(agent, prompt: str, config: dict, retry_policy: Optional[RetryPolicy] = None) -> Optional[str]:
+    """Run an agent, retrying transient API errors.
+
+    Retries wait according to retry_policy (capped, jittered backoff that
+    honors retry-after headers) and a circuit breaker shared by all agents of
+    the provider. A retry resumes the run from the agent's last checkpoint
+    rather than replaying it from the initial prompt.
+
+    If the config sets history_token_limit, history saved on the thread by
+    earlier runs (e.g. previous chat turns) is compacted to fit it first.
+
+    Args:
+        agent: The compiled agent to run
+        prompt: The prompt to start the run with
+        config: The run configuration, including the checkpoint thread ID
+        retry_policy: Retry schedule (defaults to DEFAULT_RETRY_POLICY)
+
+    Returns:
+        Completion message, or None in chat mode
+    """
     original_handler = None
     if threading.current_thread() is threading.main_thread():
         original_handler = signal.getsignal(signal.SIGINT)
         signal.signal(signal.SIGINT, _request_interrupt)
 
-    max_retries = 20
-    base_delay = 1
+    policy = retry_policy or DEFAULT_RETRY_POLICY
+    breaker = _circuit_breaker_for(config)
+    # Stable ID, so a shortened prompt replaces the original in the checkpoint
+    message = HumanMessage(content=prompt, id=str(uuid.uuid4()))
+    resume = False
 
     with InterruptibleSection():
         try:
             # Track agent execution depth
-            current_depth = _global_memory.get('agent_depth', 0)
-            _global_memory['agent_depth'] = current_depth + 1
+            with memory_lock():
+                current_depth = _global_memory.get('agent_depth', 0)
+                _global_memory['agent_depth'] = current_depth + 1
+
+            _compact_history_before_run(agent, config)
             
-            for attempt in range(max_retries):
+            for attempt in range(policy.max_attempts):
                 check_interrupt()
+                wait = breaker.acquire()
+                while wait > 0:
+                    print_error(f"API is failing repeatedly, pausing requests for {wait:.0f}s...")
+                    _interruptible_sleep(wait)
+                    wait = breaker.acquire()
                 try:
-                    for chunk in agent.stream({"messages": [HumanMessage(content=prompt)]}, config):
+                    for chunk in agent.stream(None if resume else {"messages": [message]}, config):
                         check_interrupt()
                         print_agent_output(chunk)
+                    breaker.record_success()
+                    _compact_thread(agent, config)
                     if not config.get('chat_mode'):
                         return "Agent run completed successfully"
                     return None
                 except KeyboardInterrupt:
                     raise
-                except (InternalServerError, APITimeoutError, RateLimitError, APIError) as e:
-                    error_str = str(e).lower()
-                    if 'prompt is too long' in error_str or 'token limit exceeded' in error_str:
-                        # Extract current and max tokens from error message
-                        import re
-                        match = re.search(r'(\d+)\s*tokens?\s*>\s*(\d+)\s*maximum', error_str)
-                        if match:
-                            current_tokens = int(match.group(1))
-                            max_tokens = int(match.group(2))
-                            # Calculate reduction ratio to get under limit with 10% buffer
-                            reduction_ratio = (max_tokens * 0.9) / current_tokens
-                            # Truncate prompt
-                            words = prompt.split()
-                            new_length = int(len(words) * reduction_ratio)
-                            prompt = ' '.join(words[:new_length])
-                            print_error(f"Prompt truncated to fit within token limit. Continuing with shortened prompt...")
-                            continue
-
-                    if attempt == max_retries - 1:
-                        raise RuntimeError(f"Max retries ({max_retries}) exceeded. Last error: {e}")
-                    delay = base_delay * (2 ** attempt)
-                    print_error(f"Encountered {e.__class__.__name__}: {e}. Retrying in {delay}s... (Attempt {attempt+1}/{max_retries})")
-                    start = time.monotonic()
-                    while time.monotonic() - start < delay:
-                        check_interrupt()
-                        time.sleep(0.1)
+                except RETRYABLE_ERRORS as e:
+                    shortened = _shorten_oversized_prompt(message.content, e)
+                    if shortened is not None:
+                        message = HumanMessage(content=shortened, id=message.id)
+                        resume = False
+                        continue
+
+                    breaker.record_failure()
+                    if attempt == policy.max_attempts - 1:
+                        raise RuntimeError(f"Max retries ({policy.max_attempts}) exceeded. Last error: {e}")
+                    delay = policy.delay_for(attempt, e)
+                    print_error(f"Encountered {e.__class__.__name__}: {e}. Retrying in {delay:.1f}s... (Attempt {attempt+1}/{policy.max_attempts})")
+                    _interruptible_sleep(delay)
+                    resume = _can_resume(agent, config)
         finally:
             # Reset depth tracking
-            _global_memory['agent_depth'] = _global_memory.get('agent_depth', 1) - 1
+            with memory_lock():
+                _global_memory['agent_depth'] = _global_memory.get('agent_depth', 1) - 1
             
             if original_handler and threading.current_thread() is threading.main_thread():
                 signal.signal(signal.SIGINT, original_handler)
+
+async def run_agent_with_retry_async(agent, prompt: str, config: dict, retry_policy: Optional[RetryPolicy] = None) -> Optional[str]:
+    """Run an agent with agent.astream, retrying on transient API errors.
+
+    Async counterpart of run_agent_with_retry, so several agents can wait on
+    the model concurrently from one event loop. Interrupts requested through
+    the SIGINT handler of an enclosing run_agent_with_retry are honored
+    between chunks.
+    """
+    policy = retry_policy or DEFAULT_RETRY_POLICY
+    breaker = _circuit_breaker_for(config)
+    message = HumanMessage(content=prompt, id=str(uuid.uuid4()))
+    resume = False
+
+    # Track agent execution depth
+    with memory_lock():
+        current_depth = _global_memory.get('agent_depth', 0)
+        _global_memory['agent_depth'] = current_depth + 1
+
+    try:
+        await _compact_history_before_run_async(agent, config)
+        for attempt in range(policy.max_attempts):
+            check_interrupt()
+            wait = breaker.acquire()
+            while wait > 0:
+                print_error(f"API is failing repeatedly, pausing requests for {wait:.0f}s...")
+                await asyncio.sleep(wait)
+                check_interrupt()
+                wait = breaker.acquire()
+            try:
+                async for chunk in agent.astream(None if resume else {"messages": [message]}, config):
+                    check_interrupt()
+                    print_agent_output(chunk)
+                breaker.record_success()
+                _compact_thread(agent, config)
+                if not config.get('chat_mode'):
+                    return "Agent run completed successfully"
+                return None
+            except RETRYABLE_ERRORS as e:
+                shortened = _shorten_oversized_prompt(message.content, e)
+                if shortened is not None:
+                    message = HumanMessage(content=shortened, id=message.id)
+                    resume = False
+                    continue
+
+                breaker.record_failure()
+                if attempt == policy.max_attempts - 1:
+                    raise RuntimeError(f"Max retries ({policy.max_attempts}) exceeded. Last error: {e}")
+                delay = policy.delay_for(attempt, e)
+                print_error(f"Encountered {e.__class__.__name__}: {e}. Retrying in {delay:.1f}s... (Attempt {attempt+1}/{policy.max_attempts})")
+                await asyncio.sleep(delay)
+                resume = await _can_resume_async(agent, config)
+    finally:
+        # Reset depth tracking
+        with memory_lock():
+            _global_memory['agent_depth'] = _global_memory.get('agent_depth', 1) - 1
@@ -0,0 +1,198 @@
+"""Checkpointers holding agent conversation state, in memory or on disk.
+
+By default every agent keeps its message history in a MemorySaver, which
+lives only as long as the process. configure_checkpointer() switches all
+agents to one SQLite database instead, so histories survive a restart and
+do not have to be held in RAM.
+
+LangGraph saves a new checkpoint with the full conversation after every
+step. Only the latest one is needed to continue a thread, so
+compact_checkpoints() drops older ones once a run has finished.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+# Number of checkpoints kept per thread when compacting
+CHECKPOINTS_KEPT_PER_THREAD = 2
+
+@lru_cache(maxsize=None)
+def _sqlite_saver_class() -> type:
+    """Get the SQLite checkpointer class, importing the optional dependency on first use."""
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        raise RuntimeError(
+            "SQLite checkpoints need the langgraph-checkpoint-sqlite package. "
+            "Install it with: pip install langgraph-checkpoint-sqlite"
+        )
+
+    class ThreadedSqliteSaver(SqliteSaver):
+        """SqliteSaver whose async methods run the sync ones in a worker thread.
+
+        SqliteSaver only supports sync use, but agents run concurrently with
+        astream still need to save checkpoints. SQLite calls are short and
+        serialized by the saver's lock, so a thread is enough.
+        """
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, **kwargs):
+            items = await asyncio.to_thread(lambda: list(self.list(config, **kwargs)))
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, *args, **kwargs):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, *args, **kwargs)
+
+        def delete_thread(self, thread_id: str) -> None:
+            """Delete all checkpoints and writes of a thread."""
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (str(thread_id),))
+                cur.execute("DELETE FROM writes WHERE thread_id = ?", (str(thread_id),))
+
+        async def adelete_thread(self, thread_id: str) -> None:
+            await asyncio.to_thread(self.delete_thread, thread_id)
+
+    return ThreadedSqliteSaver
+
+def create_checkpointer(path: Optional[str] = None) -> BaseCheckpointSaver:
+    """Create a checkpointer.
+
+    Args:
+        path: SQLite database to save checkpoints to (None to keep them in memory)
+
+    Returns:
+        A SQLite backed checkpointer if path is given, otherwise a MemorySaver
+
+    Raises:
+        RuntimeError: If path is given but langgraph-checkpoint-sqlite is not installed
+    """
+    if path is None:
+        return MemorySaver()
+
+    saver_class = _sqlite_saver_class()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # The connection is shared by agents running in other threads, guarded by the saver's lock
+    conn = sqlite3.connect(path, check_same_thread=False)
+    saver = saver_class(conn)
+    saver.setup()
+    return saver
+
+_checkpointer_path: Optional[str] = None
+_checkpointers: Dict[str, BaseCheckpointSaver] = {}
+_checkpointers_lock = threading.Lock()
+
+def configure_checkpointer(path: Optional[str] = None) -> None:
+    """Choose where checkpointers returned by get_checkpointer() save state.
+
+    Args:
+        path: SQLite database shared by all agents (None to keep state in memory)
+    """
+    global _checkpointer_path
+    if path is not None:
+        # Fail now rather than when the first agent starts
+        _sqlite_saver_class()
+    with _checkpointers_lock:
+        _checkpointer_path = path
+        _checkpointers.clear()
+
+def get_checkpointer(name: str) -> BaseCheckpointSaver:
+    """Get the shared checkpointer for a kind of agent, e.g. 'research'.
+
+    In memory each name gets its own MemorySaver. With a database configured
+    all names share one saver, as threads are already kept apart by ID.
+    """
+    with _checkpointers_lock:
+        key = _checkpointer_path if _checkpointer_path is not None else name
+        checkpointer = _checkpointers.get(key)
+        if checkpointer is None:
+            checkpointer = _checkpointers[key] = create_checkpointer(_checkpointer_path)
+        return checkpointer
+
+def compact_checkpoints(checkpointer: Any, thread_id: str, keep_last: int = CHECKPOINTS_KEPT_PER_THREAD) -> int:
+    """Delete all but the newest checkpoints of a thread.
+
+    Each checkpoint holds the whole conversation up to that step, so keeping
+    every one makes memory (or the database) grow with the square of the
+    conversation length. Pending writes of deleted checkpoints go with them.
+
+    Args:
+        checkpointer: The checkpointer to compact; unsupported types are left alone
+        thread_id: The thread to compact
+        keep_last: Number of newest checkpoints to keep in each namespace
+
+    Returns:
+        Number of checkpoints deleted
+    """
+    keep_last = max(keep_last, 1)
+    if isinstance(checkpointer, MemorySaver):
+        return _compact_memory_saver(checkpointer, str(thread_id), keep_last)
+    if _is_sqlite_saver(checkpointer):
+        return _compact_sqlite_saver(checkpointer, str(thread_id), keep_last)
+    return 0
+
+def _is_sqlite_saver(checkpointer: Any) -> bool:
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        return False
+    return isinstance(checkpointer, SqliteSaver)
+
+def _compact_memory_saver(saver: MemorySaver, thread_id: str, keep_last: int) -> int:
+    removed = 0
+    namespaces = saver.storage.get(thread_id, {})
+    for checkpoint_ns, checkpoints in list(namespaces.items()):
+        # Checkpoint IDs are time ordered UUIDs, so they sort oldest first
+        stale = sorted(checkpoints)[:-keep_last]
+        for checkpoint_id in stale:
+            del checkpoints[checkpoint_id]
+            saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        removed += len(stale)
+
+        blobs = getattr(saver, 'blobs', None)
+        if stale and blobs is not None:
+            # Channel values are stored once per version; drop versions no kept checkpoint uses
+            in_use = set()
+            for saved in checkpoints.values():
+                checkpoint = saver.serde.loads_typed(saved[0])
+                in_use.update(checkpoint['channel_versions'].items())
+            for key in [k for k in blobs if k[0] == thread_id and k[1] == checkpoint_ns]:
+                if (key[2], key[3]) not in in_use:
+                    del blobs[key]
+    return removed
+
+def _compact_sqlite_saver(saver: Any, thread_id: str, keep_last: int) -> int:
+    saver.setup()
+    with saver.cursor() as cur:
+        cur.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id NOT IN ("
+            " SELECT checkpoint_id FROM checkpoints AS kept"
+            " WHERE kept.thread_id = checkpoints.thread_id AND kept.checkpoint_ns = checkpoints.checkpoint_ns"
+            " ORDER BY checkpoint_id DESC LIMIT ?"
+            ")",
+            (thread_id, keep_last)
+        )
+        removed = cur.rowcount
+        cur.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS ("
+            " SELECT 1 FROM checkpoints"
+            " WHERE checkpoints.thread_id = writes.thread_id"
+            " AND checkpoints.checkpoint_ns = writes.checkpoint_ns"
+            " AND checkpoints.checkpoint_id = writes.checkpoint_id"
+            ")",
+            (thread_id,)
+        )
+    return removed
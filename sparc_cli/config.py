@@ -1 +1,19 @@
 """Configuration utilities."""
+
+# Default estimated token budget for the initial prompt of an agent. Kept well
+# below model context sizes so the conversation has room to grow as tools run.
+DEFAULT_PROMPT_TOKEN_BUDGET = 60000
+
+# Default estimated token limit for the conversation history an agent resends
+# on each run of a thread, e.g. every chat turn. Older tool outputs and turns
+# are compacted away beyond it.
+DEFAULT_HISTORY_TOKEN_LIMIT = 80000
+
+# Default seconds a shell command may run before it is killed, with every
+# process it started
+DEFAULT_COMMAND_TIMEOUT = 600
+
+# Output a shell or programming task command may write before it is killed;
+# runaway output would otherwise grow without bound
+DEFAULT_COMMAND_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_COMMAND_MAX_LINES = 200000
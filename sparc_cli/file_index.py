@@ -0,0 +1,267 @@
+"""In-process index of the files in a git working tree.
+
+Listing a large repository with git (tracked files plus a status scan for
+untracked ones) takes long enough to dominate a fuzzy file search. The
+index lists the files once and afterwards only checks what may have
+changed:
+
+- Tracked files are listed again when the git index file changes, which
+  happens whenever files are added, removed, committed or checked out.
+- Untracked files are listed again only in directories whose modification
+  time changed, as creating, deleting or renaming a file updates the mtime
+  of the directory it is in. Every directory git does not ignore is
+  watched, including empty ones and ones holding only ignored files.
+"""
+
+import fnmatch
+import os
+import re
+import subprocess
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Sequence, Set, Tuple
+
+# Above this many changed directories all untracked files are listed again
+MAX_INCREMENTAL_DIRS = 64
+
+# Number of filtered file lists kept per index
+FILTERED_LISTS_KEPT = 16
+
+def _git(root: str, *args: str) -> str:
+    """Run a git command in root and get its output."""
+    result = subprocess.run(['git', '--literal-pathspecs', *args], cwd=root, capture_output=True, check=True)
+    return result.stdout.decode('utf-8', errors='surrogateescape')
+
+def _git_files(root: str, *args: str) -> List[str]:
+    """Run git ls-files in root and get the listed paths."""
+    return [path for path in _git(root, 'ls-files', '-z', *args).split('\0') if path]
+
+def _ignored(root: str, paths: List[str]) -> Set[str]:
+    """Get the paths git ignores among paths, relative to root."""
+    if not paths:
+        return set()
+    # Exits with 1 when no path is ignored
+    result = subprocess.run(
+        ['git', 'check-ignore', '-z', '--stdin'], cwd=root, capture_output=True,
+        input='\0'.join(paths).encode('utf-8', errors='surrogateescape') + b'\0'
+    )
+    if result.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+    return {path for path in result.stdout.decode('utf-8', errors='surrogateescape').split('\0') if path}
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _parent_dirs(files: Iterable[str]) -> Set[str]:
+    """Get every directory containing one of the files, relative to the root ('' for the root)."""
+    dirs = {''}
+    for path in files:
+        parent = os.path.dirname(path)
+        while parent not in dirs:
+            dirs.add(parent)
+            parent = os.path.dirname(parent)
+    return dirs
+
+def _is_under(path: str, directory: str) -> bool:
+    return not directory or path.startswith(directory + '/')
+
+class FileFilter:
+    """Include and exclude patterns compiled into one matcher.
+
+    Patterns use fnmatch syntax and are matched against whole paths, so "*"
+    also matches "/": "src/*.py" selects every Python file under src.
+    """
+
+    def __init__(self, include_patterns: Sequence[str], exclude_patterns: Sequence[str]):
+        self._include = _compile_patterns(include_patterns)
+        self._exclude = _compile_patterns(exclude_patterns)
+
+    def match_file(self, path: str) -> bool:
+        """Whether path matches an include pattern (if any) and no exclude pattern."""
+        return ((self._include is None or self._include.match(path) is not None)
+                and (self._exclude is None or self._exclude.match(path) is None))
+
+    def match_files(self, paths: Iterable[str]) -> List[str]:
+        """Get the paths the filter selects, in order."""
+        return [path for path in paths if self.match_file(path)]
+
+def _compile_patterns(patterns: Sequence[str]) -> Optional[Pattern]:
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+
+class _FilteredFiles(NamedTuple):
+    """Files selected by a filter, with the lists they were selected from."""
+    tracked: List[str]
+    tracked_result: List[str]
+    files: List[str]
+    result: List[str]
+
+class ProjectFileIndex:
+    """Tracked and untracked (but not ignored) files of a git working tree.
+
+    Paths are relative to the root of the working tree, as git prints them.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(root, _git(root, 'rev-parse', '--git-path', 'index').strip())
+        self._index_signature: Optional[Tuple] = None
+        self._tracked: List[str] = []
+        self._untracked: Set[str] = set()
+        self._dir_mtimes: Dict[str, Optional[int]] = {}
+        self._untracked_sorted: List[str] = []
+        self._files: Optional[List[str]] = None
+        self._filtered: Dict[FileFilter, _FilteredFiles] = {}
+
+    def files(self, file_filter: Optional[FileFilter] = None) -> List[str]:
+        """Get all files, bringing the index up to date first.
+
+        Args:
+            file_filter: Optional matcher from compile_file_filter() selecting
+                the files to return. Filtered lists are kept, and tracked files
+                are not filtered again when only untracked files change.
+
+        Returns:
+            Tracked files in git order followed by sorted untracked files.
+            The list is shared; do not modify it.
+        """
+        with self._lock:
+            self._refresh()
+            if self._files is None:
+                self._untracked_sorted = sorted(self._untracked)
+                self._files = self._tracked + self._untracked_sorted
+            if file_filter is None:
+                return self._files
+
+            cached = self._filtered.get(file_filter)
+            if cached is not None:
+                if cached.files is self._files:
+                    return cached.result
+                # Only untracked files changed, keep the filtered tracked files
+                tracked = cached.tracked_result if cached.tracked is self._tracked else None
+            else:
+                tracked = None
+            if tracked is None:
+                tracked = file_filter.match_files(self._tracked)
+            result = tracked + file_filter.match_files(self._untracked_sorted)
+
+            if len(self._filtered) >= FILTERED_LISTS_KEPT and file_filter not in self._filtered:
+                self._filtered.clear()
+            self._filtered[file_filter] = _FilteredFiles(self._tracked, tracked, self._files, result)
+            return result
+
+    def _index_signature_now(self) -> Optional[Tuple]:
+        try:
+            stat = os.stat(self._index_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _subdirs(self, directory: str) -> List[str]:
+        """Get the directories in directory, relative to the root."""
+        try:
+            with os.scandir(os.path.join(self.root, directory)) as entries:
+                return [
+                    os.path.join(directory, entry.name) for entry in entries
+                    if entry.is_dir(follow_symlinks=False) and entry.name != '.git'
+                ]
+        except OSError:
+            return []
+
+    def _unignored_dirs(self) -> Set[str]:
+        """Get every directory git does not ignore, walking the tree one level at a time."""
+        dirs = {''}
+        level = ['']
+        while level:
+            children = [child for directory in level for child in self._subdirs(directory)]
+            # Directories are checked with a trailing slash so patterns like "build/" apply
+            ignored = _ignored(self.root, [child + '/' for child in children])
+            level = [child for child in children if child + '/' not in ignored]
+            dirs.update(level)
+        return dirs
+
+    def _record_dir_mtimes(self, dirs: Iterable[str]) -> None:
+        for directory in dirs:
+            self._dir_mtimes[directory] = _mtime(os.path.join(self.root, directory))
+
+    def _refresh(self) -> None:
+        signature = self._index_signature_now()
+        if self._files is None or signature != self._index_signature:
+            self._tracked = _git_files(self.root)
+            self._untracked = set(_git_files(self.root, '--others', '--exclude-standard'))
+            self._index_signature = signature
+            self._dir_mtimes = {}
+            # Watch directories without untracked files too, which may get some later
+            self._record_dir_mtimes(
+                _parent_dirs(self._tracked) | _parent_dirs(self._untracked) | self._unignored_dirs()
+            )
+            self._files = None
+            return
+
+        changed = [
+            directory for directory, mtime in self._dir_mtimes.items()
+            if _mtime(os.path.join(self.root, directory)) != mtime
+        ]
+        if not changed:
+            return
+
+        # Record mtimes before listing, so changes made meanwhile are seen next time
+        self._record_dir_mtimes(changed)
+        scope = [''] if '' in changed or len(changed) > MAX_INCREMENTAL_DIRS else changed
+        listed = _git_files(self.root, '--others', '--exclude-standard', '--', *[d for d in scope if d])
+        self._untracked = {
+            path for path in self._untracked
+            if not any(_is_under(path, directory) for directory in scope)
+        }
+        self._untracked.update(listed)
+
+        # Watch the directories of new files, and new empty directories that may get files later
+        new_dirs = _parent_dirs(listed) - self._dir_mtimes.keys()
+        for directory in scope:
+            new_dirs.update(self._subdirs(directory))
+        self._record_dir_mtimes(new_dirs - self._dir_mtimes.keys())
+        for directory in [d for d in changed if self._dir_mtimes.get(d) is None and d]:
+            # The directory is gone
+            del self._dir_mtimes[directory]
+        self._files = None
+
+_indexes: Dict[str, ProjectFileIndex] = {}
+_roots: Dict[str, str] = {}
+_indexes_lock = threading.Lock()
+
+def get_file_index(repo_path: str = ".") -> ProjectFileIndex:
+    """Get the shared file index of the git working tree containing repo_path.
+
+    Raises:
+        ValueError: If repo_path is not inside a git working tree
+    """
+    path = os.path.realpath(repo_path)
+    root = _roots.get(path)
+    if root is None:
+        try:
+            root = _roots[path] = _git(path, 'rev-parse', '--show-toplevel').strip()
+        except (OSError, subprocess.CalledProcessError):
+            raise ValueError(f"Not a git repository: {repo_path}")
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = ProjectFileIndex(root)
+        return index
+
+@lru_cache(maxsize=64)
+def compile_file_filter(include_patterns: Sequence[str], exclude_patterns: Sequence[str]) -> FileFilter:
+    """Compile include and exclude fnmatch patterns into one matcher (cached).
+
+    Args:
+        include_patterns: Patterns a path must match one of (empty to include everything)
+        exclude_patterns: Patterns of paths to leave out, taking precedence over includes
+
+    Returns:
+        A FileFilter whose match_file() is true for paths to keep
+    """
+    return FileFilter(tuple(include_patterns), tuple(exclude_patterns))
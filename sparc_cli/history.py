@@ -0,0 +1,143 @@
+"""Compaction of the conversation history agents keep in their checkpoints.
+
+An agent that is run again on the same thread, like the chat agent, sends
+the whole history to the model on every turn. Once the history grows past
+a token limit, compact_history() shrinks it in the checkpoint:
+
+1. Outputs of tool calls outside the recent turns are replaced with a short
+   note, oldest first. Tool outputs (file contents, search results, command
+   output) are usually most of the history and rarely needed again.
+2. If that is not enough, the oldest turns are removed entirely.
+
+Recent turns are always kept verbatim. Turns start at a human message, so
+a tool call is never separated from its result.
+"""
+
+import json
+from typing import Any, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from sparc_cli.text.tokens import estimate_tokens
+
+ELIDED_TOOL_OUTPUT = "[Output of {name} removed from the history to save context (about {tokens} tokens)]"
+
+# Tool outputs smaller than this are not worth replacing
+MIN_ELIDED_TOKENS = 100
+
+def message_tokens(message: BaseMessage) -> int:
+    """Estimate the tokens a message takes up in a prompt, including tool call arguments."""
+    content = message.content
+    if isinstance(content, str):
+        tokens = estimate_tokens(content)
+    else:
+        # List of content blocks
+        tokens = sum(
+            estimate_tokens(block if isinstance(block, str) else block.get('text') or json.dumps(block, default=str))
+            for block in content
+        )
+    for tool_call in getattr(message, 'tool_calls', None) or []:
+        tokens += estimate_tokens(json.dumps(tool_call.get('args', {}), default=str))
+    return tokens
+
+def _turn_starts(messages: List[BaseMessage]) -> List[int]:
+    """Get the indices of the human messages that start each turn."""
+    return [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+
+def plan_history_compaction(
+    messages: List[BaseMessage],
+    max_tokens: int,
+    keep_recent_tokens: Optional[int] = None
+) -> List[BaseMessage]:
+    """Work out the changes that bring a history within a token limit.
+
+    Args:
+        messages: The conversation history
+        max_tokens: Estimated tokens the history may take up
+        keep_recent_tokens: Tokens of the latest turns to always keep verbatim
+            (defaults to half of max_tokens). The last turn is kept regardless.
+
+    Returns:
+        Messages to apply to the history with the add_messages reducer:
+        replacements for elided tool outputs and RemoveMessages for dropped
+        turns. Empty if the history already fits.
+    """
+    sizes = [message_tokens(message) for message in messages]
+    total = sum(sizes)
+    if total <= max_tokens:
+        return []
+
+    if keep_recent_tokens is None:
+        keep_recent_tokens = max_tokens // 2
+
+    # The recent window starts at a turn boundary, so tool calls keep their results
+    starts = _turn_starts(messages)
+    if not starts:
+        return []
+    recent_start = starts[-1]
+    for start in reversed(starts[:-1]):
+        if sum(sizes[start:]) > keep_recent_tokens:
+            break
+        recent_start = start
+
+    updates = []
+
+    # First replace old tool outputs, oldest first
+    for i in range(recent_start):
+        if total <= max_tokens:
+            return updates
+        message = messages[i]
+        if not isinstance(message, ToolMessage) or sizes[i] < MIN_ELIDED_TOKENS:
+            continue
+        note = ELIDED_TOOL_OUTPUT.format(name=message.name or 'tool', tokens=sizes[i])
+        updates.append(message.model_copy(update={'content': note}))
+        total -= sizes[i] - estimate_tokens(note)
+        sizes[i] = estimate_tokens(note)
+
+    # Then drop whole turns, oldest first. Messages before the first human
+    # message (e.g. a system message) are kept.
+    dropped = set()
+    for turn, start in enumerate(starts):
+        if total <= max_tokens or start >= recent_start:
+            break
+        end = starts[turn + 1]
+        for i in range(start, end):
+            dropped.add(messages[i].id)
+            total -= sizes[i]
+
+    updates = [message for message in updates if message.id not in dropped]
+    updates.extend(RemoveMessage(id=message_id) for message_id in sorted(dropped))
+    return updates
+
+def compact_history(agent: Any, config: dict, max_tokens: int, keep_recent_tokens: Optional[int] = None) -> int:
+    """Compact the history saved in an agent's checkpoint, see plan_history_compaction.
+
+    Args:
+        agent: The compiled agent, which must have a checkpointer
+        config: The run configuration holding the thread ID
+        max_tokens: Estimated tokens the history may take up
+        keep_recent_tokens: Tokens of the latest turns to always keep verbatim
+
+    Returns:
+        Number of messages replaced or removed
+    """
+    state = agent.get_state(config)
+    if state.next:
+        # Never rewrite a run that is still in progress
+        return 0
+    messages = state.values.get('messages', []) if state.values else []
+    updates = plan_history_compaction(messages, max_tokens, keep_recent_tokens)
+    if updates:
+        agent.update_state(config, {'messages': updates})
+    return len(updates)
+
+async def acompact_history(agent: Any, config: dict, max_tokens: int, keep_recent_tokens: Optional[int] = None) -> int:
+    """Async version of compact_history."""
+    state = await agent.aget_state(config)
+    if state.next:
+        return 0
+    messages = state.values.get('messages', []) if state.values else []
+    updates = plan_history_compaction(messages, max_tokens, keep_recent_tokens)
+    if updates:
+        await agent.aupdate_state(config, {'messages': updates})
+    return len(updates)
@@ -1,11 +1,48 @@
 import os
+import threading
+from typing import Any, Dict, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_core.language_models import BaseChatModel
+from sparc_cli.rate_limit import get_rate_limiter, RateLimitUsageCallback
+
+# Clients shared across agents, keyed by client class and constructor arguments
+_client_pool: Dict[Tuple, BaseChatModel] = {}
+_client_pool_lock = threading.Lock()
+
+def _pooled_client(client_class: Any, provider: str, **kwargs: Any) -> BaseChatModel:
+    """Get a shared client instance, creating it on first use.
+
+    Each client owns its HTTP connection pool, so handing out one instance
+    per (client class, model, base URL, API key) lets agents and sub-agents
+    reuse open keep-alive connections instead of paying connection and TLS
+    setup on every spawn. The API key is part of the key so rotating it
+    creates a fresh client.
+
+    If rate limits are configured, the client waits on the limiter shared by
+    all clients of the same provider API key.
+    """
+    rate_limiter = get_rate_limiter(provider, kwargs.get('api_key'))
+    key = (client_class, rate_limiter, tuple(sorted(kwargs.items())))
+    with _client_pool_lock:
+        client = _client_pool.get(key)
+        if client is None:
+            if rate_limiter is not None:
+                kwargs.update(rate_limiter=rate_limiter, callbacks=[RateLimitUsageCallback(rate_limiter)])
+            client = _client_pool[key] = client_class(**kwargs)
+    return client
+
+def clear_llm_pool() -> None:
+    """Drop all pooled clients, e.g. after changing API keys or endpoints."""
+    with _client_pool_lock:
+        _client_pool.clear()
 
 def initialize_llm(provider: str, model_name: str) -> BaseChatModel:
     """Initialize a language model client based on the specified provider and model.
 
+    Clients are pooled: repeated calls with the same provider, model and
+    credentials return the same shared instance.
+
     Note: Environment variables must be validated before calling this function.
     Use validate_environment() to ensure all required variables are set.
 
@@ -20,23 +57,31 @@ def initialize_llm(provider: str, model_name: str) -> BaseChatModel:
         ValueError: If the provider is not supported
     """
     if provider == "openai":
-        return ChatOpenAI(
+        return _pooled_client(
+            ChatOpenAI,
+            provider,
             api_key=os.getenv("OPENAI_API_KEY"),
             model=model_name,
         )
     elif provider == "anthropic":
-        return ChatAnthropic(
+        return _pooled_client(
+            ChatAnthropic,
+            provider,
             api_key=os.getenv("ANTHROPIC_API_KEY"),
             model_name=model_name,
         )
     elif provider == "openrouter":
-        return ChatOpenAI(
+        return _pooled_client(
+            ChatOpenAI,
+            provider,
             api_key=os.getenv("OPENROUTER_API_KEY"),
             base_url="https://openrouter.ai/api/v1",
             model=model_name,
         )
     elif provider == "openai-compatible":
-        return ChatOpenAI(
+        return _pooled_client(
+            ChatOpenAI,
+            provider,
             api_key=os.getenv("OPENAI_API_KEY"),
             base_url=os.getenv("OPENAI_API_BASE"),
             model=model_name,
@@ -47,6 +92,8 @@ def initialize_llm(provider: str, model_name: str) -> BaseChatModel:
 def initialize_expert_llm(provider: str = "openai", model_name: str = "o1-preview") -> BaseChatModel:
     """Initialize an expert language model client based on the specified provider and model.
 
+    Clients are pooled like those returned by initialize_llm().
+
     Note: Environment variables must be validated before calling this function.
     Use validate_environment() to ensure all required variables are set.
 
@@ -62,23 +109,31 @@ def initialize_expert_llm(provider: str = "openai", model_name: str = "o1-previe
         ValueError: If the provider is not supported
     """
     if provider == "openai":
-        return ChatOpenAI(
+        return _pooled_client(
+            ChatOpenAI,
+            provider,
             api_key=os.getenv("EXPERT_OPENAI_API_KEY"),
             model=model_name,
         )
     elif provider == "anthropic":
-        return ChatAnthropic(
+        return _pooled_client(
+            ChatAnthropic,
+            provider,
             api_key=os.getenv("EXPERT_ANTHROPIC_API_KEY"),
             model_name=model_name,
         )
     elif provider == "openrouter":
-        return ChatOpenAI(
+        return _pooled_client(
+            ChatOpenAI,
+            provider,
             api_key=os.getenv("EXPERT_OPENROUTER_API_KEY"),
             base_url="https://openrouter.ai/api/v1",
             model=model_name,
         )
     elif provider == "openai-compatible":
-        return ChatOpenAI(
+        return _pooled_client(
+            ChatOpenAI,
+            provider,
             api_key=os.getenv("EXPERT_OPENAI_API_KEY"),
             base_url=os.getenv("EXPERT_OPENAI_API_BASE"),
             model=model_name,
@@ -1,26 +1,224 @@
 """
 Module for running interactive subprocesses with output capture.
+
+Commands run on a pseudo-terminal, so they behave as they would for a user
+(colors, progress output, line buffering). Their output is echoed to the
+terminal as it arrives and captured at the same time, with ANSI escape
+sequences and control characters stripped chunk by chunk. Optional time and
+output limits kill commands that run away.
+
+Commands run in their own session, so a Ctrl-C on our terminal does not
+reach them directly. SIGINT handlers that only record the interrupt, like
+the one installed during agent runs, call interrupt_commands() to pass it on.
 """
 
+import fcntl
 import os
+import pty
 import re
-import tempfile
-import shlex
+import select
 import shutil
-from typing import List, Tuple
+import signal
+import subprocess
+import sys
+import termios
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sparc_cli.text.processing import OutputTruncator
+
+# Bytes read from the pseudo-terminal at a time
+READ_SIZE = 65536
+
+# Bytes of cleaned output kept in memory, half from the start of the output
+# and half from the end
+MAX_CAPTURE_BYTES = 8 * 1024 * 1024
+
+# Seconds to wait for more output after the command exited, which background
+# processes started by the command may still be writing
+EXIT_DRAIN_TIMEOUT = 0.05
+
+# Longest incomplete escape sequence held back until the next chunk
+MAX_PENDING_ESCAPE = 256
+
+# Seconds an interrupted command has to exit before it is killed
+INTERRUPT_GRACE = 2.0
+
+INTERRUPTED_NOTE = "Command interrupted by the user"
+
+_ESCAPE_SEQUENCE = re.compile(
+    rb'\x1b(?:'
+    rb'\[[0-?]*[ -/]*[@-~]'            # CSI, e.g. colors and cursor movement
+    rb'|\][^\x07\x1b]*(?:\x07|\x1b\\)'  # OSC, e.g. window titles
+    rb'|[ -/]*[0-~]'                    # Other escapes
+    rb')'
+)
+_INCOMPLETE_ESCAPE = re.compile(rb'\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?|[ -/]*)\Z')
+_CONTROL_CHARS = re.compile(rb'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class AnsiStripper:
+    """Removes ANSI escape sequences and control characters from a byte stream.
+
+    An escape sequence split across chunks is held back until the rest of it
+    arrives, so output can be cleaned as it is read.
+    """
+
+    def __init__(self):
+        self._pending = b''
+
+    def feed(self, data: bytes) -> bytes:
+        """Clean the next chunk of output."""
+        data = self._pending + data
+        incomplete = _INCOMPLETE_ESCAPE.search(data, max(0, len(data) - MAX_PENDING_ESCAPE))
+        if incomplete:
+            self._pending = data[incomplete.start():]
+            data = data[:incomplete.start()]
+        else:
+            self._pending = b''
+        return _clean(data)
+
+    def flush(self) -> bytes:
+        """Clean what is left at the end of the output."""
+        data, self._pending = self._pending, b''
+        return _clean(data)
+
+
+def _clean(data: bytes) -> bytes:
+    return _CONTROL_CHARS.sub(b'', _ESCAPE_SEQUENCE.sub(b'', data))
+
+
+def _open_pty() -> Tuple[int, int]:
+    """Open a pseudo-terminal sized like ours, without echo or CRLF translation."""
+    master, slave = pty.openpty()
+    attrs = termios.tcgetattr(slave)
+    # Keep "\n" line endings in the captured output
+    attrs[1] &= ~termios.ONLCR
+    # Input forwarded from our terminal was already echoed by it
+    attrs[3] &= ~termios.ECHO
+    termios.tcsetattr(slave, termios.TCSANOW, attrs)
+    if sys.stdout.isatty():
+        try:
+            size = fcntl.ioctl(sys.stdout.fileno(), termios.TIOCGWINSZ, b'\0' * 8)
+            fcntl.ioctl(slave, termios.TIOCSWINSZ, size)
+        except OSError:
+            pass
+    return master, slave
+
+
+def _echo(data: bytes) -> None:
+    """Show raw command output on our terminal."""
+    stream = getattr(sys.stdout, 'buffer', None)
+    if stream is not None:
+        stream.write(data)
+    else:
+        sys.stdout.write(data.decode(errors='replace'))
+    sys.stdout.flush()
+
+
+def _stdin_fd() -> Optional[int]:
+    """Get the file descriptor of our terminal input, if any, to forward to the command."""
+    try:
+        return sys.stdin.fileno() if sys.stdin.isatty() else None
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """Kill a command and everything it started."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    process.wait()
 
 
-def run_interactive_command(cmd: List[str]) -> Tuple[bytes, int]:
+# Interrupt requests of the commands running now, one per command
+_interrupt_requests: Set[threading.Event] = set()
+
+
+def interrupt_commands() -> None:
+    """Interrupt every running command, as a Ctrl-C would.
+
+    Safe to call from a signal handler.
+    """
+    for request in list(_interrupt_requests):
+        request.set()
+
+
+@contextmanager
+def _interruptible() -> Iterator[threading.Event]:
+    """Register an interrupt request for the duration of a command."""
+    request = threading.Event()
+    _interrupt_requests.add(request)
+    try:
+        yield request
+    finally:
+        _interrupt_requests.discard(request)
+
+
+class _InterruptHandler:
+    """Passes an interrupt request on to a command's process group.
+
+    The command first gets SIGINT, so it can stop cleanly, and is reported
+    as stuck if it is still running INTERRUPT_GRACE seconds later.
+    """
+
+    def __init__(self, request: threading.Event):
+        self.request = request
+        self.interrupted_at: Optional[float] = None
+
+    @property
+    def interrupted(self) -> bool:
+        return self.interrupted_at is not None
+
+    def check(self, process: subprocess.Popen) -> bool:
+        """Signal the command if an interrupt was requested; returns whether it is stuck."""
+        if self.interrupted_at is None:
+            if self.request.is_set():
+                self.interrupted_at = time.monotonic()
+                try:
+                    os.killpg(process.pid, signal.SIGINT)
+                except OSError:
+                    pass
+            return False
+        return time.monotonic() - self.interrupted_at > INTERRUPT_GRACE
+
+
+def run_interactive_command(
+    cmd: List[str],
+    timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    max_lines: Optional[int] = None,
+    truncator: Optional[OutputTruncator] = None
+) -> Tuple[bytes, int]:
     """
     Runs an interactive command with a pseudo-tty, capturing combined output.
 
     Assumptions and constraints:
-    - We are on a Linux system with script available
+    - We are on a POSIX system with pseudo-terminal support
     - `cmd` is a non-empty list where cmd[0] is the executable
-    - The executable and script are assumed to be on PATH
+    - The executable is assumed to be on PATH
     - If anything is amiss (e.g., command not found), we fail early and cleanly
 
-    The output is cleaned to remove ANSI escape sequences and control characters.
+    The output is echoed to the terminal while it runs, and the captured copy
+    is cleaned of ANSI escape sequences and control characters. It is fed to
+    a truncator as it streams in, which by default keeps MAX_CAPTURE_BYTES
+    from the start and the end of the output.
+
+    Args:
+        cmd: The command and its arguments
+        timeout: Seconds the command may run
+        max_bytes: Bytes of cleaned output the command may write
+        max_lines: Lines of output the command may write
+        truncator: Keeps the part of the output to return
+
+    If a limit is exceeded, the command and every process in its process
+    group are killed, and a note saying which limit was hit is appended to
+    the output. interrupt_commands() sends it SIGINT, and kills it if it
+    does not exit within INTERRUPT_GRACE seconds.
 
     Returns:
         Tuple of (cleaned_output, return_code)
@@ -28,55 +226,114 @@ def run_interactive_command(cmd: List[str]) -> Tuple[bytes, int]:
     # Fail early if cmd is empty
     if not cmd:
         raise ValueError("No command provided.")
-    
+
     # Check that the command exists
     if shutil.which(cmd[0]) is None:
         raise FileNotFoundError(f"Command '{cmd[0]}' not found in PATH.")
 
-    # Create temp files (we'll always clean them up)
-    output_file = tempfile.NamedTemporaryFile(prefix="output_", delete=False)
-    retcode_file = tempfile.NamedTemporaryFile(prefix="retcode_", delete=False)
-    output_path = output_file.name
-    retcode_path = retcode_file.name
-    output_file.close()
-    retcode_file.close()
-
-    # Quote arguments for safety
-    quoted_cmd = ' '.join(shlex.quote(c) for c in cmd)
-    # Use script to capture output with TTY and save return code
-    shell_cmd = f"{quoted_cmd}; echo $? > {shlex.quote(retcode_path)}"
-
-    def cleanup():
-        for path in [output_path, retcode_path]:
-            if os.path.exists(path):
-                os.remove(path)
+    # Disable pagers, which would wait for input
+    env = dict(os.environ, GIT_PAGER='', PAGER='')
 
+    master, slave = _open_pty()
     try:
-        # Disable pagers by setting environment variables
-        os.environ['GIT_PAGER'] = ''
-        os.environ['PAGER'] = ''
-        
-        # Run command with script for TTY and output capture
-        os.system(f"script -q -c {shlex.quote(shell_cmd)} {shlex.quote(output_path)}")
-
-        # Read and clean the output
-        with open(output_path, "rb") as f:
-            output = f.read()
-        
-        # Clean ANSI escape sequences and control characters
-        output = re.sub(rb'\x1b\[[0-9;]*[a-zA-Z]', b'', output)  # ANSI escape sequences
-        output = re.sub(rb'[\x00-\x08\x0b\x0c\x0e-\x1f]', b'', output)  # Control chars
-        
-        # Get the return code
-        with open(retcode_path, "r") as f:
-            return_code = int(f.read().strip())
-
-    except Exception as e:
-        # If something goes wrong, cleanup and re-raise
-        cleanup()
-        raise RuntimeError("Error running interactive capture") from e
+        try:
+            process = subprocess.Popen(
+                cmd, stdin=slave, stdout=slave, stderr=slave,
+                env=env, start_new_session=True
+            )
+        except OSError as e:
+            raise RuntimeError("Error running interactive capture") from e
+        finally:
+            # The command holds the only other copy, so reads end when it exits
+            os.close(slave)
+
+        stripper = AnsiStripper()
+        if truncator is None:
+            half = MAX_CAPTURE_BYTES // 2
+            truncator = OutputTruncator(head_lines=None, tail_lines=None, head_bytes=half, tail_bytes=half)
+        with _interruptible() as request:
+            interrupt = _InterruptHandler(request)
+            try:
+                limit_note = _read_command_output(
+                    process, master, stripper, truncator, timeout, max_bytes, max_lines, interrupt
+                )
+            except BaseException:
+                _kill(process)
+                raise
+        if limit_note:
+            _kill(process)
+        elif interrupt.interrupted:
+            limit_note = INTERRUPTED_NOTE
+        truncator.feed(stripper.flush())
+        return_code = process.wait()
     finally:
-        # Ensure files are removed no matter what
-        cleanup()
+        os.close(master)
+
+    # Report commands killed by a signal like a shell does
+    if return_code < 0:
+        return_code = 128 - return_code
 
+    output = truncator.getvalue()
+    if limit_note:
+        if output and not output.endswith(b'\n'):
+            output += b'\n'
+        output += f"[{limit_note}]\n".encode()
     return output, return_code
+
+
+def _read_command_output(
+    process: subprocess.Popen,
+    master: int,
+    stripper: AnsiStripper,
+    truncator: OutputTruncator,
+    timeout: Optional[float],
+    max_bytes: Optional[int],
+    max_lines: Optional[int],
+    interrupt: _InterruptHandler
+) -> Optional[str]:
+    """Echo and capture a command's output until it ends or hits a limit.
+
+    Returns:
+        A note saying which limit was hit, or None if the command ended
+    """
+    stdin_fd = _stdin_fd()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    total_bytes = total_lines = 0
+    while True:
+        if interrupt.check(process):
+            return f"{INTERRUPTED_NOTE}; it did not stop within {INTERRUPT_GRACE:g} seconds and was killed"
+        exited = process.poll() is not None
+        wait = EXIT_DRAIN_TIMEOUT if exited else 0.1
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return f"Command timed out after {timeout:g} seconds and was killed"
+            wait = min(wait, remaining)
+        watched = [master] if stdin_fd is None else [master, stdin_fd]
+        ready, _, _ = select.select(watched, [], [], wait)
+        if stdin_fd is not None and stdin_fd in ready:
+            data = os.read(stdin_fd, READ_SIZE)
+            if data:
+                os.write(master, data)
+            else:
+                stdin_fd = None
+        if master not in ready:
+            if exited:
+                return None
+            continue
+        try:
+            data = os.read(master, READ_SIZE)
+        except OSError:
+            # EIO: every process using the terminal closed it
+            data = b''
+        if not data:
+            return None
+        _echo(data)
+        cleaned = stripper.feed(data)
+        truncator.feed(cleaned)
+        total_bytes += len(cleaned)
+        total_lines += cleaned.count(b'\n')
+        if max_bytes is not None and total_bytes > max_bytes:
+            return f"Command killed after writing more than {max_bytes} bytes of output"
+        if max_lines is not None and total_lines > max_lines:
+            return f"Command killed after writing more than {max_lines} lines of output"
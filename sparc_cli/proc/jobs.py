@@ -0,0 +1,289 @@
+"""
+Background jobs: shell commands that run while the agent goes on working.
+
+Each job runs on its own pseudo-terminal, like run_interactive_command, but
+nothing is echoed and nothing waits for it. A reader thread strips ANSI
+escapes from its output and spools it to a ring file on disk of fixed
+size, so a job can write any amount of output while only its most recent
+part is kept for polling. Once a job ends its ring file is closed, and
+only the most recent finished jobs are kept.
+"""
+
+import atexit
+import os
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from sparc_cli.proc.interactive import EXIT_DRAIN_TIMEOUT, READ_SIZE, AnsiStripper, _kill, _open_pty
+
+# Bytes of the most recent output kept on disk for each job
+DEFAULT_JOB_OUTPUT_BYTES = 1024 * 1024
+
+# Maximum number of jobs running at the same time
+MAX_RUNNING_JOBS = 4
+
+# Bytes read from the end of a job's output to find its last lines
+MAX_TAIL_BYTES = 32 * 1024
+
+# Number of finished jobs kept; older ones are forgotten and their output removed
+MAX_FINISHED_JOBS = 16
+
+
+class RingFile:
+    """A file of fixed capacity holding the most recent bytes written to it.
+
+    After close() no more can be written, but the file can still be read.
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_JOB_OUTPUT_BYTES):
+        self.path = path
+        self.capacity = capacity
+        self.written = 0
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = open(path, 'w+b')
+
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            total = len(data)
+            if total > self.capacity:
+                # Only the end of the data fits; it is placed where writing it all would have left it
+                self.written += total - self.capacity
+                data = data[-self.capacity:]
+            position = self.written % self.capacity
+            first = min(len(data), self.capacity - position)
+            self._file.seek(position)
+            self._file.write(data[:first])
+            if first < len(data):
+                self._file.seek(0)
+                self._file.write(data[first:])
+            self.written += len(data)
+
+    def read_tail(self, size: int) -> bytes:
+        """Read up to size of the most recently written bytes."""
+        with self._lock:
+            size = min(size, self.written, self.capacity)
+            if size <= 0:
+                return b''
+            if self._file is not None:
+                return self._read(self._file, size)
+            try:
+                with open(self.path, 'rb') as file:
+                    return self._read(file, size)
+            except OSError:
+                # The file was removed
+                return b''
+
+    def _read(self, file: BinaryIO, size: int) -> bytes:
+        end = self.written % self.capacity
+        start = (end - size) % self.capacity
+        file.seek(start)
+        if start + size <= self.capacity:
+            return file.read(size)
+        data = file.read(self.capacity - start)
+        file.seek(0)
+        return data + file.read(end)
+
+    def close(self) -> None:
+        """Close the file for writing."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        """Close and delete the file."""
+        self.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class BackgroundJob:
+    """A shell command running in the background with its output spooled to a ring file."""
+
+    def __init__(self, job_id: str, command: str, output_path: str, output_bytes: int = DEFAULT_JOB_OUTPUT_BYTES):
+        self.job_id = job_id
+        self.command = command
+        self.output = RingFile(output_path, output_bytes)
+        self.output_lines = 0
+        self.return_code: Optional[int] = None
+        self.killed = False
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+
+        master, slave = _open_pty()
+        try:
+            self._process = subprocess.Popen(
+                ['/bin/bash', '-c', command],
+                stdin=subprocess.DEVNULL, stdout=slave, stderr=slave,
+                env=dict(os.environ, GIT_PAGER='', PAGER=''),
+                start_new_session=True
+            )
+        except OSError:
+            os.close(master)
+            self.output.close()
+            raise
+        finally:
+            os.close(slave)
+        self._reader = threading.Thread(target=self._read_output, args=(master,), daemon=True)
+        self._reader.start()
+
+    @property
+    def running(self) -> bool:
+        return self.ended_at is None
+
+    def _read_output(self, master: int) -> None:
+        stripper = AnsiStripper()
+        try:
+            while True:
+                exited = self._process.poll() is not None
+                ready, _, _ = select.select([master], [], [], EXIT_DRAIN_TIMEOUT if exited else 0.1)
+                if not ready:
+                    if exited:
+                        break
+                    continue
+                try:
+                    data = os.read(master, READ_SIZE)
+                except OSError:
+                    data = b''
+                if not data:
+                    break
+                self._write(stripper.feed(data))
+            self._write(stripper.flush())
+        finally:
+            os.close(master)
+            self.output.close()
+            return_code = self._process.wait()
+            self.return_code = 128 - return_code if return_code < 0 else return_code
+            self.ended_at = time.time()
+
+    def _write(self, data: bytes) -> None:
+        if data:
+            self.output.write(data)
+            self.output_lines += data.count(b'\n')
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the job to end and its output to be spooled; returns whether it ended."""
+        self._reader.join(timeout)
+        return not self._reader.is_alive()
+
+    def kill(self) -> None:
+        """Kill the job and every process it started."""
+        if self.running:
+            _kill(self._process)
+            # The job may have exited on its own just before the signal
+            self.killed = self._process.returncode == -signal.SIGKILL
+            self.wait()
+
+    def tail(self, lines: int = 50) -> str:
+        """Get the last lines of the job's output kept so far."""
+        data = self.output.read_tail(MAX_TAIL_BYTES)
+        if len(data) < self.output.written and b'\n' in data:
+            # The first line is cut off
+            data = data[data.index(b'\n') + 1:]
+        kept = data.split(b'\n')
+        if kept and kept[-1] == b'':
+            kept.pop()
+        return b'\n'.join(kept[-lines:]).decode('utf-8', errors='replace') if lines > 0 else ''
+
+    def status(self) -> Dict[str, Any]:
+        """Describe the state of the job."""
+        if self.running:
+            state = 'running'
+        else:
+            state = 'killed' if self.killed else 'exited'
+        return {
+            "job_id": self.job_id,
+            "command": self.command,
+            "status": state,
+            "return_code": self.return_code,
+            "runtime_seconds": round((self.ended_at or time.time()) - self.started_at, 1),
+            "output_bytes": self.output.written,
+            "output_lines": self.output_lines
+        }
+
+
+class JobManager:
+    """Starts background jobs and finds them by ID."""
+
+    def __init__(self, output_bytes: int = DEFAULT_JOB_OUTPUT_BYTES, max_running: int = MAX_RUNNING_JOBS):
+        self.output_bytes = output_bytes
+        self.max_running = max_running
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, BackgroundJob] = {}
+        self._next_id = 1
+        self._spool_dir: Optional[str] = None
+
+    def start(self, command: str) -> BackgroundJob:
+        """Start a command in the background.
+
+        Raises:
+            RuntimeError: If max_running jobs are already running
+        """
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.running)
+            if running >= self.max_running:
+                raise RuntimeError(
+                    f"{running} background jobs are already running; wait for one to finish or kill one first"
+                )
+            self._prune()
+            if self._spool_dir is None:
+                self._spool_dir = tempfile.mkdtemp(prefix='sparc_jobs_')
+            job_id = f"job-{self._next_id}"
+            self._next_id += 1
+            job = BackgroundJob(job_id, command, os.path.join(self._spool_dir, f"{job_id}.log"), self.output_bytes)
+            self._jobs[job_id] = job
+            return job
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS and remove their output."""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.running]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            self._jobs.pop(job_id).output.remove()
+
+    def get(self, job_id: str) -> BackgroundJob:
+        """Find a job by ID.
+
+        Raises:
+            ValueError: If there is no such job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown background job: {job_id}")
+        return job
+
+    def jobs(self) -> List[BackgroundJob]:
+        """Get all jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self) -> None:
+        """Kill running jobs and remove their output files."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            spool_dir, self._spool_dir = self._spool_dir, None
+        for job in jobs:
+            job.kill()
+            job.output.close()
+        if spool_dir is not None:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+_job_manager = JobManager()
+
+
+def get_job_manager() -> JobManager:
+    """Get the job manager shared by the background job tools."""
+    return _job_manager
+
+
+atexit.register(_job_manager.shutdown)
@@ -0,0 +1,281 @@
+"""
+Long-lived shell sessions that run one command after another.
+
+A session is a bash process whose output goes to a pseudo-terminal, like
+commands run by run_interactive_command, but which reads commands from a
+pipe. Each command is followed by a printf of a random marker and the
+command's exit code, so the end of its output can be recognized without
+the shell exiting. The working directory, variables, activated virtualenvs
+and so on carry over from one command to the next.
+"""
+
+import atexit
+import os
+import select
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sparc_cli.proc.interactive import (
+    INTERRUPT_GRACE,
+    INTERRUPTED_NOTE,
+    MAX_CAPTURE_BYTES,
+    READ_SIZE,
+    AnsiStripper,
+    _echo,
+    _interruptible,
+    _InterruptHandler,
+    _kill,
+    _open_pty
+)
+from sparc_cli.text.processing import OutputTruncator
+
+# Number of sessions kept open; the least recently used one is closed beyond it
+MAX_SHELL_SESSIONS = 8
+
+SESSION_RESTARTED_NOTE = "The shell session was restarted, so its working directory and environment were reset"
+
+
+class ShellSession:
+    """A bash process running commands one at a time, keeping its state between them."""
+
+    def __init__(self, shell: str = '/bin/bash'):
+        self.shell = shell
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._master: Optional[int] = None
+        self._marker = f"__sparc_done_{uuid.uuid4().hex}__".encode()
+
+    @property
+    def busy(self) -> bool:
+        """Whether a command is running in the session."""
+        return self._lock.locked()
+
+    @property
+    def alive(self) -> bool:
+        """Whether the shell process is running."""
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self) -> None:
+        # Commands come from a pipe, so bash does not run as an interactive shell
+        # with prompts and job control; their output still goes to a terminal
+        master, slave = _open_pty()
+        try:
+            self._process = subprocess.Popen(
+                [self.shell, '--noprofile', '--norc'],
+                stdin=subprocess.PIPE, stdout=slave, stderr=slave,
+                env=dict(os.environ, GIT_PAGER='', PAGER=''),
+                start_new_session=True
+            )
+        except OSError:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        self._master = master
+        # Survive an interrupt of the running command; the command itself
+        # still gets the default SIGINT behavior
+        self._process.stdin.write(b"trap : INT\n")
+        self._process.stdin.flush()
+
+    def close(self) -> None:
+        """Kill the shell and everything it started."""
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._process is not None:
+            _kill(self._process)
+            self._process.stdin.close()
+            self._process = None
+        if self._master is not None:
+            os.close(self._master)
+            self._master = None
+
+    def run(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        max_lines: Optional[int] = None,
+        truncator: Optional[OutputTruncator] = None
+    ) -> Tuple[bytes, int]:
+        """Run a command in the session, see run_interactive_command.
+
+        The command reads no input. If it exceeds a limit, the whole session
+        is killed and the next command starts a new one, which the note
+        appended to the output says. An interrupt sends SIGINT to the
+        command, and the session keeps running.
+
+        Returns:
+            Tuple of (cleaned_output, return_code)
+        """
+        with self._lock:
+            if not self.alive:
+                self._close()
+                self._start()
+            script = (
+                f"eval {shlex.quote(command)} < /dev/null\n"
+                f"printf '\\n%s %d\\n' {self._marker.decode()} \"$?\"\n"
+            )
+            try:
+                self._process.stdin.write(script.encode())
+                self._process.stdin.flush()
+            except BrokenPipeError:
+                # The shell exited since the last check; read what it printed
+                pass
+            try:
+                with _interruptible() as request:
+                    interrupt = _InterruptHandler(request)
+                    return self._read_result(timeout, max_bytes, max_lines, truncator, interrupt)
+            except BaseException:
+                self._close()
+                raise
+
+    def _read_result(
+        self,
+        timeout: Optional[float],
+        max_bytes: Optional[int],
+        max_lines: Optional[int],
+        truncator: Optional[OutputTruncator],
+        interrupt: _InterruptHandler
+    ) -> Tuple[bytes, int]:
+        """Collect the output of the command just sent, up to the marker line."""
+        if truncator is None:
+            half = MAX_CAPTURE_BYTES // 2
+            truncator = OutputTruncator(head_lines=None, tail_lines=None, head_bytes=half, tail_bytes=half)
+        stripper = AnsiStripper()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        marker = b'\n' + self._marker
+        pending = b''
+        total_bytes = total_lines = 0
+        return_code = None
+        limit_note = None
+        exited = False
+
+        def emit(data: bytes) -> None:
+            nonlocal total_bytes, total_lines
+            if not data:
+                return
+            _echo(data)
+            cleaned = stripper.feed(data)
+            truncator.feed(cleaned)
+            total_bytes += len(cleaned)
+            total_lines += cleaned.count(b'\n')
+
+        while return_code is None:
+            if interrupt.check(self._process):
+                limit_note = f"{INTERRUPTED_NOTE}; it did not stop within {INTERRUPT_GRACE:g} seconds and was killed"
+                break
+            wait = 0.1
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    limit_note = f"Command timed out after {timeout:g} seconds and was killed"
+                    break
+                wait = min(wait, remaining)
+            ready, _, _ = select.select([self._master], [], [], wait)
+            if not ready:
+                if not self.alive:
+                    exited = True
+                    break
+                continue
+            try:
+                data = os.read(self._master, READ_SIZE)
+            except OSError:
+                data = b''
+            if not data:
+                exited = True
+                break
+
+            pending += data
+            found = pending.find(marker)
+            if found < 0:
+                # Hold back what may be the start of the marker
+                emit(pending[:-len(marker)])
+                pending = pending[-len(marker):]
+            else:
+                end = pending.find(b'\n', found + len(marker))
+                emit(pending[:found])
+                pending = pending[found:]
+                if end >= 0:
+                    return_code = int(pending[len(marker):end - found].strip() or 0)
+
+            if max_bytes is not None and total_bytes > max_bytes:
+                limit_note = f"Command killed after writing more than {max_bytes} bytes of output"
+                break
+            if max_lines is not None and total_lines > max_lines:
+                limit_note = f"Command killed after writing more than {max_lines} lines of output"
+                break
+
+        if return_code is None:
+            # The command was cut short or the shell exited; the session is done
+            if not pending.startswith(marker):
+                emit(pending)
+            process = self._process
+            self._close()
+            return_code = process.returncode
+            if return_code < 0:
+                return_code = 128 - return_code
+            if exited and interrupt.interrupted:
+                limit_note = f"{INTERRUPTED_NOTE}. {SESSION_RESTARTED_NOTE}"
+            elif exited:
+                limit_note = "The shell session exited; the next command starts a new one"
+            else:
+                limit_note += f". {SESSION_RESTARTED_NOTE}"
+        elif interrupt.interrupted:
+            limit_note = INTERRUPTED_NOTE
+        truncator.feed(stripper.flush())
+
+        output = truncator.getvalue()
+        if limit_note:
+            if output and not output.endswith(b'\n'):
+                output += b'\n'
+            output += f"[{limit_note}]\n".encode()
+        return output, return_code
+
+
+_sessions: "OrderedDict[str, ShellSession]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def get_shell_session(key: str) -> ShellSession:
+    """Get the shell session of an agent, identified by e.g. its thread ID."""
+    evicted = []
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = ShellSession()
+            # Evict the least recently used sessions not running a command;
+            # busy ones are left to their agents, even beyond the limit
+            idle = [old_key for old_key, old in _sessions.items() if old_key != key and not old.busy]
+            for old_key in idle[:max(len(_sessions) - MAX_SHELL_SESSIONS, 0)]:
+                evicted.append(_sessions.pop(old_key))
+        _sessions.move_to_end(key)
+    for old in evicted:
+        old.close()
+    return session
+
+
+def close_shell_session(key: str) -> None:
+    """Close the shell session of an agent whose thread is finished, if it has one."""
+    with _sessions_lock:
+        session = _sessions.pop(key, None)
+    if session is not None:
+        session.close()
+
+
+def close_shell_sessions() -> None:
+    """Close every shell session."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_shell_sessions)
@@ -60,6 +60,14 @@ Human Interaction:
     - Keep questions focused and context-aware
 """
 
+PARALLEL_PROMPT_SECTION_PLANNING = """
+Parallel Implementation:
+    Tasks that are independent of each other can be implemented at the same time:
+    - Use request_parallel_task_implementation with the specs of tasks that do not depend on each other's results
+    - Never run tasks in parallel that modify the same files
+    - Implement dependent tasks afterwards with request_task_implementation
+"""
+
 HUMAN_PROMPT_SECTION_IMPLEMENTATION = """
 Human Interaction:
     If you need implementation guidance:
@@ -560,6 +568,7 @@ Guidelines:
 
 {expert_section}
 {human_section}
+{parallel_section}
 
 You have often been criticized for:
   - Overcomplicating things.
@@ -0,0 +1,277 @@
+"""Client side rate limiting of LLM requests, shared by all agents.
+
+Limits are kept per provider API key as two token buckets: one for requests
+per minute and one for tokens per minute. Buckets live in memory, or in a
+SQLite database when several sparc processes on one host should share the
+same budget.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# Bucket state: (level, time of last update in seconds since the epoch)
+BucketState = Tuple[float, float]
+
+class MemoryBucketStore:
+    """Bucket states held in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, BucketState] = {}
+
+    def update(self, names: List[str], step: Callable[[Dict[str, Optional[BucketState]]], Tuple[Dict[str, BucketState], Any]]) -> Any:
+        """Atomically read, modify and write bucket states.
+
+        Args:
+            names: Buckets to update
+            step: Function given the current states (None for new buckets),
+                returning the new states and a result
+
+        Returns:
+            The result returned by step
+        """
+        with self._lock:
+            states, result = step({name: self._states.get(name) for name in names})
+            self._states.update(states)
+        return result
+
+class SQLiteBucketStore:
+    """Bucket states shared between processes through a SQLite database."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY,"
+            " level REAL NOT NULL,"
+            " updated REAL NOT NULL"
+            ")"
+        )
+
+    def update(self, names: List[str], step: Callable[[Dict[str, Optional[BucketState]]], Tuple[Dict[str, BucketState], Any]]) -> Any:
+        """Atomically read, modify and write bucket states, see MemoryBucketStore.update."""
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so processes cannot interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                placeholders = ", ".join("?" for _ in names)
+                rows = self._conn.execute(
+                    f"SELECT name, level, updated FROM buckets WHERE name IN ({placeholders})", names
+                ).fetchall()
+                current = {name: None for name in names}
+                current.update({name: (level, updated) for name, level, updated in rows})
+                states, result = step(current)
+                self._conn.executemany(
+                    "INSERT INTO buckets (name, level, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET level = excluded.level, updated = excluded.updated",
+                    [(name, level, updated) for name, (level, updated) in states.items()]
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return result
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+def _refill(state: Optional[BucketState], capacity: float, per_second: float, now: float) -> float:
+    """Get a bucket's level after refilling it up to now. New buckets start full."""
+    if state is None:
+        return capacity
+    level, updated = state
+    return min(capacity, level + max(now - updated, 0) * per_second)
+
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """Rate limiter enforcing requests and tokens per minute for one API key.
+
+    Each request takes one request token up front. Token usage is only known
+    once a response arrives, so it is debited afterwards by
+    RateLimitUsageCallback and may push the token bucket below zero; new
+    requests then wait until it has refilled. Both buckets hold at most one
+    minute's worth, which is the largest burst allowed.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        store: Optional[Any] = None,
+        clock: Callable[[], float] = time.time,
+        max_sleep: float = 1.0
+    ):
+        self.key = key
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.store = store if store is not None else MemoryBucketStore()
+        self._clock = clock
+        self._max_sleep = max_sleep
+
+    @property
+    def _names(self) -> List[str]:
+        return [f"{self.key}:requests", f"{self.key}:tokens"]
+
+    def try_acquire(self) -> float:
+        """Take one request if the limits allow it.
+
+        Returns:
+            0 if the request may be sent, otherwise seconds until it might be allowed
+        """
+        requests_name, tokens_name = self._names
+
+        def step(states):
+            now = self._clock()
+            new_states = {}
+            wait = 0.0
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60
+                requests = _refill(states[requests_name], self.requests_per_minute, rate, now)
+                if requests < 1:
+                    wait = max(wait, (1 - requests) / rate)
+                new_states[requests_name] = (requests, now)
+            if self.tokens_per_minute:
+                rate = self.tokens_per_minute / 60
+                tokens = _refill(states[tokens_name], self.tokens_per_minute, rate, now)
+                if tokens < 0:
+                    wait = max(wait, -tokens / rate)
+                new_states[tokens_name] = (tokens, now)
+            if wait == 0 and requests_name in new_states:
+                new_states[requests_name] = (new_states[requests_name][0] - 1, now)
+            return new_states, wait
+
+        return self.store.update(self._names, step)
+
+    def consume_tokens(self, tokens: int) -> None:
+        """Debit tokens used by a completed request."""
+        if not self.tokens_per_minute or tokens <= 0:
+            return
+        tokens_name = self._names[1]
+
+        def step(states):
+            now = self._clock()
+            level = _refill(states[tokens_name], self.tokens_per_minute, self.tokens_per_minute / 60, now)
+            return {tokens_name: (level - tokens, now)}, None
+
+        self.store.update([tokens_name], step)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """Wait until a request may be sent, see BaseRateLimiter.acquire."""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if not blocking:
+                return False
+            time.sleep(min(wait, self._max_sleep))
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        """Async version of acquire."""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(min(wait, self._max_sleep))
+
+def _total_tokens(response: LLMResult) -> int:
+    """Get the number of tokens a model response used, if reported."""
+    total = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+            if usage:
+                total += usage.get('total_tokens') or (usage.get('input_tokens', 0) + usage.get('output_tokens', 0))
+    if total:
+        return total
+
+    # Fall back to provider specific usage reports
+    llm_output = response.llm_output or {}
+    usage = llm_output.get('token_usage') or llm_output.get('usage') or {}
+    if isinstance(usage, dict):
+        return usage.get('total_tokens') or (usage.get('input_tokens', 0) + usage.get('output_tokens', 0))
+    return 0
+
+class RateLimitUsageCallback(BaseCallbackHandler):
+    """Debits the tokens used by each model response from a rate limiter."""
+
+    def __init__(self, limiter: TokenBucketRateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.limiter.consume_tokens(_total_tokens(response))
+
+@dataclass
+class RateLimitSettings:
+    """Limits applied to every provider API key."""
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    db_path: Optional[str] = None
+
+_settings = RateLimitSettings()
+_store: Optional[Any] = None
+_limiters: Dict[str, TokenBucketRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def configure_rate_limits(
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    db_path: Optional[str] = None
+) -> None:
+    """Set the limits used for clients created from now on.
+
+    Args:
+        requests_per_minute: Maximum requests per minute per API key (None for no limit)
+        tokens_per_minute: Maximum tokens per minute per API key (None for no limit)
+        db_path: SQLite database to share the budget with other processes
+            (None to keep it in this process)
+    """
+    global _settings, _store
+    with _limiters_lock:
+        _settings = RateLimitSettings(requests_per_minute, tokens_per_minute, db_path)
+        _store = SQLiteBucketStore(db_path) if db_path else MemoryBucketStore()
+        _limiters.clear()
+
+def get_rate_limiter(provider: str, api_key: Optional[str]) -> Optional[TokenBucketRateLimiter]:
+    """Get the shared rate limiter for a provider API key.
+
+    Args:
+        provider: The provider name, e.g. 'anthropic'
+        api_key: The API key requests are made with
+
+    Returns:
+        The limiter, or None if no limits are configured
+    """
+    with _limiters_lock:
+        if not (_settings.requests_per_minute or _settings.tokens_per_minute):
+            return None
+        # Keys are hashed so they are never written to the shared database
+        digest = hashlib.sha256((api_key or '').encode()).hexdigest()[:16]
+        key = f"{provider}:{digest}"
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = TokenBucketRateLimiter(
+                key,
+                requests_per_minute=_settings.requests_per_minute,
+                tokens_per_minute=_settings.tokens_per_minute,
+                store=_store
+            )
+        return limiter
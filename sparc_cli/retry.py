@@ -0,0 +1,167 @@
+"""Retry scheduling and circuit breaking for LLM API calls."""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import anthropic
+import openai
+
+# Errors worth retrying. Anthropic's APIError is kept as a whole because the
+# "prompt is too long" error is handled by shortening the prompt and retrying.
+RETRYABLE_ERRORS = (
+    anthropic.InternalServerError,
+    anthropic.APITimeoutError,
+    anthropic.RateLimitError,
+    anthropic.APIError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Get the delay a server asked for via retry-after headers, if any.
+
+    Args:
+        error: The API error, typically a RateLimitError
+
+    Returns:
+        Seconds to wait, or None if the error carries no usable header
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000, 0.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+@dataclass
+class RetryPolicy:
+    """Capped exponential backoff with jitter.
+
+    The delay before retry n is drawn uniformly between base_delay and
+    min(max_delay, base_delay * 2**n), so concurrent agents hitting the same
+    rate limit spread out instead of retrying in lockstep. A retry-after
+    header from the server takes precedence, up to max_retry_after.
+    """
+    max_attempts: int = 20
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    max_retry_after: float = 300.0
+    jitter: bool = True
+
+    def backoff(self, attempt: int) -> float:
+        """Get the backoff delay after the given (zero based) failed attempt."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** min(attempt, 32)))
+        if not self.jitter:
+            return ceiling
+        return random.uniform(min(self.base_delay, ceiling), ceiling)
+
+    def delay_for(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Get the delay before retrying after an error.
+
+        Args:
+            attempt: Zero based number of the attempt that failed
+            error: The error raised by the attempt
+
+        Returns:
+            Seconds to wait before the next attempt
+        """
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return self.backoff(attempt)
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+class CircuitBreaker:
+    """Stops all callers of a failing API for a while after repeated failures.
+
+    After failure_threshold consecutive failures the circuit opens and callers
+    are told to wait until reset_timeout has passed. A single trial call is
+    then let through (half open): success closes the circuit, failure opens
+    it again. Shared between agents, so parallel sub-agents back off together
+    instead of each discovering the outage on its own.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._changed_at = 0.0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def acquire(self) -> float:
+        """Ask to make a call.
+
+        Returns:
+            0 if the call may proceed, otherwise seconds to wait before asking again
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0.0
+            waited = self._clock() - self._changed_at
+            if waited >= self.reset_timeout:
+                # Let one trial call through; a trial that never reports back
+                # is replaced after another reset_timeout
+                self._state = self.HALF_OPEN
+                self._changed_at = self._clock()
+                return 0.0
+            return self.reset_timeout - waited
+
+    def record_success(self) -> None:
+        """Report a successful call, closing the circuit."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        """Report a failed call, opening the circuit if failures keep piling up."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._changed_at = self._clock()
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the shared circuit breaker for an API, e.g. per provider."""
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(name)
+        if breaker is None:
+            breaker = _circuit_breakers[name] = CircuitBreaker()
+        return breaker
@@ -0,0 +1,180 @@
+"""Cache of search tool results, valid while the repository is unchanged.
+
+Research agents often repeat the same ripgrep_search or
+fuzzy_find_project_files call. Results are cached under the search
+arguments and the state of the repository searched: its HEAD commit, the
+modification times of files git reports as changed or untracked, and a
+generation counter that tools writing files bump. Any edit, whether made by
+a tool, a shell command or the user, therefore gives new searches a fresh
+key. Outside a git repository nothing is cached.
+
+Computing the repository state runs git status, which costs more than many
+cached searches, so it is reused for REPO_STATE_TTL seconds or until the
+cache is invalidated. Edits made outside the tools may go unnoticed for
+that long.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Maximum number of search results kept
+SEARCH_CACHE_SIZE = 128
+
+# Seconds a repository state is reused before git status runs again
+REPO_STATE_TTL = 2.0
+
+_repo_roots: Dict[str, Optional[str]] = {}
+
+def _repo_root(path: str) -> Optional[str]:
+    """Get the root of the git working tree containing path (cached)."""
+    path = os.path.realpath(path)
+    if path not in _repo_roots:
+        try:
+            result = subprocess.run(
+                ['git', 'rev-parse', '--show-toplevel'],
+                cwd=path, capture_output=True, timeout=30
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        _repo_roots[path] = result.stdout.decode().strip() if result.returncode == 0 else None
+    return _repo_roots[path]
+
+def repo_state(path: str = ".") -> Optional[Tuple]:
+    """Get a fingerprint of a git working tree's contents.
+
+    Args:
+        path: Any path inside the repository
+
+    Returns:
+        Tuple of the searched path, HEAD commit and (path, mtime) of every
+        changed or untracked file, or None if path is not in a git repository
+    """
+    root = _repo_root(path)
+    if root is None:
+        return None
+    try:
+        result = subprocess.run(
+            ['git', 'status', '--porcelain=v2', '--branch', '--untracked-files=all', '-z'],
+            cwd=root, capture_output=True, timeout=30
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+
+    head = None
+    changed = []
+    entries = iter(result.stdout.decode('utf-8', errors='replace').split('\0'))
+    for entry in entries:
+        if entry.startswith('# branch.oid '):
+            head = entry[len('# branch.oid '):]
+        elif entry.startswith('1 '):
+            changed.append(entry.split(' ', 8)[-1])
+        elif entry.startswith('u '):
+            changed.append(entry.split(' ', 10)[-1])
+        elif entry.startswith('2 '):
+            changed.append(entry.split(' ', 9)[-1])
+            # Renames are followed by the original path
+            next(entries, None)
+        elif entry.startswith('? '):
+            changed.append(entry[2:])
+
+    mtimes = []
+    for changed_path in sorted(changed):
+        try:
+            mtime = os.stat(os.path.join(root, changed_path)).st_mtime_ns
+        except OSError:
+            mtime = None
+        mtimes.append((changed_path, mtime))
+    return (os.path.realpath(path), head, tuple(mtimes))
+
+class SearchCache:
+    """LRU cache of search results keyed by arguments and repository state."""
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE, state_ttl: float = REPO_STATE_TTL):
+        self.max_entries = max_entries
+        self.state_ttl = state_ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._generation = 0
+        self._states: Dict[str, Tuple[float, int, Optional[Tuple]]] = {}  # path -> (time, generation, state)
+
+    def invalidate(self) -> None:
+        """Make all cached results stale, e.g. after a tool wrote files."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._states.clear()
+
+    def _repo_state(self, repo_path: str, generation: int) -> Optional[Tuple]:
+        """Get the state of a repository, reusing a recent one of the same generation."""
+        now = time.monotonic()
+        with self._lock:
+            recent = self._states.get(repo_path)
+        if recent is not None and recent[1] == generation and now - recent[0] < self.state_ttl:
+            return recent[2]
+        state = repo_state(repo_path)
+        with self._lock:
+            if generation == self._generation:
+                self._states[repo_path] = (now, generation, state)
+        return state
+
+    def get_or_compute(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        compute: Callable[[], Any],
+        repo_path: str = ".",
+        should_cache: Callable[[Any], bool] = lambda result: True
+    ) -> Tuple[Any, bool]:
+        """Get a cached search result, running the search if needed.
+
+        Args:
+            name: Name of the search tool
+            args: The search arguments (JSON serializable)
+            compute: Runs the search
+            repo_path: Path of the repository searched
+            should_cache: Decides whether a fresh result may be cached,
+                e.g. to leave out failed searches
+
+        Returns:
+            Tuple of the result and whether it came from the cache
+        """
+        with self._lock:
+            generation = self._generation
+        state = self._repo_state(repo_path, generation)
+        if state is None:
+            return compute(), False
+
+        key = (name, json.dumps(args, sort_keys=True, default=str), state, generation)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key], True
+
+        result = compute()
+        if should_cache(result):
+            with self._lock:
+                # A write during the search may have made the result stale
+                if generation == self._generation:
+                    self._entries[key] = result
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return result, False
+
+_search_cache = SearchCache()
+
+def cached_search(name: str, args: Dict[str, Any], compute: Callable[[], Any], repo_path: str = ".",
+                  should_cache: Callable[[Any], bool] = lambda result: True) -> Tuple[Any, bool]:
+    """Get a result from the shared search cache, see SearchCache.get_or_compute."""
+    return _search_cache.get_or_compute(name, args, compute, repo_path, should_cache)
+
+def invalidate_search_cache() -> None:
+    """Make all cached search results stale; call after modifying files."""
+    _search_cache.invalidate()
@@ -0,0 +1,125 @@
+"""Durable storage for agent memory so sessions can be resumed after a restart."""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Tuple
+
+# Map up to 256MB of the database file instead of reading it through syscalls
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+class SessionStore:
+    """Key/value store for session memory backed by SQLite in WAL mode.
+
+    Each memory key is stored as one JSON encoded row, so saving a single
+    memory section after a tool call only rewrites that row. WAL mode keeps
+    writes cheap and crash safe, and lets other processes read the session
+    while it is being written.
+
+    Example:
+        store = SessionStore(".sparc/session.db")
+        store.save_many({"key_facts": {...}, "work_log": [...]})
+        memory = store.load()
+    """
+
+    def __init__(self, path: str):
+        """Open (creating if needed) the session database at path.
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL"
+            ")"
+        )
+
+    def exists(self) -> bool:
+        """Check whether the store holds any saved memory."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM memory LIMIT 1").fetchone()
+        return row is not None
+
+    def load(self) -> Dict[str, Any]:
+        """Load all saved memory values.
+
+        Returns:
+            Mapping of memory key to its decoded JSON value
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM memory").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def save(self, key: str, value: Any) -> None:
+        """Save a single memory value."""
+        self.save_many({key: value})
+
+    def save_many(self, values: Dict[str, Any]) -> None:
+        """Save several memory values in one transaction.
+
+        Args:
+            values: Mapping of memory key to a JSON serializable value
+        """
+        rows = self._encode(values.items())
+        with self._lock:
+            with self._transaction():
+                self._conn.executemany(
+                    "INSERT INTO memory (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    rows
+                )
+
+    def clear(self) -> None:
+        """Remove all saved memory."""
+        with self._lock:
+            with self._transaction():
+                self._conn.execute("DELETE FROM memory")
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _encode(items: Iterable[Tuple[str, Any]]) -> list:
+        return [(key, json.dumps(value, default=_json_default)) for key, value in items]
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    """Explicit BEGIN/COMMIT for a connection opened in autocommit mode."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN")
+        return self._conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def _json_default(value: Any) -> Any:
+    """Encode containers json does not handle natively (sets, deques)."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if hasattr(value, '__iter__'):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
@@ -1,3 +1,3 @@
-from .processing import truncate_output
+from .processing import OutputTruncator, truncate_output
 
-__all__ = ['truncate_output']
+__all__ = ['OutputTruncator', 'truncate_output']
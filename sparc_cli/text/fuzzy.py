@@ -0,0 +1,97 @@
+"""Fuzzy matching of a query against many strings, such as project file paths.
+
+Matching uses rapidfuzz when it is installed, which scores all choices in
+native code spread over every core and skips choices as soon as they cannot
+reach the score cutoff. Otherwise it falls back to fuzzywuzzy, which scores
+each choice in Python. Both use the WRatio scorer on lowercased text, so
+scores are comparable.
+"""
+
+import os
+from typing import List, Sequence, Tuple
+
+from fuzzywuzzy import fuzz as fuzzywuzzy_fuzz
+from fuzzywuzzy import process as fuzzywuzzy_process
+
+try:
+    import numpy
+    from rapidfuzz import fuzz, process, utils
+except ImportError:
+    numpy = None
+    process = None
+
+# How much the basename of a path counts in 'basename' scoring; the rest is
+# the score of the whole path
+BASENAME_WEIGHT = 0.7
+
+SCORING_MODES = ('path', 'basename')
+
+def has_fast_backend() -> bool:
+    """Check whether the rapidfuzz backend is available."""
+    return process is not None
+
+def extract_matches(
+    query: str,
+    choices: Sequence[str],
+    limit: int = 10,
+    score_cutoff: int = 0,
+    scoring: str = 'path'
+) -> List[Tuple[str, int]]:
+    """Find the choices best matching a query.
+
+    Args:
+        query: The string to look for
+        choices: The strings to score, typically file paths
+        limit: Maximum number of matches to return
+        score_cutoff: Minimum score (0-100) of a match
+        scoring: 'path' to score whole strings, or 'basename' to favor paths
+            whose last segment matches, so 'app.py' ranks above 'app/x.py'
+            when looking for "app.py"
+
+    Returns:
+        (choice, score) tuples, best match first
+
+    Raises:
+        ValueError: If scoring is not one of SCORING_MODES
+    """
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode '{scoring}', expected one of: {', '.join(SCORING_MODES)}")
+    if not choices or limit <= 0:
+        return []
+
+    if process is not None:
+        if scoring == 'path':
+            scores = _scores(query, choices, score_cutoff)
+        else:
+            basenames = [os.path.basename(choice) for choice in choices]
+            scores = (BASENAME_WEIGHT * _scores(query, basenames)
+                      + (1 - BASENAME_WEIGHT) * _scores(query, choices))
+        return _best(choices, scores, limit, score_cutoff)
+
+    if scoring == 'path':
+        return fuzzywuzzy_process.extractBests(query, choices, limit=limit, score_cutoff=score_cutoff)
+
+    scored = []
+    for choice in choices:
+        score = (BASENAME_WEIGHT * fuzzywuzzy_fuzz.WRatio(query, os.path.basename(choice))
+                 + (1 - BASENAME_WEIGHT) * fuzzywuzzy_fuzz.WRatio(query, choice))
+        if score >= score_cutoff:
+            scored.append((choice, round(score)))
+    scored.sort(key=lambda match: -match[1])
+    return scored[:limit]
+
+def _scores(query: str, choices: Sequence[str], score_cutoff: int = 0):
+    """Score all choices with rapidfuzz on every core; scores below score_cutoff are 0."""
+    return process.cdist(
+        [query], choices,
+        scorer=fuzz.WRatio, processor=utils.default_process,
+        score_cutoff=score_cutoff, workers=-1
+    )[0]
+
+def _best(choices: Sequence[str], scores, limit: int, score_cutoff: int) -> List[Tuple[str, int]]:
+    """Pick the highest scoring choices from a score array, best first."""
+    candidates = numpy.flatnonzero(scores >= score_cutoff)
+    if len(candidates) > limit:
+        candidates = candidates[numpy.argpartition(-scores[candidates], limit - 1)[:limit]]
+    ranked = sorted(candidates, key=lambda i: (-scores[i], i))
+    return [(choices[i], round(float(scores[i]))) for i in ranked]
@@ -1,42 +1,175 @@
-from typing import Optional
+from collections import deque
+from typing import Deque, Optional, Union
+
+# Default window kept of command output returned to agents: the first and
+# the last lines, each part also limited in bytes
+DEFAULT_HEAD_LINES = 200
+DEFAULT_TAIL_LINES = 4800
+DEFAULT_HEAD_BYTES = 16 * 1024
+DEFAULT_TAIL_BYTES = 48 * 1024
+
+class OutputTruncator:
+    """Streaming head and tail truncation of output, fed chunk by chunk.
+
+    The first lines of the output are kept until head_lines or head_bytes is
+    reached, and the most recent lines in a ring buffer limited by tail_lines
+    and tail_bytes. Lines in between are only counted, so memory use does
+    not grow with the size of the output. A None limit is no limit.
+
+    Output is handled as bytes; str chunks are encoded as UTF-8.
+    """
+
+    def __init__(
+        self,
+        head_lines: Optional[int] = DEFAULT_HEAD_LINES,
+        tail_lines: Optional[int] = DEFAULT_TAIL_LINES,
+        head_bytes: Optional[int] = DEFAULT_HEAD_BYTES,
+        tail_bytes: Optional[int] = DEFAULT_TAIL_BYTES
+    ):
+        self.head_lines = head_lines
+        self.tail_lines = tail_lines
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.dropped_lines = 0
+        self.dropped_bytes = 0
+        self._head = bytearray()
+        self._head_line_count = 0
+        self._head_full = head_lines == 0 or head_bytes == 0
+        self._tail: Deque[bytes] = deque()
+        self._tail_size = 0
+        self._partial = b''
+
+    @property
+    def truncated(self) -> bool:
+        """Whether any output was left out."""
+        return self.dropped_bytes > 0
+
+    def feed(self, data: Union[bytes, str]) -> None:
+        """Add the next chunk of output."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not self._head_full:
+            data = self._feed_head(data)
+        if data:
+            self._feed_tail(data)
+
+    def _feed_head(self, data: bytes) -> bytes:
+        """Add to the head until it is full, returning what did not fit."""
+        position = 0
+        while position < len(data):
+            end = data.find(b'\n', position)
+            end = len(data) if end < 0 else end + 1
+            if self.head_bytes is not None:
+                end = min(end, position + self.head_bytes - len(self._head))
+            self._head += data[position:end]
+            position = end
+            if self._head.endswith(b'\n'):
+                self._head_line_count += 1
+            if (self._head_line_count == self.head_lines
+                    or (self.head_bytes is not None and len(self._head) >= self.head_bytes)):
+                self._head_full = True
+                break
+        return data[position:]
+
+    def _feed_tail(self, data: bytes) -> None:
+        if self.tail_lines == 0:
+            self.dropped_lines += data.count(b'\n')
+            self.dropped_bytes += len(data)
+            return
+
+        last_newline = data.rfind(b'\n')
+        if last_newline < 0:
+            complete = b''
+            self._partial = self._trim_partial(self._partial + data)
+        else:
+            complete = self._partial + data[:last_newline + 1]
+            self._partial = self._trim_partial(data[last_newline + 1:])
+
+        # An unfinished last line counts against the line limit too
+        keep = None if self.tail_lines is None else self.tail_lines - (1 if self._partial else 0)
+
+        # Only the end of the chunk can be kept; find where the kept lines
+        # start without splitting the rest
+        start = 0
+        if self.tail_bytes is not None:
+            room = self.tail_bytes - len(self._partial)
+            if len(complete) > room:
+                start = len(complete) if room <= 0 else complete.find(b'\n', len(complete) - room - 1) + 1
+        if keep is not None and complete.count(b'\n', start) > keep:
+            start = len(complete) - 1
+            for _ in range(keep):
+                start = complete.rfind(b'\n', 0, start)
+            start += 1
+        if start:
+            # Lines kept from earlier chunks are older than the dropped ones
+            self.dropped_lines += complete.count(b'\n', 0, start) + len(self._tail)
+            self.dropped_bytes += start + self._tail_size
+            self._tail.clear()
+            self._tail_size = 0
+
+        # Split on "\n" only; a "\r" from a progress bar does not end a line
+        for line in complete[start:-1].split(b'\n') if start < len(complete) else []:
+            self._tail.append(line + b'\n')
+            self._tail_size += len(line) + 1
+        while self._tail and (
+            (keep is not None and len(self._tail) > keep)
+            or (self.tail_bytes is not None and self._tail_size + len(self._partial) > self.tail_bytes)
+        ):
+            line = self._tail.popleft()
+            self._tail_size -= len(line)
+            self.dropped_lines += 1
+            self.dropped_bytes += len(line)
+
+    def _trim_partial(self, partial: bytes) -> bytes:
+        """Keep the end of an unfinished line that alone exceeds tail_bytes."""
+        if self.tail_bytes is not None and len(partial) > self.tail_bytes:
+            self.dropped_bytes += len(partial) - self.tail_bytes
+            # Not partial[-tail_bytes:], which keeps everything when tail_bytes is 0
+            partial = partial[len(partial) - self.tail_bytes:]
+        return partial
+
+    def getvalue(self) -> bytes:
+        """Get the kept output, with a note where output was left out."""
+        tail = b''.join(self._tail) + self._partial
+        if not self.truncated:
+            return bytes(self._head) + tail
+        if self.dropped_lines:
+            note = f"[{self.dropped_lines} lines of output truncated]\n"
+        else:
+            note = f"[{self.dropped_bytes} bytes of output truncated]\n"
+        head = bytes(self._head)
+        if head and not head.endswith(b'\n'):
+            head += b'\n'
+        return head + note.encode() + tail
+
+    def text(self) -> str:
+        """Get the kept output decoded as UTF-8."""
+        return self.getvalue().decode('utf-8', errors='replace')
 
 def truncate_output(output: str, max_lines: Optional[int] = 5000) -> str:
     """Truncate output string to keep only the most recent lines if it exceeds max_lines.
-    
+
     When truncation occurs, adds a message indicating how many lines were removed.
     Preserves original line endings and handles Unicode characters correctly.
-    
+
     Args:
         output: The string output to potentially truncate
         max_lines: Maximum number of lines to keep (default: 5000)
-        
+
     Returns:
         The truncated string if it exceeded max_lines, or the original string if not
     """
     # Handle empty output
     if not output:
         return ""
-        
+
     # Set max_lines to default if None
     if max_lines is None:
         max_lines = 5000
-        
-    # Split while preserving line endings
-    lines = output.splitlines(keepends=True)
-    total_lines = len(lines)
-    
-    # Return original if under limit
-    if total_lines <= max_lines:
+
+    # Keep the most recent lines without splitting the whole output
+    truncator = OutputTruncator(head_lines=0, tail_lines=max_lines, head_bytes=None, tail_bytes=None)
+    truncator.feed(output)
+    if not truncator.truncated:
         return output
-        
-    # Calculate lines to remove
-    lines_removed = total_lines - max_lines
-    
-    # Keep only the most recent lines
-    truncated_lines = lines[-max_lines:]
-    
-    # Add truncation message at start
-    truncation_msg = f"[{lines_removed} lines of output truncated]\n"
-    
-    # Combine message with remaining lines
-    return truncation_msg + "".join(truncated_lines)
+    return truncator.text()
@@ -0,0 +1,70 @@
+"""Local token estimation used to keep prompts within the model context."""
+
+import math
+from typing import Dict
+
+# Average characters per token. English prose averages about 4 characters per
+# token and source code somewhat less, so this errs on the side of overestimating.
+CHARS_PER_TOKEN = 3.5
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a string without calling a tokenizer.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count (0 for empty text)
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly max_tokens, keeping its beginning and end.
+
+    The middle of the text is replaced with a marker. Prompts carry the task
+    near the top and instructions near the bottom, so both ends are kept
+    rather than just the head.
+
+    Args:
+        text: The text to truncate
+        max_tokens: Token budget for the result
+
+    Returns:
+        The text unchanged if it fits, otherwise its head and tail around a
+        truncation marker
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    max_chars = max(int(max_tokens * CHARS_PER_TOKEN), 0)
+    removed = len(text) - max_chars
+    marker = f"\n\n[... {estimate_tokens(text[:removed])} tokens truncated ...]\n\n"
+    keep = max(max_chars - len(marker), 0)
+    head = keep // 2
+    tail = keep - head
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+def allocate_tokens(requested: Dict[str, int], budget: int) -> Dict[str, int]:
+    """Split a token budget between sections.
+
+    Sections that need less than an equal share get all they ask for; what
+    they leave unused is shared among the larger sections.
+
+    Args:
+        requested: Tokens each section would need to be included in full
+        budget: Total tokens available to the sections
+
+    Returns:
+        Tokens allotted to each section
+    """
+    allocation = {}
+    remaining = max(budget, 0)
+    pending = sorted(requested.items(), key=lambda item: item[1])
+    while pending:
+        share = remaining // len(pending)
+        name, needed = pending.pop(0)
+        allocation[name] = min(needed, share)
+        remaining -= allocation[name]
+    return allocation
@@ -1,6 +1,7 @@
 from typing import List
 from sparc_cli.tools import (
     ask_expert, ask_human, run_shell_command, run_programming_task,
+    start_background_job, poll_background_job, tail_background_job, kill_background_job,
     emit_research_notes, emit_plan, emit_related_files, emit_task,
     emit_expert_context, emit_key_facts, delete_key_facts,
     emit_key_snippets, delete_key_snippets, deregister_related_files, delete_tasks, read_file_tool,
@@ -11,7 +12,10 @@ from sparc_cli.tools import (
 from sparc_cli.tools.math.evaluator import CalculatorTool, SymbolicSolverTool
 from sparc_cli.tools.scrape import scrape_url_tool
 from sparc_cli.tools.memory import one_shot_completed
-from sparc_cli.tools.agent import request_research, request_implementation, request_research_and_implementation, request_task_implementation
+from sparc_cli.tools.agent import request_research, request_implementation, request_research_and_implementation, request_task_implementation, request_parallel_task_implementation
+
+# Long-running commands the agent can check on while it keeps working
+BACKGROUND_JOB_TOOLS = [start_background_job, poll_background_job, tail_background_job, kill_background_job]
 
 # Read-only tools that don't modify system state
 def get_read_only_tools(human_interaction: bool = False) -> list:
@@ -28,6 +32,7 @@ def get_read_only_tools(human_interaction: bool = False) -> list:
         fuzzy_find_project_files,
         ripgrep_search,
         run_shell_command, # can modify files, but we still need it for read-only tasks.
+        *BACKGROUND_JOB_TOOLS,
         scrape_url_tool
     ]
     
@@ -70,8 +75,8 @@ def get_research_tools(research_only: bool = False, expert_enabled: bool = True,
     
     return tools
 
-def get_planning_tools(expert_enabled: bool = True) -> list:
-    """Get the list of planning tools based on whether expert is enabled."""
+def get_planning_tools(expert_enabled: bool = True, parallel: bool = False) -> list:
+    """Get the list of planning tools based on whether expert is enabled and tasks may run in parallel."""
     # Start with common tools
     tools = COMMON_TOOLS.copy()
     
@@ -85,6 +90,10 @@ def get_planning_tools(expert_enabled: bool = True) -> list:
         plan_implementation_completed
     ]
     tools.extend(planning_tools)
+
+    # Add concurrent task dispatch if enabled
+    if parallel:
+        tools.append(request_parallel_task_implementation)
     
     # Add expert tools if enabled
     if expert_enabled:
@@ -1,4 +1,5 @@
 from .shell import run_shell_command
+from .background import start_background_job, poll_background_job, tail_background_job, kill_background_job
 from .scrape import scrape_url_tool
 from .research import monorepo_detected, existing_project_detected, ui_detected
 from .math.models import BenchmarkRequest, BenchmarkResponse
@@ -42,6 +43,10 @@ __all__ = [
     'request_implementation',
     'run_programming_task',
     'run_shell_command',
+    'start_background_job',
+    'poll_background_job',
+    'tail_background_job',
+    'kill_background_job',
     'write_file_tool',
     'ripgrep_search',
     'file_str_replace',
@@ -1,5 +1,6 @@
 """Tools for spawning and managing sub-agents."""
 
+import asyncio
 from langchain_core.tools import tool
 from typing import Dict, Any, Union, List
 from typing_extensions import TypeAlias
@@ -8,7 +9,10 @@ ResearchResult = Dict[str, Union[str, bool, Dict[int, Any], List[Any], None]]
 from rich.console import Console
 from sparc_cli.tools.memory import _global_memory
 from sparc_cli.console.formatting import print_error, print_interrupt
-from .memory import get_memory_value, get_related_files, get_work_log, reset_work_log
+from .memory import (
+    get_memory_value, get_related_files, get_work_log, reset_work_log,
+    MemorySession, fork_memory_session, merge_memory_session, memory_session
+)
 from ..llm import initialize_llm
 from ..console import print_task_header
 
@@ -215,6 +219,114 @@ def request_task_implementation(task_spec: str) -> Dict[str, Any]:
         "reason": reason
     }
 
+async def _implement_task_in_session(
+    task_spec: str,
+    session: MemorySession,
+    semaphore: asyncio.Semaphore,
+    model,
+    base_task: str,
+    tasks: List[str],
+    plan: str,
+    related_files: List[str]
+) -> Dict[str, Any]:
+    """Run one implementation agent against its own forked memory session."""
+    from ..agent_utils import run_task_implementation_agent_async
+
+    async with semaphore:
+        with memory_session(session):
+            # Start without the completion state the fork copied from the parent
+            _global_memory['completion_message'] = ''
+            _global_memory['task_completed'] = False
+            try:
+                print_task_header(task_spec)
+                await run_task_implementation_agent_async(
+                    base_task=base_task,
+                    tasks=tasks,
+                    task=task_spec,
+                    plan=plan,
+                    related_files=related_files,
+                    model=model,
+                    expert_enabled=True
+                )
+                success = True
+                reason = None
+            except Exception as e:
+                print_error(f"Error during task implementation: {str(e)}")
+                success = False
+                reason = f"error: {str(e)}"
+
+            completion_message = _global_memory.get('completion_message') or ('Task was completed successfully.' if success else None)
+
+    return {
+        "task": task_spec,
+        "completion_message": completion_message,
+        "success": success,
+        "reason": reason
+    }
+
+async def _implement_tasks_concurrently(task_specs: List[str], sessions: List[MemorySession], max_concurrency: int, **kwargs) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    return await asyncio.gather(*(
+        _implement_task_in_session(task_spec, session, semaphore, **kwargs)
+        for task_spec, session in zip(task_specs, sessions)
+    ))
+
+@tool("request_parallel_task_implementation")
+def request_parallel_task_implementation(task_specs: List[str]) -> Dict[str, Any]:
+    """Spawn implementation agents for several independent tasks and run them concurrently.
+
+    Only use this for tasks that do not depend on each other and do not modify the same files.
+    Each task works on its own copy of memory; key facts, snippets and related files
+    it records are merged back once all tasks have finished.
+
+    Args:
+        task_specs: The full task specification of each task
+    """
+    # Initialize model from config
+    config = _global_memory.get('config', {})
+    model = initialize_llm(config.get('provider', 'anthropic'), config.get('model', 'claude-3-5-sonnet-20241022'))
+    
+    # Get required parameters
+    tasks = [_global_memory['tasks'][task_id] for task_id in sorted(_global_memory['tasks'])]
+    plan = _global_memory.get('plan', '')
+    related_files = list(_global_memory['related_files'].values())
+
+    # Fork every session from the same snapshot, then merge in task order
+    sessions = [fork_memory_session() for _ in task_specs]
+    try:
+        results = asyncio.run(_implement_tasks_concurrently(
+            task_specs,
+            sessions,
+            max(config.get('parallel_tasks', 1), 1),
+            model=model,
+            base_task=_global_memory.get('base_task', ''),
+            tasks=tasks,
+            plan=plan,
+            related_files=related_files
+        ))
+    except KeyboardInterrupt:
+        print_interrupt("Task implementation interrupted by user")
+        results = [{"task": spec, "completion_message": None, "success": False, "reason": CANCELLED_BY_USER_REASON} for spec in task_specs]
+    finally:
+        for session in sessions:
+            merge_memory_session(session)
+
+    # Get and reset work log if at root depth
+    current_depth = _global_memory.get('agent_depth', 0)
+    work_log = get_work_log() if current_depth == 1 else None
+    if current_depth == 1:
+        reset_work_log()
+
+    return {
+        "work_log": work_log,
+        "tasks": results,
+        "key_facts": get_memory_value("key_facts"),
+        "related_files": get_related_files(),
+        "key_snippets": get_memory_value("key_snippets"),
+        "success": all(result["success"] for result in results),
+        "reason": None
+    }
+
 @tool("request_implementation")
 def request_implementation(task_spec: str) -> Dict[str, Any]:
     """Spawn a planning agent to create an implementation plan for the given task.
@@ -0,0 +1,111 @@
+from typing import Any, Dict, Optional
+from langchain_core.tools import tool
+from rich.console import Console
+from rich.panel import Panel
+from sparc_cli.proc.jobs import get_job_manager
+from sparc_cli.tools.shell import approve_command
+
+console = Console()
+
+# Lines of output included when polling a job
+POLL_TAIL_LINES = 10
+
+@tool
+def start_background_job(command: str) -> Dict[str, Any]:
+    """Start a shell command in the background and return its job ID immediately.
+
+    Use this for long-running commands such as full test suites or builds, then keep
+    working and check on the job with poll_background_job, tail_background_job and
+    kill_background_job. The command reads no input. Only the most recent output
+    (about 1 MB) is kept.
+
+    Jobs do not run in the persistent shell session: they start in the original
+    working directory and environment, so earlier cd or export commands do not
+    apply. Include them in the command instead, e.g. "cd backend && make test".
+    """
+    if not approve_command(command, title="🐚 Background Job"):
+        return {
+            "output": "Command execution cancelled by user",
+            "success": False
+        }
+
+    try:
+        job = get_job_manager().start(command)
+    except (OSError, RuntimeError) as e:
+        console.print(Panel(str(e), title="❌ Error", border_style="red"))
+        return {
+            "output": str(e),
+            "success": False
+        }
+
+    console.print(f"Started background job [bold]{job.job_id}[/bold]")
+    return {
+        "job_id": job.job_id,
+        "output": f"Started {job.job_id}; poll it with poll_background_job",
+        "success": True
+    }
+
+@tool
+def poll_background_job(job_id: Optional[str] = None) -> Dict[str, Any]:
+    """Get the status of a background job and its last lines of output.
+
+    Args:
+        job_id: ID of the job, or omit to list every job
+
+    Returns:
+        Status of the job ("running", "exited" or "killed"), its return code once it
+        ended, how long it ran, how much output it wrote and its last lines of output.
+    """
+    manager = get_job_manager()
+    if job_id is None:
+        return {
+            "jobs": [job.status() for job in manager.jobs()],
+            "success": True
+        }
+    try:
+        job = manager.get(job_id)
+    except ValueError as e:
+        return {"output": str(e), "success": False}
+    return {
+        **job.status(),
+        "output": job.tail(POLL_TAIL_LINES),
+        "success": True
+    }
+
+@tool
+def tail_background_job(job_id: str, lines: int = 50) -> Dict[str, Any]:
+    """Get the last lines of output of a background job.
+
+    Args:
+        job_id: ID of the job
+        lines: Number of lines to return (default: 50)
+    """
+    try:
+        job = get_job_manager().get(job_id)
+    except ValueError as e:
+        return {"output": str(e), "success": False}
+    return {
+        "job_id": job.job_id,
+        "status": job.status()["status"],
+        "output": job.tail(max(lines, 0)),
+        "success": True
+    }
+
+@tool
+def kill_background_job(job_id: str) -> Dict[str, Any]:
+    """Kill a background job and every process it started.
+
+    Args:
+        job_id: ID of the job
+    """
+    try:
+        job = get_job_manager().get(job_id)
+    except ValueError as e:
+        return {"output": str(e), "success": False}
+    job.kill()
+    console.print(f"Killed background job [bold]{job.job_id}[/bold]")
+    return {
+        **job.status(),
+        "output": job.tail(POLL_TAIL_LINES),
+        "success": True
+    }
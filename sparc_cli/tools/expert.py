@@ -5,31 +5,26 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
 from ..llm import initialize_expert_llm
-from .memory import get_memory_value, get_related_files, _global_memory
+from .memory import get_memory_value, get_related_files, _global_memory, SessionMapping, memory_lock, with_memory_lock
 
 console = Console()
-_model = None
 
 def get_model():
-    global _model
+    # Expert clients are pooled per provider and model by initialize_expert_llm
+    provider = _global_memory['config']['expert_provider'] or 'openai'
+    model_name = _global_memory['config']['expert_model'] or 'o1-preview'
     try:
-        if _model is None:
-            provider = _global_memory['config']['expert_provider'] or 'openai'
-            model = _global_memory['config']['expert_model'] or 'o1-preview'
-            _model = initialize_expert_llm(provider, model)
+        model = initialize_expert_llm(provider, model_name)
     except Exception as e:
-        _model = None
         console.print(Panel(f"Failed to initialize expert model: {e}", title="Error", border_style="red"))
         raise
-    return _model
+    return model
 
-# Keep track of context globally
-expert_context = {
-    'text': [],    # Additional textual context
-    'files': []    # File paths to include
-}
+# Expert context of the current memory session
+expert_context = SessionMapping('expert_context')
 
 @tool("emit_expert_context")
+@with_memory_lock
 def emit_expert_context(context: str) -> str:
     """Add context for the next expert question.
 
@@ -125,13 +120,17 @@ def ask_expert(question: str) -> str:
 
     The expert can be prone to overthinking depending on what and how you ask it.
     """
-    global expert_context
-    
-    # Get all content first
-    file_paths = expert_context['files'] + list(get_related_files())
+    # Take the pending context and memory sections in one consistent snapshot
+    with memory_lock():
+        file_paths = expert_context['files'] + list(get_related_files())
+        context_text = list(expert_context['text'])
+        key_snippets = get_memory_value('key_snippets')
+        key_facts = get_memory_value('key_facts')
+        # Context is consumed by this question
+        expert_context['text'].clear()
+        expert_context['files'].clear()
+
     related_contents = read_related_files(file_paths)
-    key_snippets = get_memory_value('key_snippets')
-    key_facts = get_memory_value('key_facts')
     
     # Build display query (just question)
     display_query = "# Question\n" + question
@@ -143,10 +142,6 @@ def ask_expert(question: str) -> str:
         border_style="yellow"
     ))
     
-    # Clear context after panel display
-    expert_context['text'].clear()
-    expert_context['files'].clear()
-    
     # Build full query in specified order
     query_parts = []
     
@@ -159,8 +154,8 @@ def ask_expert(question: str) -> str:
     if key_facts and len(key_facts) > 0:
         query_parts.extend(['# Key Facts About This Project', key_facts])
         
-    if expert_context['text']:
-        query_parts.extend(['\n# Additional Context', '\n'.join(expert_context['text'])])
+    if context_text:
+        query_parts.extend(['\n# Additional Context', '\n'.join(context_text)])
         
     query_parts.extend(['# Question', question])
     query_parts.extend(['\n # Addidional Requirements', "Do not expand the scope unnecessarily."])
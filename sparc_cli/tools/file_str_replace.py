@@ -4,6 +4,7 @@ from pathlib import Path
 from rich.panel import Panel
 from sparc_cli.console import console
 from sparc_cli.console.formatting import print_error
+from sparc_cli.search_cache import invalidate_search_cache
 
 def truncate_display_str(s: str, max_length: int = 30) -> str:
     """Truncate a string for display purposes if it exceeds max length.
@@ -73,6 +74,7 @@ def file_str_replace(
             
         new_content = content.replace(old_str, new_str)
         path.write_text(new_content)
+        invalidate_search_cache()
         
         console.print(Panel(
             f"Replaced in {filepath}:\n{format_string_for_display(old_str)} → {format_string_for_display(new_str)}",
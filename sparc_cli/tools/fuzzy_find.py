@@ -1,11 +1,12 @@
 from typing import List, Tuple
-import fnmatch
-from git import Repo
-from fuzzywuzzy import process
+from git.exc import InvalidGitRepositoryError
 from langchain_core.tools import tool
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
+from sparc_cli.search_cache import cached_search
+from sparc_cli.file_index import get_file_index, compile_file_filter
+from sparc_cli.text.fuzzy import extract_matches, SCORING_MODES
 
 console = Console()
 
@@ -26,7 +27,8 @@ def fuzzy_find_project_files(
     threshold: int = 60,
     max_results: int = 10,
     include_paths: List[str] = None,
-    exclude_patterns: List[str] = None
+    exclude_patterns: List[str] = None,
+    scoring: str = "path"
 ) -> List[Tuple[str, int]]:
     """Fuzzy find files in a git repository matching the search term.
     
@@ -39,67 +41,66 @@ def fuzzy_find_project_files(
         repo_path: Path to git repository (defaults to current directory)
         threshold: Minimum similarity score (0-100) for matches (default: 60)
         max_results: Maximum number of results to return (default: 10)
-        include_paths: Optional list of path patterns to include in search
-        exclude_patterns: Optional list of path patterns to exclude from search
+        include_paths: Optional list of path patterns (fnmatch syntax) to include in search
+        exclude_patterns: Optional list of path patterns (fnmatch syntax) to exclude from search
+        scoring: 'path' to match against whole paths (default), or 'basename' to
+            favor files whose name matches, e.g. when searching for a file name
         
     Returns:
         List of tuples containing (file_path, match_score)
         
     Raises:
         InvalidGitRepositoryError: If repo_path is not a git repository
-        ValueError: If threshold is not between 0 and 100
+        ValueError: If threshold is not between 0 and 100, or scoring is unknown
     """
     # Validate threshold
     if not 0 <= threshold <= 100:
         raise ValueError("Threshold must be between 0 and 100")
+
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Scoring must be one of: {', '.join(SCORING_MODES)}")
         
     # Handle empty search term as special case
     if not search_term:
         return []
 
-    # Initialize repo for normal search
-    repo = Repo(repo_path)
-    
-    # Get all tracked files
-    tracked_files = repo.git.ls_files().splitlines()
-    
-    # Get all untracked files
-    untracked_files = repo.untracked_files
-    
-    # Combine file lists
-    all_files = tracked_files + untracked_files
-    
-    # Apply include patterns if specified
-    if include_paths:
-        filtered_files = []
-        for pattern in include_paths:
-            filtered_files.extend(
-                f for f in all_files 
-                if fnmatch.fnmatch(f, pattern)
-            )
-        all_files = filtered_files
-    
-    # Apply exclude patterns
-    patterns = DEFAULT_EXCLUDE_PATTERNS + (exclude_patterns or [])
-    for pattern in patterns:
-        all_files = [
-            f for f in all_files 
-            if not fnmatch.fnmatch(f, pattern)
-        ]
+    def search() -> Tuple[List[Tuple[str, int]], int]:
+        try:
+            index = get_file_index(repo_path)
+        except ValueError:
+            raise InvalidGitRepositoryError(repo_path)
+
+        # Apply include and exclude patterns with one compiled matcher
+        file_filter = compile_file_filter(
+            tuple(include_paths or ()),
+            tuple(DEFAULT_EXCLUDE_PATTERNS + (exclude_patterns or []))
+        )
+        all_files = index.files(file_filter)
     
-    # Perform fuzzy matching
-    matches = process.extract(
-        search_term,
-        all_files,
-        limit=max_results
+        # Perform fuzzy matching; the threshold lets the matcher skip poor matches early
+        filtered_matches = extract_matches(
+            search_term,
+            all_files,
+            limit=max_results,
+            score_cutoff=threshold,
+            scoring=scoring
+        )
+        return filtered_matches, len(all_files)
+
+    # Repeated searches of an unchanged tree are answered from the cache
+    (filtered_matches, total_files), cached = cached_search(
+        'fuzzy_find_project_files',
+        {
+            'search_term': search_term,
+            'threshold': threshold,
+            'max_results': max_results,
+            'include_paths': include_paths,
+            'exclude_patterns': exclude_patterns,
+            'scoring': scoring
+        },
+        search,
+        repo_path=repo_path
     )
-    
-    # Filter by threshold
-    filtered_matches = [
-        (path, score) 
-        for path, score in matches 
-        if score >= threshold
-    ]
 
     # Build info panel content
     info_sections = []
@@ -125,7 +126,7 @@ def fuzzy_find_project_files(
     # Results statistics section
     stats_section = [
         "## Results Statistics",
-        f"**Total Files Scanned**: {len(all_files)}",
+        f"**Total Files Scanned**: {total_files}" + (" (cached)" if cached else ""),
         f"**Matches Found**: {len(filtered_matches)}"
     ]
     info_sections.append("\n".join(stats_section))
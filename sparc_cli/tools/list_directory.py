@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 import datetime
@@ -8,7 +9,6 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
 from langchain_core.tools import tool
-import fnmatch
 
 console = Console()
 
@@ -34,6 +34,9 @@ def format_time(timestamp: float) -> str:
     dt = datetime.datetime.fromtimestamp(timestamp)
     return dt.strftime("%Y-%m-%d %H:%M")
 
+# Default maximum number of entries listed by list_directory_tree
+DEFAULT_MAX_ENTRIES = 1000
+
 # Default patterns to exclude
 DEFAULT_EXCLUDE_PATTERNS = [
     ".*",  # Hidden files
@@ -81,67 +84,114 @@ def should_ignore(path: str, spec: pathspec.PathSpec) -> bool:
     """Check if a path should be ignored based on gitignore patterns"""
     return spec.match_file(path)
 
-def should_exclude(name: str, patterns: List[str]) -> bool:
-    """Check if a file/directory name matches any exclude patterns"""
-    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+@dataclass
+class ScanBudget:
+    """Number of entries a directory scan may still add to the tree."""
+    remaining: int
+
+def compile_ignore_spec(root: Path, exclude_patterns: List[str]) -> pathspec.PathSpec:
+    """Combine .gitignore, default and extra exclude patterns into one matcher."""
+    patterns = list(load_gitignore_patterns(root).patterns)
+    patterns.extend(
+        pathspec.patterns.GitWildMatchPattern(pattern) for pattern in exclude_patterns
+    )
+    return pathspec.PathSpec(patterns)
 
 def build_tree(
     path: Path,
     tree: Tree,
     config: DirScanConfig,
     current_depth: int = 0,
-    spec: Optional[pathspec.PathSpec] = None
+    spec: Optional[pathspec.PathSpec] = None,
+    budget: Optional[ScanBudget] = None,
+    rel_dir: str = ""
 ) -> None:
-    """Recursively build a Rich tree representation of the directory"""
+    """Recursively build a Rich tree representation of the directory.
+
+    Entries come from os.scandir, whose cached type information saves a
+    stat call per entry, and files are stat'ed at most once.
+
+    Args:
+        path: Directory to list
+        tree: Tree node to add entries to
+        config: Scan options
+        current_depth: Depth of path below the listed root
+        spec: Matcher for paths to leave out, relative to the listed root
+        budget: Optional limit on the number of entries added in total
+        rel_dir: Path of this directory relative to the listed root
+    """
     if current_depth >= config.max_depth:
         return
+    if spec is None:
+        spec = pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, config.exclude_patterns)
 
     try:
-        # Get sorted list of directory contents
-        entries = sorted(path.iterdir(), key=lambda p: (not p.is_dir(), p.name.lower()))
-        
-        for entry in entries:
-            # Get relative path from root for pattern matching
-            rel_path = entry.relative_to(path)
-            
-            # Skip if path matches exclude patterns
-            if spec and should_ignore(str(rel_path), spec):
-                continue
-            if should_exclude(entry.name, config.exclude_patterns):
-                continue
-                
-            # Skip if symlink and not following links
-            if entry.is_symlink() and not config.follow_links:
-                continue
-
-            try:
-                if entry.is_dir():
-                    # Add directory node
-                    branch = tree.add(
-                        f"📁 {entry.name}/"
-                    )
-                    
-                    # Recursively process subdirectory
-                    build_tree(entry, branch, config, current_depth + 1, spec)
-                else:
-                    # Add file node with optional metadata
-                    meta = []
-                    if config.show_size:
-                        meta.append(format_size(entry.stat().st_size))
-                    if config.show_modified:
-                        meta.append(format_time(entry.stat().st_mtime))
-                        
-                    label = entry.name
-                    if meta:
-                        label = f"{label} ({', '.join(meta)})"
-                    
-                    tree.add(label)
-                    
-            except PermissionError:
-                tree.add(f"🔒 {entry.name} (Permission denied)")
-                
+        with os.scandir(path) as scanner:
+            entries = list(scanner)
     except PermissionError:
         tree.add("🔒 (Permission denied)")
+        return
+
+    def is_dir(entry: os.DirEntry) -> bool:
+        try:
+            return entry.is_dir(follow_symlinks=config.follow_links)
+        except OSError:
+            return False
+
+    def is_listed(entry: os.DirEntry) -> bool:
+        # Skip if path matches exclude patterns; directories are matched with
+        # a trailing slash so patterns like "build/" apply to them
+        rel_path = f"{rel_dir}{entry.name}"
+        if spec and spec.match_file(rel_path + "/" if is_dir(entry) else rel_path):
+            return False
+        # Skip if symlink and not following links
+        return config.follow_links or not entry.is_symlink()
+
+    # Sort directories first, then by name
+    entries.sort(key=lambda entry: (not is_dir(entry), entry.name.lower()))
+
+    for position, entry in enumerate(entries):
+        if not is_listed(entry):
+            continue
+
+        if budget is not None and budget.remaining <= 0:
+            omitted = 1 + sum(1 for rest in entries[position + 1:] if is_listed(rest))
+            tree.add(f"… {omitted} more entries not shown")
+            return
+
+        entry_is_dir = is_dir(entry)
+        rel_path = f"{rel_dir}{entry.name}"
+
+        if budget is not None:
+            budget.remaining -= 1
+
+        try:
+            if entry_is_dir:
+                # Add directory node
+                branch = tree.add(
+                    f"📁 {entry.name}/"
+                )
+
+                # Recursively process subdirectory
+                build_tree(entry.path, branch, config, current_depth + 1, spec, budget, rel_path + "/")
+            else:
+                # Add file node with optional metadata, from a single stat call
+                meta = []
+                if config.show_size or config.show_modified:
+                    stat = entry.stat()
+                    if config.show_size:
+                        meta.append(format_size(stat.st_size))
+                    if config.show_modified:
+                        meta.append(format_time(stat.st_mtime))
+
+                label = entry.name
+                if meta:
+                    label = f"{label} ({', '.join(meta)})"
+
+                tree.add(label)
+
+        except PermissionError:
+            tree.add(f"🔒 {entry.name} (Permission denied)")
 
 @tool
 def list_directory_tree(
@@ -151,7 +201,8 @@ def list_directory_tree(
     follow_links: bool = False,
     show_size: bool = False,  # Default to not showing size
     show_modified: bool = False,  # Default to not showing modified time
-    exclude_patterns: List[str] = None
+    exclude_patterns: List[str] = None,
+    max_entries: int = DEFAULT_MAX_ENTRIES
 ) -> str:
     """List directory contents in a tree format with optional metadata.
     
@@ -162,6 +213,7 @@ def list_directory_tree(
         show_size: Show file sizes (default: False)
         show_modified: Show last modified times (default: False)
         exclude_patterns: List of patterns to exclude (uses gitignore syntax)
+        max_entries: Maximum number of entries to list (default: 1000)
         
     Returns:
         Rendered tree string
@@ -172,8 +224,8 @@ def list_directory_tree(
     if not root_path.is_dir():
         raise ValueError(f"Path is not a directory: {path}")
 
-    # Load .gitignore patterns if present
-    spec = load_gitignore_patterns(root_path)
+    # Compile .gitignore and exclude patterns into one matcher
+    spec = compile_ignore_spec(root_path, exclude_patterns or [])
     
     # Create tree
     tree = Tree(f"📁 {root_path}/")
@@ -186,7 +238,7 @@ def list_directory_tree(
     )
     
     # Build tree
-    build_tree(root_path, tree, config, 0, spec)
+    build_tree(root_path, tree, config, 0, spec, ScanBudget(max(max_entries, 1)))
     
     # Capture tree output
     with console.capture() as capture:
@@ -1,12 +1,26 @@
-from typing import Dict, List, Any, Union, TypedDict, Optional, Set
+import atexit
+import copy
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Dict, List, Any, TypedDict, Optional, Callable, Hashable, Deque, Iterator, TextIO, Union
 
 class WorkLogEntry(TypedDict):
-    timestamp: str
+    timestamp: float  # Seconds since the epoch
     event: str
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
 from langchain_core.tools import tool
+from sparc_cli.session_store import SessionStore
+from sparc_cli.text.tokens import estimate_tokens
 
 class SnippetInfo(TypedDict):
     """Type definition for source code snippet information"""
@@ -41,6 +55,7 @@ class MemoryItem(TypedDict):
 class PrioritizedNote(MemoryItem):
     """Research note with priority"""
     content: str
+    seq: int  # Increasing number identifying the note; notes are stored in this order
 
 class PrioritizedFact(MemoryItem):
     """Key fact with priority"""
@@ -50,62 +65,551 @@ class PrioritizedSnippet(MemoryItem, SnippetInfo):
     """Code snippet with priority"""
     pass
 
-# Global memory store
-_global_memory: Dict[str, Union[List[Any], Dict[int, Union[str, PrioritizedFact, PrioritizedSnippet]], int, Set[str], bool, str, int, List[WorkLogEntry]]] = {
-    'research_notes': [],  # List[PrioritizedNote]
-    'plans': [],
-    'tasks': {},  # Dict[int, str] - ID to task mapping
-    'task_completed': False,  # Flag indicating if task is complete
-    'completion_message': '',  # Message explaining completion
-    'task_id_counter': 1,  # Counter for generating unique task IDs
-    'key_facts': {},  # Dict[int, PrioritizedFact] - ID to fact mapping
-    'key_fact_id_counter': 1,  # Counter for generating unique fact IDs
-    'key_snippets': {},  # Dict[int, PrioritizedSnippet] - ID to snippet mapping
-    'key_snippet_id_counter': 1,  # Counter for generating unique snippet IDs
-    'implementation_requested': False,
-    'related_files': {},  # Dict[int, str] - ID to filepath mapping
-    'related_file_id_counter': 1,  # Counter for generating unique file IDs
-    'plan_completed': False,
-    'agent_depth': 0,
-    'work_log': []  # List[WorkLogEntry] - Timestamped work events
-}
+def new_memory() -> Dict[str, Any]:
+    """Create an empty memory store with the default structure."""
+    return {
+        'research_notes': [],  # List[PrioritizedNote]
+        'research_note_id_counter': 1,  # Counter for generating note sequence numbers
+        'plans': [],
+        'tasks': {},  # Dict[int, str] - ID to task mapping
+        'task_completed': False,  # Flag indicating if task is complete
+        'completion_message': '',  # Message explaining completion
+        'task_id_counter': 1,  # Counter for generating unique task IDs
+        'key_facts': {},  # Dict[int, PrioritizedFact] - ID to fact mapping
+        'key_fact_id_counter': 1,  # Counter for generating unique fact IDs
+        'key_snippets': {},  # Dict[int, PrioritizedSnippet] - ID to snippet mapping
+        'key_snippet_id_counter': 1,  # Counter for generating unique snippet IDs
+        'implementation_requested': False,
+        'related_files': {},  # Dict[int, str] - ID to filepath mapping
+        'related_file_index': {},  # Dict[str, int] - normalized filepath to ID mapping
+        'related_file_id_counter': 1,  # Counter for generating unique file IDs
+        'plan_completed': False,
+        'agent_depth': 0,
+        'work_log': deque(maxlen=MEMORY_LIMITS['work_log']),  # Deque[WorkLogEntry] - Newest work events
+        'memory_limits': {},  # Dict[str, int] - Per-run overrides of MEMORY_LIMITS
+        'eviction_queues': {},  # Dict[str, EvictionQueue] - Eviction order per memory type
+        'eviction_counts': {},  # Dict[str, int] - Number of items evicted per memory type
+        'memory_versions': {},  # Dict[str, int] - Change counters used to invalidate render_cache
+        'render_cache': {}  # Dict[str, SectionRenderCache] - Rendered markdown per memory section
+    }
+
+class MemorySession:
+    """State belonging to one agent run.
+
+    Holds the memory store used by the memory tools, the pending expert
+    context, the optional durable session store, and a reentrant lock that
+    serializes memory updates from tools running in parallel within the run.
+    """
+
+    def __init__(self, memory: Optional[Dict[str, Any]] = None):
+        self.memory: Dict[str, Any] = memory if memory is not None else new_memory()
+        self.expert_context: Dict[str, List[str]] = {
+            'text': [],    # Additional textual context
+            'files': []    # File paths to include
+        }
+        self.store: Optional[SessionStore] = None
+        self.work_log_sink: Optional[TextIO] = None
+        self.lock = threading.RLock()
+        # IDs of the items present when the session was forked, see fork_memory_session
+        self.fork_point: Optional[Dict[str, set]] = None
+
+# Session used when no session was activated, i.e. a single CLI run
+_default_session = MemorySession()
+
+_current_session: ContextVar[MemorySession] = ContextVar('sparc_memory_session')
+
+def get_current_session() -> MemorySession:
+    """Get the memory session of the current context."""
+    return _current_session.get(_default_session)
+
+@contextmanager
+def memory_session(session: Optional[MemorySession] = None) -> Iterator[MemorySession]:
+    """Run the enclosed code against its own memory session.
+
+    Sessions are carried in a context variable, so each thread or asyncio task
+    that enters its own session sees only its own memory. Agent tool calls run
+    in copies of the calling context and therefore share the caller's session.
+
+    Args:
+        session: Session to activate (defaults to a new, empty session)
+
+    Example:
+        with memory_session():
+            run_research_agent("Explain the auth flow", model, research_only=True)
+    """
+    if session is None:
+        session = MemorySession()
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
+def memory_lock() -> threading.RLock:
+    """Get the lock guarding the current session's memory."""
+    return get_current_session().lock
+
+def with_memory_lock(func: Callable) -> Callable:
+    """Decorator holding the current session's memory lock while func runs."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with memory_lock():
+            return func(*args, **kwargs)
+    return wrapper
+
+class SessionMapping(MutableMapping):
+    """Dict view of a mapping attribute of the current MemorySession."""
+
+    def __init__(self, attribute: str):
+        self._attribute = attribute
+
+    def _target(self) -> Dict[Any, Any]:
+        return getattr(get_current_session(), self._attribute)
+
+    def __getitem__(self, key):
+        return self._target()[key]
+
+    def __setitem__(self, key, value):
+        self._target()[key] = value
+
+    def __delitem__(self, key):
+        del self._target()[key]
+
+    def __iter__(self):
+        return iter(self._target())
+
+    def __len__(self) -> int:
+        return len(self._target())
+
+    def __contains__(self, key) -> bool:
+        return key in self._target()
+
+    def __repr__(self) -> str:
+        return repr(self._target())
+
+    def get(self, key, default=None):
+        return self._target().get(key, default)
+
+    def setdefault(self, key, default=None):
+        return self._target().setdefault(key, default)
+
+    def clear(self) -> None:
+        self._target().clear()
+
+    def update(self, *args, **kwargs) -> None:
+        self._target().update(*args, **kwargs)
+
+# Memory store of the current session
+_global_memory = SessionMapping('memory')
+
+# Memory keys saved to the attached session store, if any
+PERSISTENT_MEMORY_KEYS = (
+    'base_task',
+    'research_completed',
+    'research_notes',
+    'research_note_id_counter',
+    'plans',
+    'tasks',
+    'task_id_counter',
+    'key_facts',
+    'key_fact_id_counter',
+    'key_snippets',
+    'key_snippet_id_counter',
+    'implementation_requested',
+    'related_files',
+    'related_file_id_counter',
+    'plan_completed',
+    'work_log',
+    'memory_limits',
+    'eviction_counts'
+)
+
+# Memory keys holding ID keyed dicts (JSON object keys are always strings)
+_INT_KEYED_MEMORY_KEYS = ('tasks', 'key_facts', 'key_snippets', 'related_files')
+
+@with_memory_lock
+def attach_session_store(store: SessionStore, resume: bool = False) -> bool:
+    """Mirror memory to a session store so it survives restarts.
+
+    Args:
+        store: The store to save memory to
+        resume: If True, load previously saved memory from the store first.
+            Otherwise the store is reset to the current memory.
+
+    Returns:
+        True if saved memory was restored from the store
+    """
+    get_current_session().store = store
+
+    restored = False
+    if resume and store.exists():
+        for key, value in store.load().items():
+            if key in _INT_KEYED_MEMORY_KEYS:
+                value = {int(item_id): item for item_id, item in value.items()}
+            _global_memory[key] = value
+        # Derived indexes are rebuilt lazily from the restored stores
+        _global_memory['related_file_index'] = None
+        restored = True
+    else:
+        store.clear()
+
+    persist_memory(*PERSISTENT_MEMORY_KEYS)
+    return restored
+
+# Memory keys derived from other keys, rebuilt on demand rather than copied
+_DERIVED_MEMORY_KEYS = ('eviction_queues', 'render_cache', 'memory_versions', 'related_file_index')
+
+def fork_memory_session() -> MemorySession:
+    """Create a session whose memory starts as a copy of the current session's.
+
+    Lets sub-agents run in parallel without seeing each other's changes. The
+    run configuration is shared rather than copied, and the fork starts with
+    an empty work log. Use merge_memory_session() to bring its changes back.
+
+    Returns:
+        The forked session, not yet activated
+    """
+    parent = get_current_session()
+    with parent.lock:
+        _number_notes(parent.memory)
+        memory = {
+            key: copy.deepcopy(value)
+            for key, value in parent.memory.items()
+            if key not in _DERIVED_MEMORY_KEYS and key != 'config'
+        }
+        if 'config' in parent.memory:
+            memory['config'] = parent.memory['config']
+    memory['related_file_index'] = None
+    memory['work_log'] = []
+    memory['eviction_counts'] = {}
+
+    session = MemorySession(memory)
+    session.fork_point = {
+        'key_facts': set(memory['key_facts']),
+        'key_snippets': set(memory['key_snippets']),
+        'related_files': set(memory['related_files']),
+        'research_notes': {note['seq'] for note in memory['research_notes']}
+    }
+    return session
+
+@with_memory_lock
+def merge_memory_session(child: MemorySession) -> None:
+    """Merge the memory changes of a forked session into the current session.
+
+    Key facts, key snippets, research notes and related files the child added
+    are stored under new IDs (related files are deduplicated by path). Facts,
+    snippets and related files from before the fork that the child deleted
+    are deleted here as well. The child's work log and eviction counts are
+    appended.
+
+    Args:
+        child: A session created by fork_memory_session()
+
+    Raises:
+        ValueError: If the session was not forked
+    """
+    if child.fork_point is None:
+        raise ValueError("Only sessions created by fork_memory_session() can be merged")
+    memory, fork_point = child.memory, child.fork_point
+
+    for memory_type, counter in (('key_facts', 'key_fact_id_counter'), ('key_snippets', 'key_snippet_id_counter')):
+        items = _global_memory[memory_type]
+        for item_id in fork_point[memory_type]:
+            if item_id not in memory[memory_type]:
+                items.pop(item_id, None)
+        for item_id, item in sorted(memory[memory_type].items()):
+            if item_id in fork_point[memory_type]:
+                continue
+            new_id = _global_memory[counter]
+            _global_memory[counter] += 1
+            items[new_id] = item
+            _track_memory_item(memory_type, new_id, item)
+        _bump_memory_version(memory_type)
+        _enforce_memory_limit(memory_type)
+
+    _number_notes(_global_memory)
+    for note in memory['research_notes']:
+        if note.get('seq') not in fork_point['research_notes']:
+            note['seq'] = _next_note_seq()
+            _global_memory['research_notes'].append(note)
+            _track_memory_item('research_notes', None, note)
+    _enforce_memory_limit('research_notes')
+
+    files = _global_memory['related_files']
+    index = _related_file_index()
+    for file_id in fork_point['related_files']:
+        if file_id not in memory['related_files'] and file_id in files:
+            key = _normalize_related_path(files.pop(file_id))
+            if index.get(key) == file_id:
+                del index[key]
+    for file_id, filepath in sorted(memory['related_files'].items()):
+        key = _normalize_related_path(filepath)
+        if file_id in fork_point['related_files'] or index.get(key) in files:
+            continue
+        new_id = _global_memory['related_file_id_counter']
+        _global_memory['related_file_id_counter'] += 1
+        files[new_id] = filepath
+        index[key] = new_id
+
+    for entry in memory['work_log']:
+        _append_work_log_entry(entry)
+
+    for memory_type, count in memory['eviction_counts'].items():
+        _record_evictions(memory_type, count)
+
+    if memory.get('implementation_requested'):
+        _global_memory['implementation_requested'] = True
+
+    persist_memory(*PERSISTENT_MEMORY_KEYS)
+
+def detach_session_store() -> None:
+    """Stop mirroring memory to the attached session store."""
+    get_current_session().store = None
+
+def persist_memory(*keys: str) -> None:
+    """Save the given memory keys to the attached session store, if any.
+
+    Args:
+        keys: Memory keys to save, normally from PERSISTENT_MEMORY_KEYS
+    """
+    store = get_current_session().store
+    if store is None:
+        return
+    store.save_many({key: _global_memory[key] for key in keys if key in _global_memory})
+
+class EvictionQueue:
+    """Per-priority FIFO queues of memory item keys.
+
+    Eviction victims are taken from the front of the lowest non-empty priority
+    queue, i.e. lowest priority first and oldest first within a priority, which
+    matches ordering items by (priority, timestamp). Pushing and popping are O(1).
+    Keys of items removed by other means (e.g. delete_key_facts) are skipped
+    lazily when they reach the front of their queue.
+    """
+
+    def __init__(self, source: Any = None):
+        # The container whose items are queued, used to detect replaced stores
+        self.source = source
+        self._queues: Dict[int, Deque[Hashable]] = {
+            priority: deque()
+            for priority in range(MemoryPriority.LOW, MemoryPriority.CRITICAL + 1)
+        }
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, priority: int, key: Hashable) -> None:
+        """Queue a key for eviction after all older keys of the same priority."""
+        priority = min(max(priority, MemoryPriority.LOW), MemoryPriority.CRITICAL)
+        self._queues[priority].append(key)
+        self._size += 1
+
+    def pop_victim(self, is_live: Callable[[Hashable], bool]) -> Optional[Hashable]:
+        """Remove and return the next key to evict, skipping keys that are no longer live."""
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while queue:
+                key = queue.popleft()
+                self._size -= 1
+                if is_live(key):
+                    return key
+        return None
+
+    def compact(self, is_live: Callable[[Hashable], bool]) -> None:
+        """Drop keys that are no longer live."""
+        for priority, queue in self._queues.items():
+            self._queues[priority] = deque(key for key in queue if is_live(key))
+        self._size = sum(len(queue) for queue in self._queues.values())
+
+
+def get_memory_limit(memory_type: str) -> Optional[int]:
+    """Get the item limit for a memory type, honoring per-run overrides.
+
+    Args:
+        memory_type: The memory type, e.g. 'key_facts'
+
+    Returns:
+        The maximum number of items to keep, or None if the type is unbounded
+    """
+    overrides = _global_memory.get('memory_limits') or {}
+    return overrides.get(memory_type, MEMORY_LIMITS.get(memory_type))
+
+@with_memory_lock
+def set_memory_limits(limits: Dict[str, int]) -> None:
+    """Override MEMORY_LIMITS for the current run.
+
+    Limits are applied immediately, evicting items if the new limit is lower
+    than the number of items currently stored.
+
+    Args:
+        limits: Mapping of memory type to maximum number of items
+
+    Raises:
+        ValueError: If a memory type is unknown or a limit is not positive
+    """
+    for memory_type, limit in limits.items():
+        if memory_type not in MEMORY_LIMITS:
+            raise ValueError(f"Unknown memory type: {memory_type}")
+        if limit < 1:
+            raise ValueError(f"Memory limit for {memory_type} must be at least 1")
+
+    _global_memory.setdefault('memory_limits', {}).update(limits)
+    for memory_type in limits:
+        _enforce_memory_limit(memory_type)
+    persist_memory('memory_limits', *limits)
+
+def get_eviction_stats() -> Dict[str, int]:
+    """Get the number of items evicted per memory type.
+
+    Returns:
+        Mapping of memory type to eviction count
+    """
+    return dict(_global_memory.get('eviction_counts') or {})
+
+def _record_evictions(memory_type: str, count: int) -> None:
+    """Add to the eviction counter for a memory type."""
+    counts = _global_memory.setdefault('eviction_counts', {})
+    counts[memory_type] = counts.get(memory_type, 0) + count
+
+def _next_note_seq() -> int:
+    """Get the sequence number of a new research note."""
+    seq = _global_memory.get('research_note_id_counter', 1)
+    _global_memory['research_note_id_counter'] = seq + 1
+    return seq
+
+def _number_notes(memory: Dict[str, Any]) -> None:
+    """Renumber research notes in list order if any lacks a sequence number or is out of order.
+
+    Notes stored before sequence numbers existed, or added to the list
+    directly, get one here.
+    """
+    notes = memory['research_notes']
+    seqs = [note.get('seq') for note in notes]
+    if None not in seqs and all(a < b for a, b in zip(seqs, seqs[1:])):
+        return
+    counter = max([memory.get('research_note_id_counter', 1)] + [seq + 1 for seq in seqs if seq is not None])
+    for note in notes:
+        note['seq'] = counter
+        counter += 1
+    memory['research_note_id_counter'] = counter
+
+def _note_position(notes: List[PrioritizedNote], seq: int) -> Optional[int]:
+    """Find a research note by sequence number with a binary search."""
+    low, high = 0, len(notes)
+    while low < high:
+        middle = (low + high) // 2
+        if notes[middle].get('seq', -1) < seq:
+            low = middle + 1
+        else:
+            high = middle
+    if low < len(notes) and notes[low].get('seq') == seq:
+        return low
+    return None
+
+def _item_is_live(memory_type: str) -> Callable[[Hashable], bool]:
+    """Build a liveness check for eviction queue keys of a memory type."""
+    items = _global_memory[memory_type]
+    if memory_type == 'research_notes':
+        return lambda key: _note_position(items, key) is not None
+    return lambda key: key in items
+
+def _queue_key(memory_type: str, key: Hashable, item: Dict[str, Any]) -> Hashable:
+    """Get the eviction queue key for an item.
+
+    Research notes are stored in a list without IDs, so they are queued by
+    their sequence number; other types are queued by their memory ID.
+    """
+    return item['seq'] if memory_type == 'research_notes' else key
+
+def _rebuild_eviction_queue(memory_type: str) -> EvictionQueue:
+    """Rebuild the eviction queue for a memory type from its stored items."""
+    items = _global_memory[memory_type]
+    if memory_type == 'research_notes':
+        _number_notes(_global_memory)
+    entries = enumerate(items) if memory_type == 'research_notes' else items.items()
+    queue = EvictionQueue(items)
+    for key, item in sorted(entries, key=lambda x: (x[1]['priority'], x[1]['timestamp'])):
+        queue.push(item['priority'], _queue_key(memory_type, key, item))
+    _global_memory.setdefault('eviction_queues', {})[memory_type] = queue
+    return queue
+
+def _get_eviction_queue(memory_type: str) -> EvictionQueue:
+    """Get the eviction queue for a memory type, rebuilding it if it is missing or stale."""
+    items = _global_memory[memory_type]
+    queue = (_global_memory.get('eviction_queues') or {}).get(memory_type)
+    if queue is None or queue.source is not items or len(queue) < len(items):
+        queue = _rebuild_eviction_queue(memory_type)
+    return queue
+
+def _track_memory_item(memory_type: str, key: Hashable, item: Dict[str, Any]) -> None:
+    """Register a newly stored prioritized item for eviction ordering.
+
+    Args:
+        memory_type: One of 'research_notes', 'key_facts' or 'key_snippets'
+        key: The item's memory ID (ignored for research notes)
+        item: The stored item
+    """
+    items = _global_memory[memory_type]
+    queue = (_global_memory.get('eviction_queues') or {}).get(memory_type)
+    if queue is None or queue.source is not items or len(queue) < len(items) - 1:
+        # The rebuilt queue already includes the new item
+        _rebuild_eviction_queue(memory_type)
+        return
+    queue.push(item['priority'], _queue_key(memory_type, key, item))
+    # Keep lazily deleted keys from piling up
+    if len(queue) > 2 * len(items) + 16:
+        queue.compact(_item_is_live(memory_type))
+
+def _evict_item(memory_type: str, key: Hashable) -> bool:
+    """Remove an evicted item from its store.
+
+    Returns:
+        True if an item was removed
+    """
+    items = _global_memory[memory_type]
+    if memory_type == 'research_notes':
+        position = _note_position(items, key)
+        if position is None:
+            return False
+        del items[position]
+        return True
+    return items.pop(key, None) is not None
 
 def _enforce_memory_limit(memory_type: str) -> None:
     """Enforce memory limits by removing lowest priority, oldest items first."""
-    from datetime import datetime
-    
-    if memory_type not in MEMORY_LIMITS:
+    limit = get_memory_limit(memory_type)
+    if limit is None:
         return
-        
-    limit = MEMORY_LIMITS[memory_type]
-    
-    if memory_type == 'research_notes':
-        notes = _global_memory['research_notes']
-        if len(notes) > limit:
-            # Sort by priority (ascending) then timestamp (ascending)
-            notes.sort(key=lambda x: (x['priority'], x['timestamp']))
-            # Remove oldest, lowest priority items
-            _global_memory['research_notes'] = notes[-limit:]
-            
-    elif memory_type in ['key_facts', 'key_snippets']:
+
+    if memory_type in ['research_notes', 'key_facts', 'key_snippets']:
         items = _global_memory[memory_type]
-        if len(items) > limit:
-            # Sort items by priority and timestamp
-            sorted_items = sorted(
-                items.items(),
-                key=lambda x: (x[1]['priority'], x[1]['timestamp'])
-            )
-            # Keep only the highest priority, newest items
-            items_to_keep = dict(sorted_items[-limit:])
-            _global_memory[memory_type] = items_to_keep
+        if len(items) <= limit:
+            return
+        queue = _get_eviction_queue(memory_type)
+        is_live = _item_is_live(memory_type)
+        evicted = 0
+        rebuilt = False
+        while len(items) > limit:
+            victim = queue.pop_victim(is_live)
+            if victim is None:
+                if rebuilt:
+                    break
+                # Items were stored without being tracked; re-derive the order once
+                queue = _rebuild_eviction_queue(memory_type)
+                rebuilt = True
+                continue
+            if _evict_item(memory_type, victim):
+                evicted += 1
+        if evicted:
+            _record_evictions(memory_type, evicted)
+            _bump_memory_version(memory_type)
             
     elif memory_type == 'work_log':
-        log = _global_memory['work_log']
-        if len(log) > limit:
-            # Keep newest entries
-            _global_memory['work_log'] = log[-limit:]
+        _work_log()
 
 @tool("emit_research_notes")
+@with_memory_lock
 def emit_research_notes(notes: str, priority: int = MemoryPriority.MEDIUM) -> str:
     """Store research notes in global memory with priority.
     
@@ -121,11 +625,14 @@ def emit_research_notes(notes: str, priority: int = MemoryPriority.MEDIUM) -> st
     note = PrioritizedNote(
         content=notes,
         priority=min(max(priority, MemoryPriority.LOW), MemoryPriority.CRITICAL),
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        seq=_next_note_seq()
     )
     
     _global_memory['research_notes'].append(note)
+    _track_memory_item('research_notes', None, note)
     _enforce_memory_limit('research_notes')
+    persist_memory('research_notes', 'research_note_id_counter', 'eviction_counts')
     
     priority_labels = {
         MemoryPriority.LOW: "Low Priority",
@@ -141,6 +648,7 @@ def emit_research_notes(notes: str, priority: int = MemoryPriority.MEDIUM) -> st
     return notes
 
 @tool("emit_plan")
+@with_memory_lock
 def emit_plan(plan: str) -> str:
     """Store a plan step in global memory.
     
@@ -151,11 +659,13 @@ def emit_plan(plan: str) -> str:
         The stored plan
     """
     _global_memory['plans'].append(plan)
+    persist_memory('plans')
     console.print(Panel(Markdown(plan), title="📋 Plan"))
     log_work_event(f"Added plan step:\n\n{plan}")
     return plan
 
 @tool("emit_task")
+@with_memory_lock
 def emit_task(task: str) -> str:
     """Store a task in global memory.
     
@@ -171,6 +681,7 @@ def emit_task(task: str) -> str:
     
     # Store task with ID
     _global_memory['tasks'][task_id] = task
+    persist_memory('tasks', 'task_id_counter')
     
     console.print(Panel(Markdown(task), title=f"✅ Task #{task_id}"))
     log_work_event(f"Task #{task_id} added:\n\n{task}")
@@ -179,6 +690,7 @@ def emit_task(task: str) -> str:
 
 
 @tool("emit_key_facts")
+@with_memory_lock
 def emit_key_facts(facts: List[str], priority: int = MemoryPriority.MEDIUM) -> str:
     """Store multiple key facts about the project or current task in global memory.
     
@@ -200,11 +712,13 @@ def emit_key_facts(facts: List[str], priority: int = MemoryPriority.MEDIUM) -> s
         _global_memory['key_fact_id_counter'] += 1
         
         # Store fact with ID and priority
-        _global_memory['key_facts'][fact_id] = PrioritizedFact(
+        prioritized_fact = PrioritizedFact(
             content=fact,
             priority=priority,
             timestamp=datetime.now().isoformat()
         )
+        _global_memory['key_facts'][fact_id] = prioritized_fact
+        _track_memory_item('key_facts', fact_id, prioritized_fact)
         
         # Display panel with ID and priority
         priority_labels = {
@@ -223,12 +737,15 @@ def emit_key_facts(facts: List[str], priority: int = MemoryPriority.MEDIUM) -> s
         # Add result message
         results.append(f"Stored fact #{fact_id}: {fact}")
     
+    _bump_memory_version('key_facts')
     _enforce_memory_limit('key_facts')
+    persist_memory('key_facts', 'key_fact_id_counter', 'eviction_counts')
     log_work_event(f"Stored {len(facts)} key facts.")    
     return "Facts stored."
 
 
 @tool("delete_key_facts")
+@with_memory_lock
 def delete_key_facts(fact_ids: List[int]) -> str:
     """Delete multiple key facts from global memory by their IDs.
     Silently skips any IDs that don't exist.
@@ -244,14 +761,17 @@ def delete_key_facts(fact_ids: List[int]) -> str:
         if fact_id in _global_memory['key_facts']:
             # Delete the fact
             deleted_fact = _global_memory['key_facts'].pop(fact_id)
+            _bump_memory_version('key_facts')
             success_msg = f"Successfully deleted fact #{fact_id}: {deleted_fact}"
             console.print(Panel(Markdown(success_msg), title="Fact Deleted", border_style="green"))
             results.append(success_msg)
     
+    persist_memory('key_facts')
     log_work_event(f"Deleted facts {fact_ids}.")        
     return "Facts deleted."
 
 @tool("delete_tasks")
+@with_memory_lock
 def delete_tasks(task_ids: List[int]) -> str:
     """Delete multiple tasks from global memory by their IDs.
     Silently skips any IDs that don't exist.
@@ -273,10 +793,12 @@ def delete_tasks(task_ids: List[int]) -> str:
                               border_style="green"))
             results.append(success_msg)
     
+    persist_memory('tasks')
     log_work_event(f"Deleted tasks {task_ids}.")        
     return "Tasks deleted."
 
 @tool("request_implementation")
+@with_memory_lock
 def request_implementation() -> str:
     """Request that implementation proceed after research/planning.
     Used to indicate the agent should move to implementation stage.
@@ -290,6 +812,7 @@ def request_implementation() -> str:
         Empty string
     """
     _global_memory['implementation_requested'] = True
+    persist_memory('implementation_requested')
     console.print(Panel("🚀 Implementation Requested", style="yellow", padding=0))
     log_work_event("Implementation requested.")
     return ""
@@ -297,6 +820,7 @@ def request_implementation() -> str:
 
 
 @tool("emit_key_snippets")
+@with_memory_lock
 def emit_key_snippets(snippets: List[SnippetInfo], priority: int = MemoryPriority.MEDIUM) -> str:
     """Store multiple key source code snippets in global memory.
     Automatically adds the filepaths of the snippets to related files.
@@ -331,6 +855,7 @@ def emit_key_snippets(snippets: List[SnippetInfo], priority: int = MemoryPriorit
             timestamp=datetime.now().isoformat()
         )
         _global_memory['key_snippets'][snippet_id] = prioritized_snippet
+        _track_memory_item('key_snippets', snippet_id, prioritized_snippet)
         
         # Format display text as markdown
         priority_labels = {
@@ -364,11 +889,14 @@ def emit_key_snippets(snippets: List[SnippetInfo], priority: int = MemoryPriorit
         
         results.append(f"Stored snippet #{snippet_id}")
     
+    _bump_memory_version('key_snippets')
     _enforce_memory_limit('key_snippets')
+    persist_memory('key_snippets', 'key_snippet_id_counter', 'eviction_counts')
     log_work_event(f"Stored {len(snippets)} code snippets.")    
     return "Snippets stored."
 
-@tool("delete_key_snippets") 
+@tool("delete_key_snippets")
+@with_memory_lock
 def delete_key_snippets(snippet_ids: List[int]) -> str:
     """Delete multiple key snippets from global memory by their IDs.
     Silently skips any IDs that don't exist.
@@ -384,16 +912,19 @@ def delete_key_snippets(snippet_ids: List[int]) -> str:
         if snippet_id in _global_memory['key_snippets']:
             # Delete the snippet
             deleted_snippet = _global_memory['key_snippets'].pop(snippet_id)
+            _bump_memory_version('key_snippets')
             success_msg = f"Successfully deleted snippet #{snippet_id} from {deleted_snippet['filepath']}"
             console.print(Panel(Markdown(success_msg), 
                               title="Snippet Deleted", 
                               border_style="green"))
             results.append(success_msg)
     
+    persist_memory('key_snippets')
     log_work_event(f"Deleted snippets {snippet_ids}.")        
     return "Snippets deleted."
 
 @tool("swap_task_order")
+@with_memory_lock
 def swap_task_order(id1: int, id2: int) -> str:
     """Swap the order of two tasks in global memory by their IDs.
     
@@ -415,6 +946,7 @@ def swap_task_order(id1: int, id2: int) -> str:
     # Swap the tasks
     _global_memory['tasks'][id1], _global_memory['tasks'][id2] = \
         _global_memory['tasks'][id2], _global_memory['tasks'][id1]
+    persist_memory('tasks')
     
     # Display what was swapped
     console.print(Panel(
@@ -426,6 +958,7 @@ def swap_task_order(id1: int, id2: int) -> str:
     return "Tasks swapped."
 
 @tool("one_shot_completed")
+@with_memory_lock
 def one_shot_completed(message: str) -> str:
     """Signal that a one-shot task has been completed and execution should stop.
 
@@ -444,6 +977,7 @@ def one_shot_completed(message: str) -> str:
     return "Completion noted."
 
 @tool("task_completed")
+@with_memory_lock
 def task_completed(message: str) -> str:
     """Mark the current task as completed with a completion message.
     
@@ -459,6 +993,7 @@ def task_completed(message: str) -> str:
     return "Completion noted."
 
 @tool("plan_implementation_completed")
+@with_memory_lock
 def plan_implementation_completed(message: str) -> str:
     """Mark the entire implementation plan as completed.
     
@@ -472,6 +1007,7 @@ def plan_implementation_completed(message: str) -> str:
     _global_memory['completion_message'] = message
     _global_memory['tasks'].clear()  # Clear task list when plan is completed
     _global_memory['task_id_counter'] = 1
+    persist_memory('plan_completed', 'tasks', 'task_id_counter')
     console.print(Panel(Markdown(message), title="✅ Plan Executed"))
     log_work_event(f"Plan execution completed:\n\n{message}")
     return "Plan completion noted and task list cleared."
@@ -485,7 +1021,25 @@ def get_related_files() -> List[str]:
     files = _global_memory['related_files']
     return [f"ID#{file_id} {filepath}" for file_id, filepath in sorted(files.items())]
 
+def _normalize_related_path(filepath: str) -> str:
+    """Normalize a file path for use as a related file index key.
+
+    Paths are resolved against the current working directory so that
+    `./foo.py`, `foo.py` and `/abs/path/foo.py` all share one entry.
+    """
+    return os.path.normcase(os.path.realpath(os.path.expanduser(filepath)))
+
+def _related_file_index() -> Dict[str, int]:
+    """Get the normalized path -> file ID index, rebuilding it if missing or stale."""
+    files = _global_memory['related_files']
+    index = _global_memory.get('related_file_index')
+    if index is None or len(index) != len(files):
+        index = {_normalize_related_path(fpath): fid for fid, fpath in files.items()}
+        _global_memory['related_file_index'] = index
+    return index
+
 @tool("emit_related_files")
+@with_memory_lock
 def emit_related_files(files: List[str]) -> str:
     """Store multiple related files that tools should work with.
     
@@ -497,17 +1051,15 @@ def emit_related_files(files: List[str]) -> str:
     """
     results = []
     added_files = []
+    index = _related_file_index()
     
     # Process files
     for file in files:
-        # Check if file path already exists in values
-        existing_id = None
-        for fid, fpath in _global_memory['related_files'].items():
-            if fpath == file:
-                existing_id = fid
-                break
+        # Check if file path is already registered
+        key = _normalize_related_path(file)
+        existing_id = index.get(key)
                 
-        if existing_id is not None:
+        if existing_id is not None and existing_id in _global_memory['related_files']:
             # File exists, use existing ID
             results.append(f"File ID #{existing_id}: {file}")
         else:
@@ -517,9 +1069,13 @@ def emit_related_files(files: List[str]) -> str:
             
             # Store file with ID
             _global_memory['related_files'][file_id] = file
+            index[key] = file_id
             added_files.append((file_id, file))
             results.append(f"File ID #{file_id}: {file}")
     
+    if added_files:
+        persist_memory('related_files', 'related_file_id_counter')
+
     # Rich output - single consolidated panel
     if added_files:
         files_added_md = '\n'.join(f"- `{file}`" for id, file in added_files)
@@ -531,11 +1087,13 @@ def emit_related_files(files: List[str]) -> str:
     return '\n'.join(results)
 
 
+@with_memory_lock
 def log_work_event(event: str) -> str:
     """Add timestamped entry to work log.
     
     Internal function used to track major events during agent execution.
-    Each entry is stored with an ISO format timestamp.
+    Each entry is stored with its time in seconds since the epoch, shown as
+    local ISO 8601 time by get_work_log().
     
     Args:
         event: Description of the event to log
@@ -545,23 +1103,35 @@ def log_work_event(event: str) -> str:
         
     Note:
         Entries can be retrieved with get_work_log() as markdown formatted text.
-        Older entries are automatically removed when limit is reached.
+        The log is a ring buffer: the oldest entry is dropped once the limit
+        is reached. Entries are also appended to the work log sink, if set.
     """
-    from datetime import datetime
     entry = WorkLogEntry(
-        timestamp=datetime.now().isoformat(),
+        timestamp=time.time(),
         event=event
     )
-    _global_memory['work_log'].append(entry)
-    _enforce_memory_limit('work_log')
+    _append_work_log_entry(entry)
+    persist_memory('work_log')
     return f"Event logged: {event}"
 
+def _append_work_log_entry(entry: WorkLogEntry) -> None:
+    """Add an entry to the work log ring buffer and the work log sink."""
+    log = _work_log()
+    if len(log) == log.maxlen:
+        # The deque drops the oldest entry on append
+        _record_evictions('work_log', 1)
+    log.append(entry)
+
+    sink = get_current_session().work_log_sink
+    if sink is not None:
+        sink.write(json.dumps(entry) + "\n")
+
 
 def get_work_log() -> str:
     """Return formatted markdown of work log entries.
     
     Returns:
-        Markdown formatted text with timestamps as headings and events as content,
+        Markdown formatted text with timestamps (local ISO 8601 time) as headings and events as content,
         or 'No work log entries' if the log is empty.
         
     Example:
@@ -575,7 +1145,7 @@ def get_work_log() -> str:
     entries = []
     for entry in _global_memory['work_log']:
         entries.extend([
-            f"## {entry['timestamp']}",
+            f"## {_format_timestamp(entry['timestamp'])}",
             "",
             entry['event'],
             ""  # Blank line between entries
@@ -584,6 +1154,64 @@ def get_work_log() -> str:
     return "\n".join(entries).rstrip()  # Remove trailing newline
 
 
+def _work_log() -> Deque[WorkLogEntry]:
+    """Get the work log ring buffer, sized to the current work log limit.
+
+    Logs restored from a session store or assigned directly are plain lists;
+    they are converted here, keeping only the newest entries.
+    """
+    log = _global_memory['work_log']
+    limit = get_memory_limit('work_log')
+    if not isinstance(log, deque) or log.maxlen != limit:
+        dropped = max(len(log) - limit, 0)
+        if dropped:
+            _record_evictions('work_log', dropped)
+        log = deque(log, maxlen=limit)
+        _global_memory['work_log'] = log
+    return log
+
+def _format_timestamp(timestamp: Union[float, str]) -> str:
+    """Render a work log timestamp as local ISO 8601 time."""
+    if isinstance(timestamp, str):
+        # Entries logged before timestamps were stored as epoch seconds
+        return timestamp
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds')
+
+# Sinks opened by set_work_log_sink and not closed yet
+_open_work_log_sinks: set = set()
+
+@with_memory_lock
+def set_work_log_sink(path: Optional[str]) -> None:
+    """Also append work log events to a JSON Lines file.
+
+    Each event is written as one line as it is logged, so the file can be
+    followed (e.g. with tail -f) while the in-memory log only keeps the newest
+    entries.
+
+    Args:
+        path: File to append events to, or None to stop writing to the sink
+    """
+    session = get_current_session()
+    if session.work_log_sink is not None:
+        session.work_log_sink.close()
+        _open_work_log_sinks.discard(session.work_log_sink)
+        session.work_log_sink = None
+    if path is not None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Line buffered so each event reaches the file as soon as it is logged
+        session.work_log_sink = open(path, 'a', buffering=1, encoding='utf-8')
+        _open_work_log_sinks.add(session.work_log_sink)
+
+def _close_work_log_sinks() -> None:
+    """Close the work log sinks still open at exit."""
+    for sink in list(_open_work_log_sinks):
+        sink.close()
+    _open_work_log_sinks.clear()
+
+atexit.register(_close_work_log_sinks)
+
+@with_memory_lock
 def reset_work_log() -> str:
     """Clear the work log.
     
@@ -594,10 +1222,12 @@ def reset_work_log() -> str:
         This permanently removes all work log entries. The operation cannot be undone.
     """
     _global_memory['work_log'].clear()
+    persist_memory('work_log')
     return "Work log cleared"
 
 
 @tool("deregister_related_files")
+@with_memory_lock
 def deregister_related_files(file_ids: List[int]) -> str:
     """Delete multiple related files from global memory by their IDs.
     Silently skips any IDs that don't exist.
@@ -609,18 +1239,113 @@ def deregister_related_files(file_ids: List[int]) -> str:
         Success message string
     """
     results = []
+    index = _related_file_index()
     for file_id in file_ids:
         if file_id in _global_memory['related_files']:
-            # Delete the file reference
+            # Delete the file reference and its index entry
             deleted_file = _global_memory['related_files'].pop(file_id)
+            key = _normalize_related_path(deleted_file)
+            if index.get(key) == file_id:
+                del index[key]
             success_msg = f"Successfully removed related file #{file_id}: {deleted_file}"
             console.print(Panel(Markdown(success_msg), 
                               title="File Reference Removed", 
                               border_style="green"))
             results.append(success_msg)
             
+    persist_memory('related_files')
     return "File references removed."
 
+def _render_key_fact(fact_id: int, fact: PrioritizedFact) -> str:
+    """Render a key fact as a markdown section."""
+    return "\n".join([
+        f"## 🔑 Key Fact #{fact_id}",
+        "",  # Empty line for better markdown spacing
+        fact['content']
+    ])
+
+def _render_key_snippet(snippet_id: int, snippet: PrioritizedSnippet) -> str:
+    """Render a key snippet as a markdown section."""
+    snippet_text = [
+        f"## 📝 Code Snippet #{snippet_id}",
+        "",  # Empty line for better markdown spacing
+        f"**Source Location**:",
+        f"- File: `{snippet['filepath']}`",
+        f"- Line: `{snippet['line_number']}`",
+        "",  # Empty line before code block
+        "**Code**:",
+        "```python",
+        snippet['snippet'].rstrip(),  # Remove trailing whitespace
+        "```"
+    ]
+    if snippet['description']:
+        # Add empty line and description
+        snippet_text.extend(["", "**Description**:", snippet['description']])
+    return "\n".join(snippet_text)
+
+class SectionRenderCache:
+    """Rendered markdown for one memory section.
+
+    Holds the full rendered text for the section version it was built from,
+    plus each entry's rendered fragment so that a rebuild only renders entries
+    that were added or replaced since the last call.
+    """
+
+    def __init__(self):
+        self.source: Any = None  # The store the text was rendered from
+        self.version: Optional[int] = None
+        self.size = 0
+        self.text = ""
+        self.fragments: Dict[Hashable, Any] = {}  # ID -> (item, rendered fragment)
+
+def _bump_memory_version(memory_type: str) -> None:
+    """Mark a memory section as changed, invalidating its cached rendering.
+
+    Must be called whenever items of the section are added, replaced or removed.
+    """
+    versions = _global_memory.setdefault('memory_versions', {})
+    versions[memory_type] = versions.get(memory_type, 0) + 1
+
+def _render_section(
+    memory_type: str,
+    render_entry: Callable[[Hashable, Any], str],
+    separator: str
+) -> str:
+    """Render a dict-backed memory section, reusing cached output where possible.
+
+    Args:
+        memory_type: The memory section to render, e.g. 'key_facts'
+        render_entry: Function rendering one (ID, item) pair
+        separator: String placed between rendered entries
+
+    Returns:
+        The rendered entries, sorted by ID and joined with separator
+    """
+    items = _global_memory[memory_type]
+    version = (_global_memory.get('memory_versions') or {}).get(memory_type, 0)
+    caches = _global_memory.setdefault('render_cache', {})
+    cache = caches.get(memory_type)
+    if cache is None:
+        cache = caches[memory_type] = SectionRenderCache()
+
+    if cache.source is items and cache.version == version and cache.size == len(items):
+        return cache.text
+
+    fragments = {}
+    for item_id, item in sorted(items.items()):
+        cached = cache.fragments.get(item_id)
+        if cached is not None and cached[0] is item:
+            fragments[item_id] = cached
+        else:
+            fragments[item_id] = (item, render_entry(item_id, item))
+
+    cache.source = items
+    cache.version = version
+    cache.size = len(items)
+    cache.fragments = fragments
+    cache.text = separator.join(fragment for _, fragment in fragments.values())
+    return cache.text
+
 def get_memory_value(key: str) -> str:
     """Get a value from global memory.
     
@@ -644,47 +1369,89 @@ def get_memory_value(key: str) -> str:
         # For empty dict, return empty string
         if not values:
             return ""
-        # Sort by ID for consistent output and format as markdown sections
-        facts = []
-        for k, v in sorted(values.items()):
-            facts.extend([
-                f"## 🔑 Key Fact #{k}",
-                "",  # Empty line for better markdown spacing
-                v['content'],
-                ""  # Empty line between facts
-            ])
-        return "\n".join(facts).rstrip()  # Remove trailing newline
+        # Sorted by ID for consistent output, rendered as markdown sections
+        return _render_section(key, _render_key_fact, "\n\n").rstrip()  # Remove trailing newline
     
     if key == 'key_snippets':
         if not values:
             return ""
         # Format each snippet with file info and content using markdown
-        snippets = []
-        for k, v in sorted(values.items()):
-            snippet_text = [
-                f"## 📝 Code Snippet #{k}",
-                "",  # Empty line for better markdown spacing
-                f"**Source Location**:",
-                f"- File: `{v['filepath']}`",
-                f"- Line: `{v['line_number']}`",
-                "",  # Empty line before code block
-                "**Code**:",
-                "```python",
-                v['snippet'].rstrip(),  # Remove trailing whitespace
-                "```"
-            ]
-            if v['description']:
-                # Add empty line and description
-                snippet_text.extend(["", "**Description**:", v['description']])
-            snippets.append("\n".join(snippet_text))
-        return "\n\n".join(snippets)
+        return _render_section(key, _render_key_snippet, "\n\n")
     
     if key == 'work_log':
         if not values:
             return ""
-        entries = [f"## {entry['timestamp']}\n{entry['event']}"
+        entries = [f"## {_format_timestamp(entry['timestamp'])}\n{entry['event']}"
                   for entry in values]
         return "\n\n".join(entries)
 
     # For other types (lists), join with newlines
     return "\n".join(str(v) for v in values)
+
+def _budget_entries(key: str) -> List[tuple]:
+    """Get (drop order, rendered entry) pairs for a budgetable memory section.
+
+    Entries are listed in display order. Sorting by drop order gives the
+    eviction order: lowest priority first, oldest first within a priority.
+    """
+    if key in ('key_facts', 'key_snippets'):
+        # Reuse the fragments of the section's render cache, rendering only new entries
+        render = _render_key_fact if key == 'key_facts' else _render_key_snippet
+        _render_section(key, render, "\n\n")
+        fragments = _global_memory['render_cache'][key].fragments
+        return [((item.get('priority', MemoryPriority.MEDIUM), item_id), fragment)
+                for item_id, (item, fragment) in fragments.items()]
+    if key == 'research_notes':
+        return [((note.get('priority', MemoryPriority.MEDIUM), index), note['content'])
+                for index, note in enumerate(_global_memory[key])]
+    if key == 'related_files':
+        return [((MemoryPriority.MEDIUM, index), entry)
+                for index, entry in enumerate(get_related_files())]
+    raise ValueError(f"Memory type cannot be budgeted: {key}")
+
+def get_memory_value_within(key: str, max_tokens: int) -> str:
+    """Get a memory section rendered to fit within a token budget.
+
+    If the full section is too large, whole items are dropped in eviction
+    order (lowest priority first, oldest first within a priority) until the
+    rest fits, and a note says how many were left out. Items are never cut
+    in the middle.
+
+    Args:
+        key: One of 'key_facts', 'key_snippets', 'research_notes' or 'related_files'
+        max_tokens: Estimated token budget for the rendered section
+
+    Returns:
+        The rendered section, possibly with some items omitted
+    """
+    if key in ('key_facts', 'key_snippets'):
+        separator = "\n\n"
+        full = get_memory_value(key)
+    elif key == 'research_notes':
+        separator = "\n"
+        full = separator.join(note['content'] for note in _global_memory[key])
+    elif key == 'related_files':
+        separator = "\n"
+        full = separator.join(get_related_files())
+    else:
+        raise ValueError(f"Memory type cannot be budgeted: {key}")
+    if estimate_tokens(full) <= max_tokens:
+        return full
+
+    entries = _budget_entries(key)
+
+    # Keep the most important items that fit, leaving room for the omission note
+    note = f"[{len(entries)} lower priority {key.replace('_', ' ')} omitted to fit the prompt]"
+    available = max_tokens - estimate_tokens(note)
+    kept = set()
+    for position in sorted(range(len(entries)), key=lambda i: entries[i][0], reverse=True):
+        cost = estimate_tokens(entries[position][1] + separator)
+        if cost > available:
+            break
+        kept.add(position)
+        available -= cost
+
+    omitted = len(entries) - len(kept)
+    parts = [text for position, (_, text) in enumerate(entries) if position in kept]
+    parts.append(f"[{omitted} lower priority {key.replace('_', ' ')} omitted to fit the prompt]")
+    return separator.join(parts)
@@ -8,7 +8,10 @@ from rich.markdown import Markdown
 from rich.text import Text
 from sparc_cli.proc.interactive import run_interactive_command
 from pydantic import BaseModel, Field
-from sparc_cli.text.processing import truncate_output
+from sparc_cli.text.processing import OutputTruncator
+from sparc_cli.search_cache import invalidate_search_cache
+from sparc_cli.tools.memory import _global_memory
+from sparc_cli.config import DEFAULT_COMMAND_TIMEOUT, DEFAULT_COMMAND_MAX_BYTES, DEFAULT_COMMAND_MAX_LINES
 
 console = Console()
 
@@ -70,12 +73,19 @@ Returns: { "output": stdout+stderr, "return_code": 0 if success, "success": True
     try:
         # Run the command interactively
         print()
-        output, return_code = run_interactive_command(command)
+        timeout = _global_memory.get('config', {}).get('command_timeout', DEFAULT_COMMAND_TIMEOUT)
+        output, return_code = run_interactive_command(
+            command,
+            timeout=timeout or None,
+            max_bytes=DEFAULT_COMMAND_MAX_BYTES,
+            max_lines=DEFAULT_COMMAND_MAX_LINES,
+            truncator=OutputTruncator()
+        )
         print()
         
         # Return structured output
         return {
-            "output": truncate_output(output.decode() if output else ""),
+            "output": output.decode('utf-8', errors='replace'),
             "return_code": return_code,
             "success": return_code == 0
         }
@@ -92,6 +102,9 @@ Returns: { "output": stdout+stderr, "return_code": 0 if success, "success": True
             "return_code": 1,
             "success": False
         }
+    finally:
+        # Aider may have changed files even if it failed
+        invalidate_search_cache()
 
 # Export the functions
 __all__ = ['run_programming_task']
@@ -1,13 +1,17 @@
+import base64
+import json
 import os
 import shutil
 import subprocess
-from typing import Dict, Union, Optional, List
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Optional, List
 from langchain_core.tools import tool
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
-from sparc_cli.proc.interactive import run_interactive_command
-from sparc_cli.text.processing import truncate_output
+from sparc_cli.search_cache import cached_search
+from sparc_cli.text.processing import OutputTruncator
 
 console = Console()
 
@@ -35,32 +39,82 @@ def install_ripgrep():
         return False
     return False
 
-def get_rg_command():
-    """Get the ripgrep command, attempting to install if not found."""
-    # First check if rg is already in PATH
-    system_rg = shutil.which('rg')
-    if system_rg:
-        return system_rg
-    
-    # Try to install ripgrep using system package manager
-    if install_ripgrep():
-        system_rg = shutil.which('rg')
-        if system_rg:
-            return system_rg
-    
-    # If system installation fails, use ripgrepy's binary
+RG_NOT_FOUND_MESSAGE = (
+    "ripgrep (rg) is not installed, so code search is unavailable. Install it with your "
+    "package manager (e.g. 'apt-get install ripgrep' or 'brew install ripgrep'), or run "
+    "sparc with --install-ripgrep to have it installed for you."
+)
+
+_rg_lock = threading.Lock()
+_rg_command: Optional[str] = None
+_rg_error: Optional[str] = None
+
+def _bundled_rg() -> Optional[str]:
+    """Get the rg binary shipped with ripgrepy, if there is one."""
     try:
         import ripgrepy
-        ripgrepy_dir = os.path.dirname(ripgrepy.__file__)
-        rg_binary = os.path.join(ripgrepy_dir, 'bin', 'rg')
-        
-        # Make binary executable if it's not
-        if not os.access(rg_binary, os.X_OK):
-            os.chmod(rg_binary, 0o755)
-        
-        return rg_binary
     except ImportError:
-        raise RuntimeError("Could not find or install ripgrep. Please install it manually.")
+        return None
+    rg_binary = os.path.join(os.path.dirname(ripgrepy.__file__), 'bin', 'rg')
+    if not os.path.isfile(rg_binary):
+        return None
+
+    # Make binary executable if it's not
+    if not os.access(rg_binary, os.X_OK):
+        os.chmod(rg_binary, 0o755)
+    return rg_binary
+
+def _validate_rg(rg_path: str) -> bool:
+    """Check that a binary runs and is ripgrep."""
+    try:
+        result = subprocess.run([rg_path, '--version'], capture_output=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0 and result.stdout.startswith(b'ripgrep')
+
+def _find_rg() -> Optional[str]:
+    for candidate in (shutil.which('rg'), _bundled_rg()):
+        if candidate and _validate_rg(candidate):
+            return candidate
+    return None
+
+def get_rg_command(install: bool = False) -> str:
+    """Get the path of a working ripgrep binary.
+
+    The binary is looked up and checked once per process; later calls return
+    the cached result, including a failure, so searches never pay for
+    discovery. ripgrep is only installed when asked to, as that needs sudo
+    and network access.
+
+    Args:
+        install: Try to install ripgrep with the system package manager if
+            it is not found. Only has an effect on the first call.
+
+    Returns:
+        Path to the rg binary
+
+    Raises:
+        RuntimeError: If no working ripgrep binary is available
+    """
+    global _rg_command, _rg_error
+    with _rg_lock:
+        if _rg_command is None and _rg_error is None:
+            rg_path = _find_rg()
+            if rg_path is None and install and install_ripgrep():
+                rg_path = _find_rg()
+            if rg_path is None:
+                _rg_error = RG_NOT_FOUND_MESSAGE
+            _rg_command = rg_path
+        if _rg_error is not None:
+            raise RuntimeError(_rg_error)
+        return _rg_command
+
+def clear_rg_command_cache() -> None:
+    """Forget the resolved ripgrep binary, so the next search looks it up again."""
+    global _rg_command, _rg_error
+    with _rg_lock:
+        _rg_command = None
+        _rg_error = None
 
 
 DEFAULT_EXCLUDE_DIRS = [
@@ -79,6 +133,126 @@ DEFAULT_EXCLUDE_DIRS = [
     '.vscode'
 ]
 
+# Limits on what a search returns, enforced while rg output is read
+DEFAULT_MAX_RESULTS = 500
+DEFAULT_MAX_BYTES = 64 * 1024
+# Longer matching lines (e.g. minified files) are cut to this many characters
+MAX_LINE_CHARS = 300
+
+@dataclass
+class RipgrepMatch:
+    """A line matching a search."""
+    path: str
+    line: int
+    column: int
+    text: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}:{self.column}:{self.text}"
+
+@dataclass
+class RipgrepResult:
+    """Matches of a search and whether they were cut short by a limit."""
+    matches: List[RipgrepMatch] = field(default_factory=list)
+    truncated: bool = False
+    return_code: int = 0
+    error: str = ""
+
+def _rg_json_text(data: Optional[Dict[str, Any]]) -> str:
+    """Decode an rg --json text field, which holds bytes base64 encoded if they are not UTF-8."""
+    if not data:
+        return ""
+    if 'text' in data:
+        return data['text']
+    return base64.b64decode(data.get('bytes', '')).decode('utf-8', errors='replace')
+
+def parse_rg_json_line(line: bytes) -> Optional[RipgrepMatch]:
+    """Parse one line of rg --json output.
+
+    Returns:
+        The match, or None for other message types (begin, end, summary...)
+    """
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return None
+    if message.get('type') != 'match':
+        return None
+
+    data = message['data']
+    text = _rg_json_text(data.get('lines')).rstrip('\r\n')
+    submatches = data.get('submatches') or []
+    # rg reports byte offsets; columns are 1 based
+    column = submatches[0]['start'] + 1 if submatches else 1
+    if len(text) > MAX_LINE_CHARS:
+        text = text[:MAX_LINE_CHARS] + " [...]"
+    return RipgrepMatch(
+        path=_rg_json_text(data.get('path')),
+        line=data.get('line_number') or 0,
+        column=column,
+        text=text
+    )
+
+def run_rg_json(cmd: List[str], max_results: int = DEFAULT_MAX_RESULTS, max_bytes: int = DEFAULT_MAX_BYTES) -> RipgrepResult:
+    """Run rg with --json and collect matches as they are printed.
+
+    rg is stopped as soon as max_results matches or max_bytes of matching
+    text have been read, so a search matching most of a large tree costs no
+    more than one matching a few lines.
+
+    Args:
+        cmd: The rg command, which must include --json
+        max_results: Maximum number of matches to collect
+        max_bytes: Maximum total size of matching text to collect
+
+    Returns:
+        The collected matches
+    """
+    result = RipgrepResult()
+    size = 0
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # Read error output while matches are read, or rg could block on a full
+    # stderr pipe; only its start and end are kept
+    errors = OutputTruncator(head_lines=20, tail_lines=20)
+    def read_errors():
+        for chunk in iter(lambda: process.stderr.read1(65536), b''):
+            errors.feed(chunk)
+    error_reader = threading.Thread(target=read_errors, daemon=True)
+    error_reader.start()
+
+    try:
+        for line in process.stdout:
+            match = parse_rg_json_line(line)
+            if match is None:
+                continue
+            size += len(match.text.encode('utf-8'))
+            if len(result.matches) >= max_results or size > max_bytes:
+                result.truncated = True
+                process.kill()
+                break
+            result.matches.append(match)
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        error_reader.join()
+        process.stderr.close()
+        process.wait()
+
+    result.return_code = 0 if result.truncated else process.returncode
+    if result.return_code not in (0, 1):
+        result.error = errors.text().strip()
+    return result
+
+def format_matches(result: RipgrepResult) -> str:
+    """Format matches as path:line:column:text lines, noting any truncation."""
+    lines = [str(match) for match in result.matches]
+    if result.truncated:
+        lines.append(f"[Results truncated after {len(result.matches)} matches; narrow the search to see more]")
+    return "\n".join(lines)
+
 @tool
 def ripgrep_search(
     pattern: str,
@@ -87,8 +261,11 @@ def ripgrep_search(
     case_sensitive: bool = True,
     include_hidden: bool = False,
     follow_links: bool = False,
-    exclude_dirs: List[str] = None
-) -> Dict[str, Union[str, int, bool]]:
+    exclude_dirs: List[str] = None,
+    max_results: int = DEFAULT_MAX_RESULTS,
+    max_count_per_file: Optional[int] = None,
+    include_matches: bool = False
+) -> Dict[str, Any]:
     """Execute a ripgrep (rg) search with formatting and common options.
 
     Args:
@@ -98,16 +275,32 @@ def ripgrep_search(
         include_hidden: Whether to search hidden files and directories (default: False)
         follow_links: Whether to follow symbolic links (default: False)
         exclude_dirs: Additional directories to exclude (combines with defaults)
+        max_results: Maximum number of matching lines to return (default: 500)
+        max_count_per_file: Optional maximum number of matching lines per file
+        include_matches: Also return the matches as a list of dicts (default: False);
+            they are already in output, so only ask for them when parsing results in code
 
     Returns:
         Dict containing:
-            - output: The formatted search results
-            - return_code: Process return code (0 means success)
+            - output: The matches, one path:line:column:text per line
+            - matches: The matches as dicts with path, line, column and text,
+              only if include_matches is set
+            - truncated: Whether a limit cut the results short
+            - return_code: Process return code (0 means matches found, 1 none)
             - success: Boolean indicating if search succeeded
     """
+    try:
+        rg_path = get_rg_command()
+    except RuntimeError as e:
+        console.print(Panel(str(e), title="❌ Error", border_style="red"))
+        return {
+            "output": str(e),
+            "return_code": 1,
+            "success": False
+        }
+
     # Build rg command with options
-    rg_path = get_rg_command()
-    cmd = [rg_path, '--color', 'always']
+    cmd = [rg_path, '--json', '--no-messages']
     
     if not case_sensitive:
         cmd.append('-i')
@@ -121,47 +314,49 @@ def ripgrep_search(
     if file_type:
         cmd.extend(['-t', file_type])
 
+    if max_count_per_file:
+        cmd.extend(['--max-count', str(max_count_per_file)])
+
     # Add exclusions
     exclusions = DEFAULT_EXCLUDE_DIRS + (exclude_dirs or [])
     for dir in exclusions:
         cmd.extend(['--glob', f'!{dir}'])
 
     # Add the search pattern
-    cmd.append(pattern)
-
-    # Build info sections for display
-    info_sections = []
-    
-    # Search parameters section
-    params = [
-        "## Search Parameters",
-        f"**Pattern**: `{pattern}`",
-        f"**Case Sensitive**: {case_sensitive}",
-        f"**File Type**: {file_type or 'all'}"
-    ]
-    if include_hidden:
-        params.append("**Including Hidden Files**: yes")
-    if follow_links:
-        params.append("**Following Symlinks**: yes")
-    if exclude_dirs:
-        params.append("\n**Additional Exclusions**:")
-        for dir in exclude_dirs:
-            params.append(f"- `{dir}`")
-    info_sections.append("\n".join(params))
+    cmd.extend(['-e', pattern])
 
     # Execute command
     console.print(Panel(Markdown(f"Searching for: **{pattern}**"), title="🔎 Ripgrep Search", border_style="bright_blue"))
     try:
-        print()
-        output, return_code = run_interactive_command(cmd)
-        print()
-        decoded_output = output.decode() if output else ""
-        
-        return {
-            "output": truncate_output(decoded_output),
-            "return_code": return_code,
-            "success": return_code == 0
+        # Repeated searches of an unchanged tree are answered from the cache
+        result, cached = cached_search(
+            'ripgrep_search',
+            {'cmd': cmd[1:], 'max_results': max_results},
+            lambda: run_rg_json(cmd, max_results=max(max_results, 1)),
+            should_cache=lambda result: not result.error
+        )
+        if result.error:
+            console.print(Panel(result.error, title="❌ Error", border_style="red"))
+            output = result.error
+        else:
+            files = len({match.path for match in result.matches})
+            summary = f"{len(result.matches)} matches in {files} files"
+            if result.truncated:
+                summary += " (truncated)"
+            if cached:
+                summary += " (cached)"
+            console.print(summary)
+            output = format_matches(result)
+
+        response = {
+            "output": output,
+            "truncated": result.truncated,
+            "return_code": result.return_code,
+            "success": result.return_code == 0
         }
+        if include_matches:
+            response["matches"] = [asdict(match) for match in result.matches]
+        return response
         
     except Exception as e:
         error_msg = str(e)
@@ -1,31 +1,24 @@
-from typing import Dict, Union
+from typing import Dict, Optional, Union
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
 from sparc_cli.tools.memory import _global_memory
 from sparc_cli.proc.interactive import run_interactive_command
-from sparc_cli.text.processing import truncate_output
+from sparc_cli.proc.shell_session import get_shell_session
+from sparc_cli.search_cache import invalidate_search_cache
+from sparc_cli.text.processing import OutputTruncator
 from sparc_cli.console.cowboy_messages import get_cowboy_message
+from sparc_cli.config import DEFAULT_COMMAND_TIMEOUT, DEFAULT_COMMAND_MAX_BYTES, DEFAULT_COMMAND_MAX_LINES
 
 console = Console()
 
-@tool
-def run_shell_command(command: str) -> Dict[str, Union[str, int, bool]]:
-    """Execute a shell command and return its output.
+def approve_command(command: str, title: str = "🐚 Shell") -> bool:
+    """Show a command and ask the user to approve running it, unless in cowboy mode.
 
-    Important notes:
-    1. Try to constrain/limit the output. Output processing is expensive, and infinite/looping output will cause us to fail.
-    2. When using commands like 'find', 'grep', or similar recursive search tools, always exclude common 
-       development directories and files that can cause excessive output or slow performance:
-       - Version control: .git
-       - Dependencies: node_modules, vendor, .venv
-       - Cache: __pycache__, .cache
-       - Build: dist, build
-       - Environment: .env, venv, env
-       - IDE: .idea, .vscode
-    3. Avoid doing recursive lists, finds, etc. that could be slow and have a ton of output. Likewise, avoid flags like '-l' that needlessly increase the output. But if you really need to, you can.
-    4. Add flags e.g. git --no-pager in order to reduce interaction required by the human.
+    Returns:
+        Whether the command may run
     """
     # Check if we need approval
     cowboy_mode = _global_memory.get('config', {}).get('cowboy_mode', False)
@@ -36,7 +29,7 @@ def run_shell_command(command: str) -> Dict[str, Union[str, int, bool]]:
         console.print("")
 
     # Show just the command in a simple panel
-    console.print(Panel(command, title="🐚 Shell", border_style="bright_yellow"))
+    console.print(Panel(command, title=title, border_style="bright_yellow"))
     
     if not cowboy_mode:
         choices = ["y", "n", "c"]
@@ -50,23 +43,70 @@ def run_shell_command(command: str) -> Dict[str, Union[str, int, bool]]:
         
         if response == "n":
             print()
-            return {
-                "output": "Command execution cancelled by user",
-                "return_code": 1,
-                "success": False
-            }
+            return False
         elif response == "c":
             _global_memory['config']['cowboy_mode'] = True
             console.print("")
             console.print(" " + get_cowboy_message())
             console.print("")
+
+    return True
+
+@tool
+def run_shell_command(
+    command: str,
+    timeout: Optional[int] = None,
+    config: RunnableConfig = None
+) -> Dict[str, Union[str, int, bool]]:
+    """Execute a shell command and return its output.
+
+    Important notes:
+    1. Try to constrain/limit the output. Output processing is expensive, and infinite/looping output will cause us to fail.
+    2. When using commands like 'find', 'grep', or similar recursive search tools, always exclude common 
+       development directories and files that can cause excessive output or slow performance:
+       - Version control: .git
+       - Dependencies: node_modules, vendor, .venv
+       - Cache: __pycache__, .cache
+       - Build: dist, build
+       - Environment: .env, venv, env
+       - IDE: .idea, .vscode
+    3. Avoid doing recursive lists, finds, etc. that could be slow and have a ton of output. Likewise, avoid flags like '-l' that needlessly increase the output. But if you really need to, you can.
+    4. Add flags e.g. git --no-pager in order to reduce interaction required by the human.
+    5. Commands are killed when they run longer than the timeout (10 minutes unless configured otherwise)
+       or write too much output. Pass a longer timeout in seconds for slow builds or test suites.
+    6. When persistent shell sessions are enabled, the working directory and environment variables
+       carry over from one command to the next. Commands never read input.
+    7. For long test suites or builds, use start_background_job instead and keep working while it runs.
+    """
+    if not approve_command(command):
+        return {
+            "output": "Command execution cancelled by user",
+            "return_code": 1,
+            "success": False
+        }
     
     try:
         print()
-        output, return_code = run_interactive_command(['/bin/bash', '-c', command])
+        settings = _global_memory.get('config', {})
+        if timeout is None:
+            timeout = settings.get('command_timeout', DEFAULT_COMMAND_TIMEOUT)
+        limits = dict(
+            timeout=timeout or None,
+            max_bytes=DEFAULT_COMMAND_MAX_BYTES,
+            max_lines=DEFAULT_COMMAND_MAX_LINES,
+            truncator=OutputTruncator()
+        )
+        if settings.get('shell_session'):
+            # Each agent run (thread) keeps its own shell
+            thread_id = (config or {}).get('configurable', {}).get('thread_id', 'default')
+            output, return_code = get_shell_session(str(thread_id)).run(command, **limits)
+        else:
+            output, return_code = run_interactive_command(['/bin/bash', '-c', command], **limits)
+        # The command may have changed files
+        invalidate_search_cache()
         print()
         return {
-            "output": truncate_output(output.decode()) if output else "",
+            "output": output.decode('utf-8', errors='replace'),
             "return_code": return_code,
             "success": return_code == 0
         }
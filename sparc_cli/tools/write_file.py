@@ -5,6 +5,7 @@ from typing import Dict
 from langchain_core.tools import tool
 from rich.console import Console
 from rich.panel import Panel
+from sparc_cli.search_cache import invalidate_search_cache
 
 console = Console()
 
@@ -54,6 +55,7 @@ def write_file_tool(
         with open(filepath, 'w', encoding=encoding) as f:
             f.write(content)
             result["bytes_written"] = len(content.encode(encoding))
+        invalidate_search_cache()
         
         elapsed = time.time() - start_time
         result["elapsed_time"] = elapsed
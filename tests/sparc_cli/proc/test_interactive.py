@@ -1,5 +1,10 @@
+import threading
+import time
+
 import pytest
-from sparc_cli.proc.interactive import run_interactive_command
+from sparc_cli.text.processing import OutputTruncator
+from sparc_cli.proc import interactive
+from sparc_cli.proc.interactive import AnsiStripper, interrupt_commands, run_interactive_command
 
 def test_run_interactive_command():
     """Test that run_interactive_command executes commands and returns output."""
@@ -16,3 +21,83 @@ def test_run_interactive_command_invalid():
     """Test that run_interactive_command handles invalid commands."""
     with pytest.raises(FileNotFoundError):
         run_interactive_command(['nonexistentcommand'])
+
+def test_run_interactive_command_strips_ansi_and_keeps_exit_code():
+    """Test colored output is cleaned and the exit code comes back directly."""
+    output, return_code = run_interactive_command(
+        ['bash', '-c', 'printf "\\033[31mred\\033[0m\\n"; [ -t 1 ] && echo tty; exit 3']
+    )
+    assert output == b'red\ntty\n'
+    assert return_code == 3
+
+def test_run_interactive_command_does_not_wait_for_background_processes():
+    """Test a background process holding the terminal open does not block."""
+    output, return_code = run_interactive_command(['bash', '-c', 'sleep 5 & echo started'])
+    assert output == b'started\n'
+    assert return_code == 0
+
+def test_run_interactive_command_killed_by_signal():
+    """Test a command killed by a signal reports 128 + the signal number."""
+    _, return_code = run_interactive_command(['bash', '-c', 'kill -9 $$'])
+    assert return_code == 137
+
+def test_ansi_stripper_handles_sequences_split_across_chunks():
+    """Test escape sequences cut between chunks are still removed."""
+    data = b"a\x1b[31mb\x1b]0;title\x07c\x1b[0m\x07d"
+    stripper = AnsiStripper()
+    cleaned = b''.join(stripper.feed(data[i:i + 3]) for i in range(0, len(data), 3))
+    assert cleaned + stripper.flush() == b"abcd"
+
+def test_run_interactive_command_timeout_kills_process_group():
+    """Test a command running past its timeout is killed with its children."""
+    start = time.monotonic()
+    output, return_code = run_interactive_command(
+        ['bash', '-c', 'echo begin; sleep 30 & sleep 30'], timeout=0.5
+    )
+    assert time.monotonic() - start < 10
+    assert output == b"begin\n[Command timed out after 0.5 seconds and was killed]\n"
+    assert return_code == 137
+
+def test_run_interactive_command_output_limits():
+    """Test endless output is cut off by the byte and line limits."""
+    output, return_code = run_interactive_command(['yes'], max_lines=1000)
+    assert return_code != 0
+    assert output.startswith(b"y\ny\n")
+    assert output.endswith(b"[Command killed after writing more than 1000 lines of output]\n")
+
+    output, _ = run_interactive_command(['yes'], max_bytes=100000)
+    assert output.endswith(b"[Command killed after writing more than 100000 bytes of output]\n")
+    assert len(output) < 1000000
+
+def test_run_interactive_command_keeps_head_and_tail():
+    """Test the truncator passed in keeps the first and last lines of the output."""
+    output, return_code = run_interactive_command(
+        ['seq', '1', '100000'], truncator=OutputTruncator(head_lines=2, tail_lines=2)
+    )
+    assert return_code == 0
+    assert output == b"1\n2\n[99996 lines of output truncated]\n99999\n100000\n"
+
+def interrupt_soon(delay=0.5):
+    """Interrupt running commands from another thread, as the SIGINT handler would."""
+    timer = threading.Timer(delay, interrupt_commands)
+    timer.start()
+    return timer
+
+def test_run_interactive_command_interrupted():
+    """Test an interrupt stops the command with SIGINT and notes it."""
+    interrupt_soon()
+    start = time.monotonic()
+    output, retcode = run_interactive_command(["/bin/bash", "-c", "echo started; sleep 30"])
+    assert time.monotonic() - start < 10
+    assert retcode == 130
+    assert output == b"started\n[Command interrupted by the user]\n"
+
+def test_run_interactive_command_ignoring_interrupt_is_killed(monkeypatch):
+    """Test a command that ignores SIGINT is killed after the grace period."""
+    monkeypatch.setattr(interactive, 'INTERRUPT_GRACE', 0.3)
+    interrupt_soon()
+    start = time.monotonic()
+    output, retcode = run_interactive_command(["/bin/bash", "-c", "trap '' INT; sleep 30"])
+    assert time.monotonic() - start < 10
+    assert retcode == 137
+    assert b"did not stop" in output
@@ -0,0 +1,94 @@
+import pytest
+
+import os
+
+from sparc_cli.proc import jobs
+from sparc_cli.proc.jobs import JobManager, RingFile
+
+@pytest.fixture
+def manager():
+    manager = JobManager(output_bytes=1000, max_running=2)
+    yield manager
+    manager.shutdown()
+
+def test_ring_file_keeps_most_recent_bytes(tmp_path):
+    """Test the ring file wraps around and reads back the latest bytes in order."""
+    ring = RingFile(str(tmp_path / "out.log"), capacity=10)
+    ring.write(b"0123456")
+    assert ring.read_tail(100) == b"0123456"
+    ring.write(b"abcdef")
+    assert ring.read_tail(100) == b"3456abcdef"
+    assert ring.read_tail(4) == b"cdef"
+    ring.write(b"ABCDEFGHIJKLMNO")
+    assert ring.read_tail(10) == b"FGHIJKLMNO"
+    assert ring.written == 28
+    assert (tmp_path / "out.log").stat().st_size == 10
+    ring.close()
+    # Closed for writing, still readable
+    assert ring.read_tail(4) == b"LMNO"
+    ring.remove()
+    assert not (tmp_path / "out.log").exists()
+
+def test_job_runs_in_background(manager):
+    """Test a job returns at once, then reports its output and exit code."""
+    job = manager.start("echo started; sleep 0.3; printf '\\033[32mdone\\033[0m\\n'; exit 3")
+    assert job.status()["status"] == "running"
+    assert job.wait(10)
+
+    status = job.status()
+    assert status["status"] == "exited"
+    assert status["return_code"] == 3
+    assert status["output_lines"] == 2
+    assert job.tail() == "started\ndone"
+    assert job.tail(1) == "done"
+    # The output file is no longer held open
+    assert job.output._file is None
+
+def test_job_output_is_bounded(manager):
+    """Test only the most recent output of a chatty job is kept."""
+    job = manager.start("seq 1 100000")
+    assert job.wait(10)
+    assert job.status()["output_lines"] == 100000
+    assert job.tail(2) == "99999\n100000"
+    assert len(job.tail(1000)) < 1000
+
+def test_kill_job_and_running_limit(manager):
+    """Test jobs can be killed, and no more than max_running run at once."""
+    first = manager.start("sleep 30")
+    manager.start("sleep 30 & sleep 30")
+    with pytest.raises(RuntimeError):
+        manager.start("true")
+
+    first.kill()
+    assert first.status()["status"] == "killed"
+    assert first.status()["return_code"] == 137
+    assert manager.get(first.job_id) is first
+    manager.start("true")
+
+    with pytest.raises(ValueError):
+        manager.get("job-99")
+
+def test_kill_after_exit_is_not_reported_as_killed(manager, monkeypatch):
+    """Test a job that exited before the signal keeps its own status."""
+    job = manager.start("sleep 0.2; exit 5")
+    # The signal arrives only after the job exited on its own
+    monkeypatch.setattr(jobs, '_kill', lambda process: process.wait())
+    job.kill()
+    assert job.status()["status"] == "exited"
+    assert job.status()["return_code"] == 5
+
+def test_old_finished_jobs_are_pruned(manager, monkeypatch):
+    """Test only the most recent finished jobs and their output files are kept."""
+    monkeypatch.setattr(jobs, 'MAX_FINISHED_JOBS', 2)
+    started = []
+    for _ in range(4):
+        job = manager.start("echo hi")
+        assert job.wait(10)
+        started.append(job)
+
+    # Pruning happens when a job starts, so the newest three are left
+    assert manager.jobs() == started[1:]
+    assert not os.path.exists(started[0].output.path)
+    assert os.path.exists(started[1].output.path)
+    with pytest.raises(ValueError):
+        manager.get(started[0].job_id)
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from sparc_cli.proc.interactive import interrupt_commands
+from sparc_cli.proc import shell_session
+from sparc_cli.proc.shell_session import (
+    ShellSession,
+    close_shell_session,
+    close_shell_sessions,
+    get_shell_session
+)
+
+@pytest.fixture
+def session():
+    session = ShellSession()
+    yield session
+    session.close()
+
+def test_state_carries_over_between_commands(session, tmp_path):
+    """Test the working directory and variables persist in a session."""
+    assert session.run(f"cd {tmp_path} && export GREETING=hello") == (b"", 0)
+    output, return_code = session.run("pwd; echo $GREETING; [ -t 1 ] && echo tty")
+    assert output == f"{tmp_path}\nhello\ntty\n".encode()
+    assert return_code == 0
+
+def test_exit_codes_and_output_without_newline(session):
+    """Test each command's exit code and exact output come back."""
+    assert session.run('printf "no newline"; exit_code=3; (exit $exit_code)') == (b"no newline", 3)
+    output, return_code = session.run("echo 'unbalanced")
+    assert return_code != 0
+    assert b"unexpected EOF" in output
+    assert session.run("cat") == (b"", 0)
+
+def test_timeout_restarts_session(session, tmp_path):
+    """Test a command past its timeout kills the session, and the next one gets a fresh shell."""
+    session.run(f"cd {tmp_path}")
+    output, return_code = session.run("sleep 30", timeout=0.5)
+    assert return_code == 137
+    assert b"timed out after 0.5 seconds" in output
+    assert b"session was restarted" in output
+    assert session.run("pwd")[0] != f"{tmp_path}\n".encode()
+
+def test_exit_ends_session(session):
+    """Test exiting the shell reports its status and the next command starts a new shell."""
+    output, return_code = session.run("exit 4")
+    assert return_code == 4
+    assert b"shell session exited" in output
+    assert session.run("echo again") == (b"again\n", 0)
+
+def test_interrupt_stops_command(session, tmp_path):
+    """Test an interrupt stops the running command and the session lives on."""
+    session.run(f"cd {tmp_path}")
+    threading.Timer(0.5, interrupt_commands).start()
+    start = time.monotonic()
+    output, retcode = session.run("sleep 30")
+    assert time.monotonic() - start < 10
+    assert (output, retcode) == (b"[Command interrupted by the user]\n", 130)
+    assert session.run("pwd") == (f"{tmp_path}\n".encode(), 0)
+
+def test_sessions_per_key():
+    """Test each key gets its own session."""
+    try:
+        first = get_shell_session("agent-1")
+        assert get_shell_session("agent-1") is first
+        assert get_shell_session("agent-2") is not first
+        first.run("export NAME=first")
+        assert get_shell_session("agent-2").run("echo ${NAME:-unset}")[0] == b"unset\n"
+    finally:
+        close_shell_sessions()
+
+def test_eviction_skips_busy_sessions(monkeypatch):
+    """Test evicting sessions neither waits for nor kills a running command."""
+    monkeypatch.setattr(shell_session, 'MAX_SHELL_SESSIONS', 1)
+    try:
+        busy = get_shell_session("busy")
+        runner = threading.Thread(target=busy.run, args=("sleep 1; echo done",))
+        runner.start()
+        time.sleep(0.2)
+
+        start = time.monotonic()
+        get_shell_session("idle")
+        assert time.monotonic() - start < 0.5
+        assert get_shell_session("busy") is busy
+        runner.join()
+
+        # Now idle, the least recently used session is evicted
+        get_shell_session("new")
+        assert list(shell_session._sessions) == ["new"]
+        assert not busy.alive
+    finally:
+        close_shell_sessions()
+
+def test_close_shell_session():
+    """Test a finished agent's session is closed and forgotten."""
+    session = get_shell_session("finished")
+    session.run("true")
+    assert session.alive
+    close_shell_session("finished")
+    assert not session.alive
+    assert get_shell_session("finished") is not session
+    close_shell_sessions()
+    close_shell_session("unknown")
@@ -0,0 +1,214 @@
+import pytest
+from unittest.mock import Mock, patch
+from langgraph.checkpoint.memory import MemorySaver
+
+from sparc_cli import agent_utils
+from sparc_cli.agent_utils import (
+    get_agent,
+    clear_agent_cache,
+    run_research_agent,
+    run_task_implementation_agent,
+    format_prompt_within_budget,
+    run_agent_with_retry_async,
+    run_agent_with_retry
+)
+from sparc_cli.retry import RetryPolicy
+import asyncio
+import httpx
+import anthropic
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.prebuilt import create_react_agent
+from sparc_cli.text.tokens import estimate_tokens
+from sparc_cli.tools.memory import _global_memory, memory_session, emit_key_facts, MemoryPriority
+
+@pytest.fixture(autouse=True)
+def fresh_agent_cache():
+    """Start every test with an empty compiled agent cache."""
+    clear_agent_cache()
+    yield
+    clear_agent_cache()
+
+@pytest.fixture
+def mock_create_agent():
+    with patch('sparc_cli.agent_utils.create_react_agent') as mock:
+        mock.side_effect = lambda *args, **kwargs: Mock()
+        yield mock
+
+def test_get_agent_reuses_compiled_agent(mock_create_agent):
+    """Test the same model, tools and checkpointer compile only once."""
+    model = Mock()
+    tools = [Mock(), Mock()]
+    checkpointer = MemorySaver()
+
+    first = get_agent(model, tools, checkpointer)
+    second = get_agent(model, list(tools), checkpointer)
+
+    assert first is second
+    mock_create_agent.assert_called_once_with(model, tools, checkpointer=checkpointer)
+
+def test_get_agent_keys_on_tools_and_checkpointer(mock_create_agent):
+    """Test a different tool set or checkpointer compiles a new agent."""
+    model = Mock()
+    tools = [Mock()]
+    checkpointer = MemorySaver()
+
+    base = get_agent(model, tools, checkpointer)
+    assert get_agent(model, tools + [Mock()], checkpointer) is not base
+    assert get_agent(model, tools, MemorySaver()) is not base
+    assert mock_create_agent.call_count == 3
+
+def test_get_agent_evicts_least_recently_used(mock_create_agent, monkeypatch):
+    """Test the cache drops the least recently used agent when full."""
+    monkeypatch.setattr(agent_utils, 'AGENT_CACHE_SIZE', 2)
+    model = Mock()
+    checkpointer = MemorySaver()
+    tools_a, tools_b, tools_c = [Mock()], [Mock()], [Mock()]
+
+    agent_a = get_agent(model, tools_a, checkpointer)
+    get_agent(model, tools_b, checkpointer)
+    get_agent(model, tools_a, checkpointer)  # a is now most recently used
+    get_agent(model, tools_c, checkpointer)  # evicts b
+
+    assert get_agent(model, tools_a, checkpointer) is agent_a
+    get_agent(model, tools_b, checkpointer)
+    assert mock_create_agent.call_count == 4
+
+def test_sub_agents_share_compiled_agent(mock_create_agent):
+    """Test repeated sub-agent spawns without memory reuse one compiled agent."""
+    model = Mock()
+    with patch('sparc_cli.agent_utils.run_agent_with_retry') as mock_run:
+        for _ in range(3):
+            run_research_agent("question", model, research_only=True)
+
+    assert mock_create_agent.call_count == 1
+    assert mock_run.call_count == 3
+
+def test_sub_agent_runs_on_private_thread(mock_create_agent):
+    """Test sub-agents without memory get their own thread, released after the run."""
+    model = Mock()
+    parent_config = {"configurable": {"thread_id": "parent"}, "research_only": False}
+    checkpointer = agent_utils._default_checkpointer('implementation')
+
+    with patch('sparc_cli.agent_utils.run_agent_with_retry') as mock_run, \
+            patch.object(checkpointer, 'delete_thread') as mock_delete:
+        run_task_implementation_agent(
+            "base task", [], "task", "plan", [], model,
+            config=parent_config,
+            thread_id="child"
+        )
+
+    run_config = mock_run.call_args[0][2]
+    assert run_config["configurable"]["thread_id"] == "child"
+    assert parent_config["configurable"]["thread_id"] == "parent"
+    mock_delete.assert_called_once_with("child")
+
+def test_format_prompt_within_budget():
+    """Test memory sections are trimmed so the prompt fits the budget."""
+    with memory_session():
+        _global_memory['config'] = {'prompt_token_budget': 300}
+        for i in range(20):
+            emit_key_facts.invoke({"facts": [f"fact {i} " + "x" * 100], "priority": MemoryPriority.LOW})
+        emit_key_facts.invoke({"facts": ["the critical fact"], "priority": MemoryPriority.CRITICAL})
+
+        prompt = format_prompt_within_budget(
+            "Task: {base_task}\n\nFacts:\n{key_facts}\n\nDo it.",
+            {'key_facts': 'key_facts'},
+            base_task="fix the bug"
+        )
+
+    assert estimate_tokens(prompt) <= 300
+    assert prompt.startswith("Task: fix the bug")
+    assert prompt.endswith("Do it.")
+    assert "the critical fact" in prompt
+    assert "omitted to fit the prompt" in prompt
+
+def test_run_agent_with_retry_async_streams_chunks():
+    """Test the async runner drives agent.astream and restores the agent depth."""
+    chunks = [{"agent": {"messages": []}}, {"tools": {"messages": []}}]
+    seen = []
+
+    class FakeAgent:
+        async def astream(self, inputs, config):
+            assert inputs["messages"][0].content == "do the task"
+            for chunk in chunks:
+                yield chunk
+
+    with memory_session():
+        with patch('sparc_cli.agent_utils.print_agent_output', side_effect=seen.append):
+            result = asyncio.run(run_agent_with_retry_async(FakeAgent(), "do the task", {}))
+        assert _global_memory['agent_depth'] == 0
+
+    assert result == "Agent run completed successfully"
+    assert seen == chunks
+
+class FlakyChatModel(BaseChatModel):
+    """Chat model that is rate limited a number of times before answering."""
+    failures: int = 1
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "flaky"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+            response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+            raise anthropic.RateLimitError("rate limited", response=response, body=None)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="done"))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def test_run_agent_with_retry_resumes_from_checkpoint():
+    """Test a retry continues the checkpointed run instead of replaying the prompt."""
+    model = FlakyChatModel(failures=2)
+    agent = create_react_agent(model, [], checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "resume-test"}, "provider": "resume-test"}
+
+    with memory_session(), patch('sparc_cli.agent_utils.print_agent_output'):
+        result = run_agent_with_retry(agent, "do the task", config, RetryPolicy(base_delay=0, max_delay=0))
+
+    assert result == "Agent run completed successfully"
+    assert model.calls == 3
+    messages = agent.get_state(config).values["messages"]
+    assert [type(m) for m in messages] == [HumanMessage, AIMessage]
+
+def test_run_agent_with_retry_gives_up():
+    """Test the retry limit of the policy is respected."""
+    model = FlakyChatModel(failures=10)
+    agent = create_react_agent(model, [], checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "give-up-test"}, "provider": "give-up-test"}
+
+    with memory_session(), patch('sparc_cli.agent_utils.print_agent_output'):
+        with pytest.raises(RuntimeError, match="Max retries"):
+            run_agent_with_retry(agent, "do the task", config, RetryPolicy(max_attempts=3, base_delay=0, max_delay=0))
+    assert model.calls == 3
+
+def test_run_agent_with_retry_compacts_checkpoints():
+    """Test only the newest checkpoints of a finished run are kept."""
+    checkpointer = MemorySaver()
+    agent = create_react_agent(FlakyChatModel(failures=0), [], checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": "compact-test"}, "provider": "compact-test"}
+
+    with memory_session(), patch('sparc_cli.agent_utils.print_agent_output'):
+        run_agent_with_retry(agent, "first task", config)
+        run_agent_with_retry(agent, "second task", config)
+
+    assert len(list(checkpointer.list(config))) <= 2
+    assert len(agent.get_state(config).values["messages"]) == 4
+
+def test_run_agent_with_retry_compacts_history():
+    """Test earlier turns beyond the history token limit are dropped before a run."""
+    agent = create_react_agent(FlakyChatModel(failures=0), [], checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "history-test"}, "provider": "history-test", "history_token_limit": 5}
+
+    with memory_session(), patch('sparc_cli.agent_utils.print_agent_output'):
+        for task in ("first task", "second task", "third task"):
+            run_agent_with_retry(agent, task, config)
+
+    messages = agent.get_state(config).values["messages"]
+    assert [m.content for m in messages if isinstance(m, HumanMessage)] == ["second task", "third task"]
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+
+from sparc_cli.checkpoint import (
+    compact_checkpoints,
+    configure_checkpointer,
+    create_checkpointer,
+    get_checkpointer
+)
+
+@pytest.fixture(autouse=True)
+def in_memory_checkpointers():
+    """Leave the shared checkpointers in memory after each test."""
+    yield
+    configure_checkpointer(None)
+
+def chat(checkpointer, thread_id, turns):
+    """Run a few turns of a tool-less agent on a thread and return the agent."""
+    model = FakeListChatModel(responses=[f"answer {i}" for i in range(turns)])
+    agent = create_react_agent(model, [], checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": thread_id}}
+    for i in range(turns):
+        agent.invoke({"messages": [HumanMessage(content=f"question {i}")]}, config)
+    return agent
+
+def test_compact_memory_saver_keeps_latest_state():
+    """Test compaction drops old checkpoints but keeps the conversation."""
+    saver = MemorySaver()
+    agent = chat(saver, "t1", 3)
+    config = {"configurable": {"thread_id": "t1"}}
+    before = agent.get_state(config).values["messages"]
+    assert len(list(saver.list(config))) > 2
+
+    removed = compact_checkpoints(saver, "t1", keep_last=1)
+
+    assert removed > 0
+    assert len(list(saver.list(config))) == 1
+    assert agent.get_state(config).values["messages"] == before
+
+    # The thread can still be continued
+    agent.invoke({"messages": [HumanMessage(content="again")]}, config)
+    assert len(agent.get_state(config).values["messages"]) == len(before) + 2
+
+def test_compact_only_touches_given_thread():
+    """Test other threads keep their checkpoints."""
+    saver = MemorySaver()
+    chat(saver, "t1", 2)
+    chat(saver, "t2", 2)
+    other = len(list(saver.list({"configurable": {"thread_id": "t2"}})))
+
+    compact_checkpoints(saver, "t1", keep_last=1)
+
+    assert len(list(saver.list({"configurable": {"thread_id": "t2"}}))) == other
+
+def test_compact_ignores_unknown_checkpointers():
+    """Test unsupported checkpointers are left alone."""
+    assert compact_checkpoints(object(), "t1") == 0
+    assert compact_checkpoints(None, "t1") == 0
+
+def test_in_memory_checkpointers_per_agent_type():
+    """Test each agent type gets its own shared in-memory checkpointer."""
+    configure_checkpointer(None)
+    assert isinstance(get_checkpointer('research'), MemorySaver)
+    assert get_checkpointer('research') is get_checkpointer('research')
+    assert get_checkpointer('research') is not get_checkpointer('planning')
+
+def test_sqlite_checkpointer_survives_restart(tmp_path):
+    """Test history saved to the database is available to a new checkpointer."""
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    path = str(tmp_path / "checkpoints.db")
+    chat(create_checkpointer(path), "t1", 2)
+
+    agent = create_react_agent(FakeListChatModel(responses=["x"]), [], checkpointer=create_checkpointer(path))
+    messages = agent.get_state({"configurable": {"thread_id": "t1"}}).values["messages"]
+
+    assert [m.content for m in messages] == ["question 0", "answer 0", "question 1", "answer 1"]
+    assert [type(m) for m in messages] == [HumanMessage, AIMessage] * 2
+
+def test_sqlite_compaction_and_delete(tmp_path):
+    """Test compaction and thread deletion on the SQLite checkpointer."""
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    saver = create_checkpointer(str(tmp_path / "checkpoints.db"))
+    agent = chat(saver, "t1", 3)
+    config = {"configurable": {"thread_id": "t1"}}
+    before = agent.get_state(config).values["messages"]
+
+    compact_checkpoints(saver, "t1", keep_last=2)
+
+    assert len(list(saver.list(config))) == 2
+    assert agent.get_state(config).values["messages"] == before
+    orphaned = saver.conn.execute(
+        "SELECT COUNT(*) FROM writes WHERE checkpoint_id NOT IN (SELECT checkpoint_id FROM checkpoints)"
+    ).fetchone()[0]
+    assert orphaned == 0
+
+    saver.delete_thread("t1")
+    assert list(saver.list(config)) == []
+
+def test_sqlite_checkpointer_supports_async_agents(tmp_path):
+    """Test agents run with astream can save to the SQLite checkpointer."""
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    saver = create_checkpointer(str(tmp_path / "checkpoints.db"))
+    agent = create_react_agent(FakeListChatModel(responses=["done"]), [], checkpointer=saver)
+    config = {"configurable": {"thread_id": "t1"}}
+
+    async def run():
+        async for _ in agent.astream({"messages": [HumanMessage(content="go")]}, config):
+            pass
+        return await agent.aget_state(config)
+
+    state = asyncio.run(run())
+    assert state.values["messages"][-1].content == "done"
+
+def test_configured_database_shared_by_all_agents(tmp_path):
+    """Test all agent types share one saver when a database is configured."""
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    configure_checkpointer(str(tmp_path / "checkpoints.db"))
+    assert get_checkpointer('research') is get_checkpointer('planning')
+    assert not isinstance(get_checkpointer('chat'), MemorySaver)
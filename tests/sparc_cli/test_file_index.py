@@ -0,0 +1,136 @@
+import os
+import subprocess
+import pytest
+from unittest.mock import patch
+
+from sparc_cli import file_index
+from sparc_cli.file_index import ProjectFileIndex, get_file_index, compile_file_filter
+from sparc_cli.tools.fuzzy_find import fuzzy_find_project_files
+
+def git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+def bump_mtime(path):
+    """Move a directory's mtime forward, so changes are visible on coarse clocks."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+@pytest.fixture
+def repo(tmp_path):
+    """A git repository with tracked, untracked and ignored files."""
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'user.email', 'test@example.com')
+    git(tmp_path, 'config', 'user.name', 'Test')
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'app.py').write_text('app = 1\n')
+    (tmp_path / '.gitignore').write_text('*.log\n')
+    git(tmp_path, 'add', '-A')
+    git(tmp_path, 'commit', '-q', '-m', 'initial')
+    (tmp_path / 'notes.txt').write_text('notes\n')
+    (tmp_path / 'debug.log').write_text('ignored\n')
+    return tmp_path
+
+def test_lists_tracked_and_untracked_files(repo):
+    """Test the index holds tracked and untracked files but not ignored ones."""
+    assert ProjectFileIndex(str(repo)).files() == ['.gitignore', 'src/app.py', 'notes.txt']
+
+def test_new_file_found_by_listing_only_its_directory(repo):
+    """Test a file created in a known directory is picked up incrementally."""
+    index = ProjectFileIndex(str(repo))
+    index.files()
+
+    (repo / 'src' / 'new.py').write_text('new = 1\n')
+    bump_mtime(repo / 'src')
+    with patch.object(file_index, '_git_files', wraps=file_index._git_files) as mock_list:
+        files = index.files()
+
+    assert 'src/new.py' in files
+    mock_list.assert_called_once_with(str(repo), '--others', '--exclude-standard', '--', 'src')
+
+def test_unchanged_tree_is_not_listed_again(repo):
+    """Test git is not run again while nothing changed."""
+    index = ProjectFileIndex(str(repo))
+    first = index.files()
+    with patch.object(file_index, '_git_files') as mock_list:
+        assert index.files() is first
+    mock_list.assert_not_called()
+
+def test_new_directories_and_deletions(repo):
+    """Test files in new directories, including ones created empty first, and deletions are seen."""
+    index = ProjectFileIndex(str(repo))
+    index.files()
+
+    (repo / 'pkg').mkdir()
+    bump_mtime(repo)
+    assert 'pkg' not in index.files()
+
+    (repo / 'pkg' / 'mod.py').write_text('mod = 1\n')
+    bump_mtime(repo / 'pkg')
+    assert 'pkg/mod.py' in index.files()
+
+    os.remove(repo / 'notes.txt')
+    bump_mtime(repo)
+    assert 'notes.txt' not in index.files()
+
+def test_new_file_in_directory_without_files(repo):
+    """Test files created in directories that held no listed files are seen."""
+    (repo / 'data').mkdir()
+    (repo / 'data' / 'run.log').write_text('ignored\n')
+    (repo / 'empty').mkdir()
+    index = ProjectFileIndex(str(repo))
+    index.files()
+
+    (repo / 'data' / 'readme.md').write_text('data\n')
+    bump_mtime(repo / 'data')
+    (repo / 'empty' / 'new.py').write_text('new = 1\n')
+    bump_mtime(repo / 'empty')
+    files = index.files()
+    assert 'data/readme.md' in files
+    assert 'empty/new.py' in files
+
+def test_index_change_relists_tracked_files(repo):
+    """Test staging and committing refresh the tracked files."""
+    index = ProjectFileIndex(str(repo))
+    index.files()
+
+    git(repo, 'rm', '-q', 'src/app.py')
+    assert 'src/app.py' not in index.files()
+
+def test_get_file_index_shared_per_repository(repo):
+    """Test one index is shared by the repository and its subdirectories."""
+    assert get_file_index(str(repo)) is get_file_index(str(repo / 'src'))
+
+def test_get_file_index_outside_git(tmp_path):
+    """Test directories outside git are rejected."""
+    with pytest.raises(ValueError):
+        get_file_index(str(tmp_path))
+
+def test_compile_file_filter():
+    """Test includes and excludes combine into one matcher, excludes winning."""
+    file_filter = compile_file_filter(('src/*', '*.md'), ('*.pyc', '__pycache__/*'))
+    assert file_filter.match_file('src/app.py')
+    assert file_filter.match_file('docs/readme.md')
+    assert not file_filter.match_file('lib/util.py')
+    assert not file_filter.match_file('src/app.pyc')
+    # fnmatch patterns: "*" matches across directories
+    assert compile_file_filter(('src/*.py',), ()).match_file('src/pkg/mod.py')
+
+    everything = compile_file_filter((), ('*.pyc',))
+    assert everything.match_file('lib/util.py')
+    assert not everything.match_file('lib/util.pyc')
+    assert compile_file_filter((), ('*.pyc',)) is everything
+
+def test_filtered_lists_reused(repo):
+    """Test filtering with the same matcher reuses the filtered list."""
+    index = ProjectFileIndex(str(repo))
+    file_filter = compile_file_filter(('src/*',), ())
+    assert index.files(file_filter) == ['src/app.py']
+    assert index.files(file_filter) is index.files(file_filter)
+
+def test_fuzzy_find_uses_index(repo):
+    """Test the fuzzy find tool searches the indexed files with its patterns applied."""
+    (repo / 'src' / 'app.pyc').write_bytes(b'')
+    with patch('sparc_cli.tools.fuzzy_find.console'):
+        results = fuzzy_find_project_files.invoke({"search_term": "app", "repo_path": str(repo)})
+
+    assert [path for path, score in results] == ['src/app.py']
@@ -0,0 +1,101 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+
+from sparc_cli.history import (
+    acompact_history,
+    compact_history,
+    message_tokens,
+    plan_history_compaction
+)
+
+def turn(i, output_size=4000):
+    """Messages of one turn in which the agent reads a file."""
+    call_id = f"call-{i}"
+    return [
+        HumanMessage(content=f"question {i}", id=f"h{i}"),
+        AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"path": "a.py"}, "id": call_id}], id=f"a{i}"),
+        ToolMessage(content="x" * output_size, tool_call_id=call_id, name="read_file", id=f"t{i}"),
+        AIMessage(content=f"answer {i}", id=f"r{i}"),
+    ]
+
+def test_message_tokens_counts_blocks_and_tool_calls():
+    """Test content blocks and tool call arguments are counted."""
+    blocks = AIMessage(content=[{"type": "text", "text": "x" * 35}])
+    call = AIMessage(content="", tool_calls=[{"name": "f", "args": {"text": "y" * 70}, "id": "1"}])
+    assert message_tokens(blocks) == 10
+    assert message_tokens(call) > 20
+
+def test_history_within_limit_is_untouched():
+    """Test nothing changes while the history fits."""
+    assert plan_history_compaction(turn(0) + turn(1), max_tokens=10000) == []
+
+def test_old_tool_outputs_elided_first():
+    """Test old tool outputs are replaced before any turn is dropped."""
+    messages = turn(0) + turn(1) + turn(2)
+    updates = plan_history_compaction(messages, max_tokens=2000, keep_recent_tokens=1200)
+
+    assert [m.id for m in updates] == ["t0", "t1"]
+    assert all(isinstance(m, ToolMessage) and "removed from the history" in m.content for m in updates)
+    assert updates[0].tool_call_id == "call-0"
+
+def test_oldest_turns_dropped_when_eliding_is_not_enough():
+    """Test whole turns are removed, keeping the recent ones and system messages."""
+    messages = [SystemMessage(content="system", id="s")] + turn(0) + turn(1) + turn(2, output_size=100)
+    updates = plan_history_compaction(messages, max_tokens=60, keep_recent_tokens=50)
+
+    removed = {m.id for m in updates if isinstance(m, RemoveMessage)}
+    assert removed == {"h0", "a0", "t0", "r0", "h1", "a1", "t1", "r1"}
+    assert not [m for m in updates if not isinstance(m, RemoveMessage)]
+
+def test_last_turn_always_kept():
+    """Test the latest turn is kept verbatim even if it alone exceeds the limit."""
+    assert plan_history_compaction(turn(0), max_tokens=10) == []
+
+@tool
+def read_file(path: str) -> str:
+    """Read a file."""
+    return "x" * 4000
+
+class ScriptedModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def chat_agent(turns):
+    responses = []
+    for i in range(turns):
+        responses += [
+            AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"path": "a"}, "id": f"c{i}"}]),
+            AIMessage(content=f"answer {i}")
+        ]
+    agent = create_react_agent(ScriptedModel(responses=responses), [read_file], checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "chat"}}
+    for i in range(turns):
+        agent.invoke({"messages": [HumanMessage(content=f"question {i}")]}, config)
+    return agent, config
+
+def test_compact_history_updates_checkpoint():
+    """Test compaction is saved to the thread and leaves it ready for the next turn."""
+    agent, config = chat_agent(3)
+
+    assert compact_history(agent, config, max_tokens=2000, keep_recent_tokens=1300) == 2
+
+    state = agent.get_state(config)
+    assert state.next == ()
+    contents = [m.content for m in state.values["messages"] if isinstance(m, ToolMessage)]
+    assert "removed from the history" in contents[0]
+    assert "removed from the history" in contents[1]
+    assert contents[2] == "x" * 4000
+
+def test_acompact_history_drops_turns():
+    """Test the async version removes old turns from the checkpoint."""
+    agent, config = chat_agent(3)
+
+    asyncio.run(acompact_history(agent, config, max_tokens=500, keep_recent_tokens=300))
+
+    messages = agent.get_state(config).values["messages"]
+    assert [m.content for m in messages if isinstance(m, HumanMessage)] == ["question 2"]
@@ -3,7 +3,14 @@ from unittest.mock import Mock, patch
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from sparc_cli.env import validate_environment
-from sparc_cli.llm import initialize_llm, initialize_expert_llm
+from sparc_cli.llm import initialize_llm, initialize_expert_llm, clear_llm_pool
+
+@pytest.fixture(autouse=True)
+def empty_llm_pool():
+    """Give every test an empty client pool."""
+    clear_llm_pool()
+    yield
+    clear_llm_pool()
 
 def test_initialize_llm_openai():
     """Test OpenAI LLM initialization."""
@@ -49,6 +56,38 @@ def test_initialize_expert_llm():
         except Exception as e:
             pytest.fail(f"Failed to initialize expert LLM: {e}")
 
+def test_initialize_llm_reuses_pooled_client():
+    """Test repeated initialization returns the same shared client."""
+    with patch('sparc_cli.llm.ChatAnthropic') as mock:
+        mock.side_effect = lambda **kwargs: Mock(spec=ChatAnthropic)
+        first = initialize_llm('anthropic', 'claude-2')
+        second = initialize_llm('anthropic', 'claude-2')
+        other = initialize_llm('anthropic', 'claude-3')
+        assert first is second
+        assert other is not first
+        assert mock.call_count == 2
+
+def test_initialize_llm_pool_keyed_by_credentials(monkeypatch):
+    """Test changing the API key or base URL creates a new client."""
+    with patch('sparc_cli.llm.ChatOpenAI') as mock:
+        mock.side_effect = lambda **kwargs: Mock(spec=ChatOpenAI)
+        monkeypatch.setenv('OPENAI_API_KEY', 'key-1')
+        monkeypatch.setenv('OPENAI_API_BASE', 'http://localhost:8000/v1')
+        first = initialize_llm('openai-compatible', 'local-model')
+        monkeypatch.setenv('OPENAI_API_BASE', 'http://localhost:9000/v1')
+        other_base = initialize_llm('openai-compatible', 'local-model')
+        monkeypatch.setenv('OPENAI_API_KEY', 'key-2')
+        other_key = initialize_llm('openai-compatible', 'local-model')
+        assert len({id(first), id(other_base), id(other_key)}) == 3
+
+def test_clear_llm_pool():
+    """Test clearing the pool creates fresh clients."""
+    with patch('sparc_cli.llm.ChatOpenAI') as mock:
+        mock.side_effect = lambda **kwargs: Mock(spec=ChatOpenAI)
+        first = initialize_expert_llm('openai', 'gpt-4')
+        clear_llm_pool()
+        assert initialize_expert_llm('openai', 'gpt-4') is not first
+
 def test_environment_variables():
     """Test environment variable precedence and fallback."""
     from sparc_cli.env import validate_environment
@@ -0,0 +1,98 @@
+import pytest
+from unittest.mock import patch
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from sparc_cli.rate_limit import (
+    TokenBucketRateLimiter,
+    MemoryBucketStore,
+    SQLiteBucketStore,
+    RateLimitUsageCallback,
+    configure_rate_limits,
+    get_rate_limiter
+)
+from sparc_cli.llm import initialize_llm, clear_llm_pool
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    configure_rate_limits()
+    clear_llm_pool()
+    yield
+    configure_rate_limits()
+    clear_llm_pool()
+
+def test_requests_per_minute():
+    """Test requests are allowed up to the burst and then refill over time."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter("test", requests_per_minute=2, clock=clock)
+
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() == pytest.approx(30.0)
+    assert limiter.acquire(blocking=False) is False
+
+    clock.now += 30
+    assert limiter.acquire(blocking=False) is True
+
+def test_tokens_per_minute():
+    """Test token usage debited after a response delays the next request."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter("test", tokens_per_minute=600, clock=clock)
+
+    assert limiter.try_acquire() == 0
+    limiter.consume_tokens(900)
+    # 300 tokens in debt at 10 tokens per second
+    assert limiter.try_acquire() == pytest.approx(30.0)
+
+    clock.now += 30
+    assert limiter.try_acquire() == 0
+
+def test_usage_callback_debits_tokens():
+    """Test the callback reads token usage from model responses."""
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter("test", tokens_per_minute=60, clock=clock)
+    message = AIMessage(content="hi", usage_metadata={"input_tokens": 50, "output_tokens": 20, "total_tokens": 70})
+    RateLimitUsageCallback(limiter).on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+    assert limiter.try_acquire() == pytest.approx(10.0)
+
+def test_sqlite_store_is_shared(tmp_path):
+    """Test limiters in different processes share buckets through SQLite."""
+    path = str(tmp_path / "limits.db")
+    clock = FakeClock()
+    first = TokenBucketRateLimiter("anthropic:key", requests_per_minute=1, store=SQLiteBucketStore(path), clock=clock)
+    second = TokenBucketRateLimiter("anthropic:key", requests_per_minute=1, store=SQLiteBucketStore(path), clock=clock)
+    other_key = TokenBucketRateLimiter("anthropic:other", requests_per_minute=1, store=SQLiteBucketStore(path), clock=clock)
+
+    assert first.try_acquire() == 0
+    assert second.try_acquire() > 0
+    assert other_key.try_acquire() == 0
+
+def test_get_rate_limiter_per_provider_key():
+    """Test limiters are shared per provider API key and off by default."""
+    assert get_rate_limiter("anthropic", "key-1") is None
+
+    configure_rate_limits(requests_per_minute=10)
+    limiter = get_rate_limiter("anthropic", "key-1")
+    assert limiter is get_rate_limiter("anthropic", "key-1")
+    assert limiter is not get_rate_limiter("anthropic", "key-2")
+    assert limiter is not get_rate_limiter("openai", "key-1")
+    assert "key-1" not in limiter.key
+
+def test_initialize_llm_uses_rate_limiter(monkeypatch):
+    """Test clients get the shared rate limiter once limits are configured."""
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+    configure_rate_limits(requests_per_minute=10, tokens_per_minute=1000)
+    with patch('sparc_cli.llm.ChatAnthropic') as mock:
+        initialize_llm('anthropic', 'claude-2')
+
+    kwargs = mock.call_args.kwargs
+    assert kwargs['rate_limiter'] is get_rate_limiter('anthropic', 'test-key')
+    assert isinstance(kwargs['callbacks'][0], RateLimitUsageCallback)
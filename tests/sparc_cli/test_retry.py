@@ -0,0 +1,104 @@
+import time
+import httpx
+import anthropic
+import pytest
+from email.utils import formatdate
+
+from sparc_cli.retry import (
+    RetryPolicy,
+    CircuitBreaker,
+    retry_after_seconds,
+    get_circuit_breaker
+)
+
+def make_rate_limit_error(headers=None):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    return anthropic.RateLimitError("rate limited", response=response, body=None)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_backoff_is_capped_and_jittered():
+    """Test backoff grows exponentially, stays within bounds and is capped."""
+    policy = RetryPolicy(base_delay=1.0, max_delay=30.0)
+    for attempt in range(25):
+        delay = policy.backoff(attempt)
+        assert 1.0 <= delay <= min(30.0, 2 ** attempt)
+    assert RetryPolicy(max_delay=30.0, jitter=False).backoff(19) == 30.0
+
+def test_backoff_without_jitter():
+    """Test backoff without jitter is the exponential ceiling."""
+    policy = RetryPolicy(base_delay=2.0, max_delay=100.0, jitter=False)
+    assert [policy.backoff(n) for n in range(4)] == [2.0, 4.0, 8.0, 16.0]
+
+def test_retry_after_header_seconds():
+    """Test retry-after in seconds and milliseconds is honored."""
+    assert retry_after_seconds(make_rate_limit_error({"retry-after": "7"})) == 7.0
+    assert retry_after_seconds(make_rate_limit_error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(make_rate_limit_error()) is None
+    assert retry_after_seconds(ValueError("no response")) is None
+
+def test_retry_after_header_http_date():
+    """Test retry-after given as an HTTP date."""
+    header = formatdate(time.time() + 30, usegmt=True)
+    delay = retry_after_seconds(make_rate_limit_error({"retry-after": header}))
+    assert 25 <= delay <= 31
+
+def test_delay_prefers_retry_after():
+    """Test the server's retry-after wins over backoff, up to a cap."""
+    policy = RetryPolicy(max_retry_after=60.0)
+    assert policy.delay_for(0, make_rate_limit_error({"retry-after": "12"})) == 12.0
+    assert policy.delay_for(0, make_rate_limit_error({"retry-after": "3600"})) == 60.0
+
+def test_circuit_breaker_opens_after_threshold():
+    """Test the circuit opens after consecutive failures and asks callers to wait."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=clock)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.acquire() == 0.0
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 4.0
+    assert breaker.acquire() == pytest.approx(6.0)
+
+def test_circuit_breaker_half_open_trial():
+    """Test one trial call is let through after the timeout."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 10.0
+    assert breaker.acquire() == 0.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Other callers wait while the trial is running
+    assert breaker.acquire() > 0
+
+    # A failed trial opens the circuit again
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 20.0
+    assert breaker.acquire() == 0.0
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.acquire() == 0.0
+
+def test_success_resets_failure_count():
+    """Test failures must be consecutive to open the circuit."""
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_get_circuit_breaker_is_shared():
+    """Test breakers are shared per name."""
+    assert get_circuit_breaker("anthropic") is get_circuit_breaker("anthropic")
+    assert get_circuit_breaker("anthropic") is not get_circuit_breaker("openai")
@@ -0,0 +1,119 @@
+import os
+import subprocess
+import pytest
+from unittest.mock import Mock, patch
+
+from sparc_cli.search_cache import SearchCache, repo_state, invalidate_search_cache, cached_search
+from sparc_cli.tools.write_file import write_file_tool
+
+def git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+@pytest.fixture
+def repo(tmp_path):
+    """A git repository with one committed file."""
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'user.email', 'test@example.com')
+    git(tmp_path, 'config', 'user.name', 'Test')
+    (tmp_path / 'a.py').write_text('a = 1\n')
+    git(tmp_path, 'add', 'a.py')
+    git(tmp_path, 'commit', '-q', '-m', 'initial')
+    return tmp_path
+
+def touch_later(path, content):
+    """Write a file and move its mtime forward, so the change is visible on coarse clocks."""
+    path.write_text(content)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_repo_state_tracks_changes(repo):
+    """Test edits, new files and commits all change the fingerprint."""
+    clean = repo_state(str(repo))
+    assert clean == repo_state(str(repo))
+
+    touch_later(repo / 'a.py', 'a = 2\n')
+    edited = repo_state(str(repo))
+    assert edited != clean
+
+    touch_later(repo / 'a.py', 'a = 3\n')
+    edited_again = repo_state(str(repo))
+    assert edited_again != edited
+
+    (repo / 'sub').mkdir()
+    (repo / 'sub' / 'new.py').write_text('b = 1\n')
+    assert repo_state(str(repo)) != edited_again
+
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'more')
+    assert repo_state(str(repo))[1] != clean[1]
+
+def test_repo_state_outside_git(tmp_path):
+    """Test non-repositories have no fingerprint."""
+    assert repo_state(str(tmp_path)) is None
+
+def test_cache_hits_until_tree_changes(repo):
+    """Test results are reused for the same arguments until a file changes."""
+    # Check the repository on every lookup
+    cache = SearchCache(state_ttl=0)
+    compute = Mock(side_effect=lambda: ['result'])
+
+    assert cache.get_or_compute('search', {'q': 'x'}, compute, str(repo)) == (['result'], False)
+    assert cache.get_or_compute('search', {'q': 'x'}, compute, str(repo)) == (['result'], True)
+    cache.get_or_compute('search', {'q': 'y'}, compute, str(repo))
+    assert compute.call_count == 2
+
+    touch_later(repo / 'a.py', 'a = 2\n')
+    assert cache.get_or_compute('search', {'q': 'x'}, compute, str(repo))[1] is False
+    assert compute.call_count == 3
+
+def test_repo_state_reused_until_ttl_or_invalidate(repo):
+    """Test lookups reuse a recent repository state instead of running git each time."""
+    cache = SearchCache(state_ttl=60)
+    compute = Mock(return_value='result')
+    with patch('sparc_cli.search_cache.repo_state', wraps=repo_state) as state:
+        cache.get_or_compute('search', {'q': 'x'}, compute, str(repo))
+        cache.get_or_compute('search', {'q': 'x'}, compute, str(repo))
+        cache.get_or_compute('search', {'q': 'y'}, compute, str(repo))
+        assert state.call_count == 1
+
+        cache.invalidate()
+        cache.get_or_compute('search', {'q': 'x'}, compute, str(repo))
+        assert state.call_count == 2
+    assert compute.call_count == 3
+
+def test_invalidate_and_should_cache(repo):
+    """Test invalidation and results rejected by should_cache are recomputed."""
+    cache = SearchCache()
+    compute = Mock(return_value='result')
+
+    cache.get_or_compute('search', {}, compute, str(repo))
+    cache.invalidate()
+    cache.get_or_compute('search', {}, compute, str(repo))
+    assert compute.call_count == 2
+
+    failing = Mock(return_value='error')
+    cache.get_or_compute('failing', {}, failing, str(repo), should_cache=lambda result: False)
+    cache.get_or_compute('failing', {}, failing, str(repo), should_cache=lambda result: False)
+    assert failing.call_count == 2
+
+def test_cache_evicts_least_recently_used(repo):
+    """Test the cache keeps at most max_entries results."""
+    cache = SearchCache(max_entries=2)
+    compute = Mock(return_value='result')
+    for query in ('a', 'b', 'a', 'c', 'a', 'b'):
+        cache.get_or_compute('search', {'q': query}, compute, str(repo))
+    # a, b, c computed; b was evicted by c and computed again
+    assert compute.call_count == 4
+
+def test_write_tool_invalidates_cache(repo, monkeypatch):
+    """Test writing a file through a tool makes cached searches stale."""
+    monkeypatch.chdir(repo)
+    invalidate_search_cache()
+    compute = Mock(return_value='result')
+    cached_search('search', {}, compute)
+    cached_search('search', {}, compute)
+    assert compute.call_count == 1
+
+    write_file_tool.invoke({'filepath': 'a.py', 'content': 'a = 1\n', 'verbose': False})
+    cached_search('search', {}, compute)
+    assert compute.call_count == 2
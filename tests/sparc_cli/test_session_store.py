@@ -0,0 +1,53 @@
+import pytest
+from sparc_cli.session_store import SessionStore
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a session store in a temporary directory."""
+    store = SessionStore(str(tmp_path / "sessions" / "test.db"))
+    yield store
+    store.close()
+
+def test_save_and_load(store):
+    """Test values round trip through the store."""
+    store.save_many({"key_facts": {"1": {"content": "fact"}}, "task_id_counter": 3})
+    store.save("plans", ["step"])
+
+    assert store.load() == {
+        "key_facts": {"1": {"content": "fact"}},
+        "task_id_counter": 3,
+        "plans": ["step"]
+    }
+
+def test_save_overwrites_existing_key(store):
+    """Test saving a key again replaces its value."""
+    store.save("work_log", [{"event": "one"}])
+    store.save("work_log", [{"event": "one"}, {"event": "two"}])
+
+    assert store.load()["work_log"] == [{"event": "one"}, {"event": "two"}]
+
+def test_exists_and_clear(store):
+    """Test clearing the store removes all saved memory."""
+    assert not store.exists()
+    store.save("plans", [])
+    assert store.exists()
+
+    store.clear()
+    assert not store.exists()
+    assert store.load() == {}
+
+def test_persists_across_connections(tmp_path):
+    """Test memory saved by one store is visible after reopening the database."""
+    path = str(tmp_path / "session.db")
+    first = SessionStore(path)
+    first.save("base_task", "Add logging")
+    first.close()
+
+    second = SessionStore(path)
+    assert second.load() == {"base_task": "Add logging"}
+    second.close()
+
+def test_uses_wal_journal(store):
+    """Test the database is opened in WAL mode."""
+    mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
@@ -32,6 +32,12 @@ def test_get_planning_tools():
     assert isinstance(tools, list)
     assert len(tools) > 0
 
+def test_get_planning_tools_parallel():
+    """Test that parallel planning adds the concurrent task tool."""
+    names = [tool.name for tool in get_planning_tools(parallel=True)]
+    assert "request_parallel_task_implementation" in names
+    assert "request_parallel_task_implementation" not in [tool.name for tool in get_planning_tools()]
+
 def test_get_implementation_tools():
     """Test that get_implementation_tools returns expected tools."""
     tools = get_implementation_tools()
@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import patch
+
+from sparc_cli.text import fuzzy
+from sparc_cli.text.fuzzy import extract_matches, has_fast_backend
+
+PATHS = [
+    'sparc_cli/tools/fuzzy_find.py',
+    'sparc_cli/tools/ripgrep.py',
+    'tests/sparc_cli/tools/test_fuzzy_find.py',
+    'docs/fuzzy_find/index.md',
+    'README.md',
+]
+
+@pytest.fixture(params=['fast', 'fallback'])
+def backend(request):
+    """Run a test with rapidfuzz and with the fuzzywuzzy fallback."""
+    if request.param == 'fast':
+        if not has_fast_backend():
+            pytest.skip("rapidfuzz not installed")
+        yield
+    else:
+        with patch.object(fuzzy, 'process', None):
+            yield
+
+def test_path_scoring_finds_best_matches(backend):
+    """Test the best matching paths come first, limited and cut off."""
+    matches = extract_matches('fuzzy_find.py', PATHS, limit=2, score_cutoff=60)
+
+    assert len(matches) == 2
+    assert matches[0][0] == 'sparc_cli/tools/fuzzy_find.py'
+    assert all(isinstance(score, int) and score >= 60 for _, score in matches)
+    assert [score for _, score in matches] == sorted((score for _, score in matches), reverse=True)
+
+def test_score_cutoff_excludes_poor_matches(backend):
+    """Test nothing below the cutoff is returned."""
+    assert extract_matches('zzzzqqq', PATHS, score_cutoff=60) == []
+
+def test_basename_scoring_prefers_file_names(backend):
+    """Test basename scoring ranks a matching file name above a matching directory."""
+    matches = extract_matches('index.md', PATHS, limit=3, scoring='basename')
+    assert matches[0][0] == 'docs/fuzzy_find/index.md'
+
+    matches = extract_matches('fuzzy_find', PATHS, limit=5, scoring='basename')
+    names = [path for path, _ in matches]
+    assert names.index('sparc_cli/tools/fuzzy_find.py') < names.index('docs/fuzzy_find/index.md')
+
+def test_backends_agree_on_scores():
+    """Test both backends score the same paths alike."""
+    if not has_fast_backend():
+        pytest.skip("rapidfuzz not installed")
+    fast = extract_matches('ripgrep', PATHS, limit=5)
+    with patch.object(fuzzy, 'process', None):
+        slow = extract_matches('ripgrep', PATHS, limit=5)
+    assert fast[0] == slow[0]
+
+def test_unknown_scoring_mode():
+    with pytest.raises(ValueError, match="Unknown scoring mode"):
+        extract_matches('x', PATHS, scoring='segments')
@@ -0,0 +1,47 @@
+from sparc_cli.text.processing import OutputTruncator, truncate_output
+
+def feed_chunks(truncator, data, size):
+    for i in range(0, len(data), size):
+        truncator.feed(data[i:i + size])
+    return truncator.getvalue()
+
+def test_truncator_keeps_head_and_tail_lines():
+    """Test the first and last lines are kept and the rest only counted."""
+    data = "".join(f"line {i}\n" for i in range(1000)).encode()
+    output = feed_chunks(OutputTruncator(head_lines=3, tail_lines=2, head_bytes=None, tail_bytes=None), data, 37)
+    assert output == b"line 0\nline 1\nline 2\n[995 lines of output truncated]\nline 998\nline 999\n"
+
+def test_truncator_result_does_not_depend_on_chunking():
+    """Test feeding output whole or in small chunks gives the same result."""
+    data = b"".join(b"x" * (i % 13) + b"\r\n"[i % 2:] for i in range(500)) + b"partial"
+    expected = feed_chunks(OutputTruncator(head_lines=5, tail_lines=7, head_bytes=40, tail_bytes=50), data, len(data))
+    for size in (1, 3, 64):
+        truncator = OutputTruncator(head_lines=5, tail_lines=7, head_bytes=40, tail_bytes=50)
+        assert feed_chunks(truncator, data, size) == expected
+    assert data.endswith(expected.split(b"truncated]\n")[1])
+
+def test_truncator_byte_limits():
+    """Test the byte limits bound the kept output, even for one long line."""
+    truncator = OutputTruncator(head_lines=None, tail_lines=None, head_bytes=4, tail_bytes=6)
+    truncator.feed(b"abcdefghij" * 1000)
+    assert truncator.getvalue() == b"abcd\n[9990 bytes of output truncated]\nefghij"
+    assert truncator.truncated
+
+    truncator = OutputTruncator(head_bytes=100, tail_bytes=100)
+    truncator.feed("short output\n")
+    assert truncator.text() == "short output\n"
+    assert not truncator.truncated
+
+def test_truncator_without_tail_bytes():
+    """Test a zero tail byte limit keeps no unfinished line and counts it as dropped."""
+    truncator = OutputTruncator(head_lines=None, tail_lines=None, head_bytes=4, tail_bytes=0)
+    truncator.feed(b"abcd")
+    truncator.feed(b"efgh\nij")
+    assert truncator.getvalue() == b"abcd\n[1 lines of output truncated]\n"
+    assert truncator.dropped_bytes == 7
+
+def test_truncate_output_keeps_most_recent_lines():
+    """Test truncate_output keeps the last max_lines lines."""
+    output = "".join(f"{i}\n" for i in range(10)) + "end"
+    assert truncate_output(output, max_lines=3) == "[8 lines of output truncated]\n8\n9\nend"
+    assert truncate_output(output, max_lines=11) == output
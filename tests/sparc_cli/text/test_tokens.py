@@ -0,0 +1,35 @@
+import pytest
+from sparc_cli.text.tokens import estimate_tokens, truncate_to_tokens, allocate_tokens
+
+def test_estimate_tokens():
+    """Test token estimates scale with text length."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a") == 1
+    assert estimate_tokens("x" * 350) == 100
+
+def test_truncate_to_tokens_fits():
+    """Test text within the budget is returned unchanged."""
+    text = "short prompt"
+    assert truncate_to_tokens(text, 100) == text
+
+def test_truncate_to_tokens_keeps_head_and_tail():
+    """Test truncation keeps both ends of the text."""
+    text = "TASK: do the thing\n" + "filler " * 2000 + "\nFINAL INSTRUCTIONS"
+    result = truncate_to_tokens(text, 200)
+
+    assert result.startswith("TASK:")
+    assert result.endswith("FINAL INSTRUCTIONS")
+    assert "tokens truncated" in result
+    assert estimate_tokens(result) <= 200
+
+def test_allocate_tokens_small_sections_get_all():
+    """Test small sections are allotted in full and the rest is shared."""
+    allocation = allocate_tokens({'small': 10, 'large': 500, 'larger': 1000}, 300)
+    assert allocation['small'] == 10
+    assert allocation['large'] == 145
+    assert allocation['larger'] == 145
+
+def test_allocate_tokens_within_budget():
+    """Test sections that fit get exactly what they need."""
+    assert allocate_tokens({'a': 10, 'b': 20}, 100) == {'a': 10, 'b': 20}
+    assert allocate_tokens({'a': 10}, -5) == {'a': 0}
@@ -0,0 +1,58 @@
+import pytest
+from unittest.mock import patch
+
+from sparc_cli.proc.jobs import JobManager
+from sparc_cli.tools.background import (
+    kill_background_job,
+    poll_background_job,
+    start_background_job,
+    tail_background_job
+)
+from sparc_cli.tools.memory import _global_memory
+
+@pytest.fixture(autouse=True)
+def job_manager():
+    """Run the tools against a private job manager in cowboy mode."""
+    manager = JobManager()
+    _global_memory['config'] = {'cowboy_mode': True}
+    with patch('sparc_cli.tools.background.get_job_manager', return_value=manager), \
+            patch('sparc_cli.tools.shell.console'), patch('sparc_cli.tools.background.console'):
+        yield manager
+    manager.shutdown()
+    _global_memory['config'] = {}
+
+def test_start_poll_tail_and_kill(job_manager):
+    """Test the job tools drive a background command."""
+    started = start_background_job.invoke({"command": "echo one; echo two; sleep 30"})
+    assert started["success"]
+    job_id = started["job_id"]
+
+    job = job_manager.get(job_id)
+    for _ in range(100):
+        if job.status()["output_lines"] == 2:
+            break
+        job.wait(0.05)
+
+    polled = poll_background_job.invoke({"job_id": job_id})
+    assert polled["status"] == "running"
+    assert polled["output"] == "one\ntwo"
+    assert tail_background_job.invoke({"job_id": job_id, "lines": 1})["output"] == "two"
+    assert [job["job_id"] for job in poll_background_job.invoke({})["jobs"]] == [job_id]
+
+    killed = kill_background_job.invoke({"job_id": job_id})
+    assert killed["status"] == "killed"
+
+def test_unknown_job(job_manager):
+    """Test an unknown job ID is reported, not raised."""
+    result = tail_background_job.invoke({"job_id": "job-42"})
+    assert not result["success"]
+    assert "job-42" in result["output"]
+
+def test_start_cancelled_by_user(job_manager):
+    """Test declining the approval prompt starts nothing."""
+    _global_memory['config'] = {'cowboy_mode': False}
+    with patch('sparc_cli.tools.shell.Prompt') as prompt:
+        prompt.ask.return_value = "n"
+        result = start_background_job.invoke({"command": "sleep 30"})
+    assert not result["success"]
+    assert job_manager.jobs() == []
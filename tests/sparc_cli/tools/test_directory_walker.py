@@ -0,0 +1,64 @@
+from rich.tree import Tree
+
+from sparc_cli.tools.list_directory import (
+    DirScanConfig,
+    ScanBudget,
+    build_tree,
+    list_directory_tree
+)
+
+def make_tree(root):
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "mod.py").write_text("x = 1\n")
+    (root / "src" / "main.py").write_text("print()\n")
+    (root / "build").mkdir()
+    (root / "build" / "out.bin").write_text("")
+    (root / "notes.txt").write_text("hello")
+    (root / "debug.log").write_text("")
+
+def test_lists_directories_first_and_skips_default_excludes(tmp_path):
+    """Test ordering and default exclude patterns."""
+    make_tree(tmp_path)
+    output = list_directory_tree.invoke({"path": str(tmp_path), "max_depth": 1})
+
+    assert output.index("build/") < output.index("src/") < output.index("notes.txt")
+    assert "debug.log" not in output
+    assert "main.py" not in output
+
+def test_gitignore_patterns_match_paths_from_root(tmp_path):
+    """Test anchored .gitignore and exclude patterns apply relative to the listed root."""
+    make_tree(tmp_path)
+    (tmp_path / ".gitignore").write_text("/build/\nsrc/pkg\n")
+    output = list_directory_tree.invoke({"path": str(tmp_path), "max_depth": 3, "exclude_patterns": ["main.py"]})
+
+    assert "build" not in output
+    assert "pkg" not in output
+    assert "main.py" not in output
+    assert "src/" in output
+
+def test_max_entries_bounds_the_listing(tmp_path):
+    """Test the entry budget stops the walk and notes what was left out."""
+    for i in range(20):
+        (tmp_path / f"file{i:02d}.txt").write_text("")
+        (tmp_path / f"file{i:02d}.log").write_text("")
+    output = list_directory_tree.invoke(
+        {"path": str(tmp_path), "max_entries": 5, "exclude_patterns": ["*.log"]}
+    )
+
+    assert "file04.txt" in output
+    assert "file05.txt" not in output
+    # Excluded entries are not counted as left out
+    assert "15 more entries not shown" in output
+
+def test_build_tree_uses_config_excludes_without_spec(tmp_path):
+    """Test file metadata and config exclude patterns when no matcher is given."""
+    make_tree(tmp_path)
+    config = DirScanConfig(max_depth=1, follow_links=False, show_size=True,
+                           show_modified=False, exclude_patterns=["*.log", "build"])
+    tree = Tree("root")
+    budget = ScanBudget(100)
+    build_tree(tmp_path, tree, config, budget=budget)
+
+    labels = [str(child.label) for child in tree.children]
+    assert labels == ["📁 src/", "notes.txt (5.0B)"]
+    assert budget.remaining == 98
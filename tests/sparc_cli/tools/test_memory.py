@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from datetime import datetime, timedelta
 from sparc_cli.tools.memory import (
     _global_memory,
@@ -20,9 +21,25 @@ from sparc_cli.tools.memory import (
     plan_implementation_completed,
     one_shot_completed,
     MemoryPriority,
-    MEMORY_LIMITS
+    MEMORY_LIMITS,
+    get_eviction_stats,
+    set_memory_limits,
+    attach_session_store,
+    detach_session_store,
+    MemorySession,
+    memory_session,
+    get_current_session,
+    log_work_event,
+    set_work_log_sink,
+    _close_work_log_sinks,
+    get_memory_value_within,
+    fork_memory_session,
+    merge_memory_session
 )
+import json
+from sparc_cli.session_store import SessionStore
 from pathlib import Path
+import threading
 
 def setup_function():
     """Reset global memory before each test."""
@@ -41,6 +58,7 @@ def setup_function():
         'key_snippet_id_counter': 1,
         'implementation_requested': False,
         'related_files': {},
+        'related_file_index': {},
         'related_file_id_counter': 1,
         'plan_completed': False,
         'agent_depth': 0,
@@ -107,6 +125,63 @@ def test_memory_limits_work_log():
     # Verify we kept the newest entries
     assert _global_memory['work_log'][-1]['event'] == f"Event {limit + 9}"
 
+def test_eviction_order_lowest_priority_oldest_first():
+    """Test eviction drops lowest priority items first, oldest first within a priority."""
+    set_memory_limits({'key_facts': 3})
+    emit_key_facts.invoke({"facts": ["high"], "priority": MemoryPriority.HIGH})
+    emit_key_facts.invoke({"facts": ["low 1", "low 2"], "priority": MemoryPriority.LOW})
+    emit_key_facts.invoke({"facts": ["medium"], "priority": MemoryPriority.MEDIUM})
+    emit_key_facts.invoke({"facts": ["low 3"], "priority": MemoryPriority.LOW})
+
+    contents = [f['content'] for f in _global_memory['key_facts'].values()]
+    assert contents == ["high", "medium", "low 3"]
+    assert get_eviction_stats()['key_facts'] == 2
+
+def test_eviction_skips_deleted_items():
+    """Test items deleted by ID are not counted as evictions."""
+    set_memory_limits({'key_facts': 2})
+    emit_key_facts.invoke({"facts": ["a", "b"], "priority": MemoryPriority.LOW})
+    delete_key_facts.invoke({"fact_ids": [1]})
+    emit_key_facts.invoke({"facts": ["c", "d"], "priority": MemoryPriority.LOW})
+
+    contents = [f['content'] for f in _global_memory['key_facts'].values()]
+    assert contents == ["c", "d"]
+    assert get_eviction_stats()['key_facts'] == 1
+
+def test_research_notes_eviction_keeps_insertion_order():
+    """Test research notes eviction keeps the remaining notes in insertion order."""
+    set_memory_limits({'research_notes': 2})
+    emit_research_notes.invoke({"notes": "first", "priority": MemoryPriority.HIGH})
+    emit_research_notes.invoke({"notes": "second", "priority": MemoryPriority.LOW})
+    emit_research_notes.invoke({"notes": "third", "priority": MemoryPriority.MEDIUM})
+
+    assert [n['content'] for n in _global_memory['research_notes']] == ["first", "third"]
+
+def test_research_notes_queued_by_sequence_number():
+    """Test notes get increasing sequence numbers, also after being replaced by unnumbered ones."""
+    emit_research_notes.invoke({"notes": "first"})
+    emit_research_notes.invoke({"notes": "second"})
+    assert [n['seq'] for n in _global_memory['research_notes']] == [1, 2]
+
+    # Notes stored without sequence numbers are numbered in list order
+    _global_memory['research_notes'] = [
+        {'content': 'old low', 'priority': MemoryPriority.LOW, 'timestamp': '2024-01-01T00:00:00'},
+        {'content': 'old high', 'priority': MemoryPriority.HIGH, 'timestamp': '2024-01-01T00:00:01'}
+    ]
+    set_memory_limits({'research_notes': 2})
+    emit_research_notes.invoke({"notes": "new", "priority": MemoryPriority.MEDIUM})
+
+    notes = _global_memory['research_notes']
+    assert [n['content'] for n in notes] == ["old high", "new"]
+    assert notes[0]['seq'] < notes[1]['seq']
+
+def test_set_memory_limits_invalid():
+    """Test unknown memory types and non-positive limits are rejected."""
+    with pytest.raises(ValueError):
+        set_memory_limits({'unknown': 1})
+    with pytest.raises(ValueError):
+        set_memory_limits({'key_facts': 0})
+
 def test_get_memory_value():
     """Test get_memory_value retrieves values with priority."""
     # Add facts with different priorities
@@ -123,6 +198,77 @@ def test_get_memory_value():
     assert "Low priority fact" in value
     assert "High priority fact" in value
 
+def test_get_memory_value_render_cache():
+    """Test rendered sections are cached and only changed entries are re-rendered."""
+    emit_key_facts.invoke({"facts": ["first", "second"]})
+    rendered = get_memory_value('key_facts')
+    assert get_memory_value('key_facts') == rendered
+
+    cache = _global_memory['render_cache']['key_facts']
+    first_fragment = cache.fragments[1][1]
+
+    emit_key_facts.invoke({"facts": ["third"]})
+    updated = get_memory_value('key_facts')
+    assert "third" in updated
+    assert updated.startswith(rendered)
+    # Unchanged entries reuse their rendered fragment
+    assert cache.fragments[1][1] is first_fragment
+
+    delete_key_facts.invoke({"fact_ids": [2]})
+    assert "second" not in get_memory_value('key_facts')
+
+def test_get_memory_value_render_cache_after_reset():
+    """Test the render cache is not reused when a section is replaced wholesale."""
+    emit_key_facts.invoke({"facts": ["old fact"]})
+    assert "old fact" in get_memory_value('key_facts')
+
+    _global_memory['key_facts'] = {1: {'content': 'new fact', 'priority': 1, 'timestamp': ''}}
+    value = get_memory_value('key_facts')
+    assert "new fact" in value
+    assert "old fact" not in value
+
+def test_get_memory_value_within_fits():
+    """Test a section within the budget is rendered in full."""
+    emit_key_facts.invoke({"facts": ["First fact", "Second fact"]})
+    assert get_memory_value_within('key_facts', 1000) == get_memory_value('key_facts')
+
+def test_get_memory_value_within_drops_lowest_priority():
+    """Test an oversized section drops low priority items first."""
+    emit_key_facts.invoke({"facts": ["critical " + "c" * 200], "priority": MemoryPriority.CRITICAL})
+    emit_key_facts.invoke({"facts": ["low " + "l" * 200], "priority": MemoryPriority.LOW})
+    emit_key_facts.invoke({"facts": ["high " + "h" * 200], "priority": MemoryPriority.HIGH})
+
+    result = get_memory_value_within('key_facts', 150)
+    assert "critical" in result
+    assert "high" in result
+    assert "low " not in result
+    assert "1 lower priority key facts omitted" in result
+    # Remaining items keep their display order
+    assert result.index("Key Fact #1") < result.index("Key Fact #3")
+
+def test_get_memory_value_within_reuses_render_cache():
+    """Test budgeting takes rendered entries from the section's render cache."""
+    emit_key_facts.invoke({"facts": ["long fact " + "x" * 400, "short fact"]})
+    get_memory_value('key_facts')
+    fragment = _global_memory['render_cache']['key_facts'].fragments[2][1]
+
+    with patch('sparc_cli.tools.memory._render_key_fact') as render:
+        assert "short fact" in get_memory_value_within('key_facts', 1000)
+        result = get_memory_value_within('key_facts', 60)
+    render.assert_not_called()
+    assert result.startswith(fragment)
+    assert "long fact" not in result
+
+def test_get_memory_value_within_research_notes():
+    """Test research notes render their content and respect the budget."""
+    emit_research_notes.invoke({"notes": "important note", "priority": MemoryPriority.HIGH})
+    emit_research_notes.invoke({"notes": "minor " + "m" * 400, "priority": MemoryPriority.LOW})
+
+    assert get_memory_value_within('research_notes', 1000).startswith("important note\n")
+    result = get_memory_value_within('research_notes', 30)
+    assert result.startswith("important note")
+    assert "minor" not in result
+
 def test_get_related_files():
     """Test get_related_files returns list of files."""
     emit_related_files(["file1.txt", "file2.txt"])
@@ -145,6 +291,53 @@ def test_work_log():
     reset_work_log()
     assert get_work_log() == "No work log entries"
 
+def test_work_log_ring_buffer():
+    """Test the work log keeps only the newest entries and counts evictions."""
+    set_memory_limits({'work_log': 3})
+    for i in range(5):
+        log_work_event(f"Event {i}")
+
+    log = _global_memory['work_log']
+    assert [entry['event'] for entry in log] == ["Event 2", "Event 3", "Event 4"]
+    assert log.maxlen == 3
+    assert get_eviction_stats()['work_log'] == 2
+
+def test_work_log_timestamps():
+    """Test work log entries store epoch seconds and render as ISO time."""
+    log_work_event("Timed event")
+    entry = _global_memory['work_log'][-1]
+    assert isinstance(entry['timestamp'], float)
+    expected = datetime.fromtimestamp(entry['timestamp']).isoformat(timespec='seconds')
+    assert f"## {expected}" in get_work_log()
+
+def test_work_log_sink(tmp_path):
+    """Test work log events are appended to the JSON Lines sink."""
+    sink = tmp_path / "logs" / "work.jsonl"
+    set_work_log_sink(str(sink))
+    try:
+        log_work_event("First")
+        log_work_event("Second")
+    finally:
+        set_work_log_sink(None)
+    log_work_event("Not written")
+
+    lines = [json.loads(line) for line in sink.read_text().splitlines()]
+    assert [line['event'] for line in lines] == ["First", "Second"]
+    assert all(isinstance(line['timestamp'], float) for line in lines)
+
+def test_work_log_sink_closed_when_replaced_and_at_exit(tmp_path):
+    """Test replaced sinks are closed, and open ones are closed at exit."""
+    set_work_log_sink(str(tmp_path / "first.jsonl"))
+    first = get_current_session().work_log_sink
+    set_work_log_sink(str(tmp_path / "second.jsonl"))
+    second = get_current_session().work_log_sink
+    assert first.closed
+    assert not second.closed
+
+    _close_work_log_sinks()
+    assert second.closed
+    get_current_session().work_log_sink = None
+
 def test_key_facts_priority():
     """Test key facts with different priorities."""
     # Add facts with different priorities
@@ -218,6 +411,162 @@ def test_related_files():
     deregister_related_files([1])
     assert len(_global_memory['related_files']) == 0
 
+def test_related_files_dedup_normalized_paths():
+    """Test related files are deduplicated on normalized paths."""
+    result = emit_related_files.invoke({"files": ["src/app.py", "./src/app.py", "src/../src/app.py"]})
+    assert result.count("File ID #1") == 3
+    assert len(_global_memory['related_files']) == 1
+
+    # Absolute and relative spellings share an ID
+    result = emit_related_files.invoke({"files": [str(Path("src/app.py").resolve())]})
+    assert "File ID #1" in result
+    assert len(_global_memory['related_files']) == 1
+
+def test_related_files_index_consistent_after_deregister():
+    """Test deregistering a file allows it to be registered again with a new ID."""
+    emit_related_files.invoke({"files": ["a.py", "b.py"]})
+    deregister_related_files.invoke({"file_ids": [1]})
+    assert len(_global_memory['related_file_index']) == 1
+
+    result = emit_related_files.invoke({"files": ["a.py", "b.py"]})
+    assert "File ID #3: a.py" in result
+    assert "File ID #2: b.py" in result
+
+def test_session_store_resume(tmp_path):
+    """Test memory mirrored to a session store can be restored after a reset."""
+    store = SessionStore(str(tmp_path / "session.db"))
+    try:
+        attach_session_store(store)
+        emit_key_facts.invoke({"facts": ["persisted fact"]})
+        emit_related_files.invoke({"files": ["a.py"]})
+        emit_task.invoke({"task": "persisted task"})
+
+        # Simulate a restart
+        setup_function()
+        assert attach_session_store(store, resume=True) is True
+
+        assert _global_memory['key_facts'][1]['content'] == "persisted fact"
+        assert _global_memory['tasks'] == {1: "persisted task"}
+        assert _global_memory['task_id_counter'] == 2
+        assert "persisted task" in get_work_log()
+        # Restored files keep their IDs and are deduplicated
+        assert "File ID #1:" in emit_related_files.invoke({"files": ["./a.py"]})
+        assert len(_global_memory['related_files']) == 1
+    finally:
+        detach_session_store()
+        store.close()
+
+def test_session_store_without_resume_starts_fresh(tmp_path):
+    """Test attaching without resume resets previously saved memory."""
+    store = SessionStore(str(tmp_path / "session.db"))
+    try:
+        attach_session_store(store)
+        emit_key_facts.invoke({"facts": ["old fact"]})
+
+        setup_function()
+        assert attach_session_store(store) is False
+        assert store.load()['key_facts'] == {}
+    finally:
+        detach_session_store()
+        store.close()
+
+def test_memory_session_isolation():
+    """Test that an active session does not see or change the default memory."""
+    emit_task.invoke({"task": "outer task"})
+
+    with memory_session() as session:
+        assert get_current_session() is session
+        assert len(_global_memory['tasks']) == 0
+        emit_task.invoke({"task": "inner task"})
+        assert session.memory['tasks'] == {1: "inner task"}
+
+    assert _global_memory['tasks'] == {1: "outer task"}
+
+def test_memory_sessions_across_threads():
+    """Test that concurrent sessions in separate threads do not share memory."""
+    sessions = [MemorySession() for _ in range(4)]
+    errors = []
+
+    def worker(session, index):
+        try:
+            with memory_session(session):
+                for n in range(25):
+                    emit_key_facts.invoke({"facts": [f"worker {index} fact {n}"]})
+        except Exception as e:  # pragma: no cover - surfaced via errors
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(s, i)) for i, s in enumerate(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    for index, session in enumerate(sessions):
+        facts = session.memory['key_facts']
+        assert len(facts) == 25
+        assert all(f["content"].startswith(f"worker {index} ") for f in facts.values())
+    assert len(_global_memory['key_facts']) == 0
+
+def test_concurrent_emits_share_session():
+    """Test that parallel tool calls in one session get unique IDs."""
+    def worker(index):
+        for n in range(50):
+            emit_task.invoke({"task": f"{index}-{n}"})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(_global_memory['tasks']) == 200
+    assert _global_memory['task_id_counter'] == 201
+
+def test_fork_and_merge_memory_session():
+    """Test changes made in a forked session are merged back."""
+    emit_key_facts.invoke({"facts": ["kept fact", "deleted fact"]})
+    emit_related_files.invoke({"files": ["a.py"]})
+    parent_fact_ids = set(_global_memory['key_facts'])
+
+    child = fork_memory_session()
+    with memory_session(child):
+        emit_key_facts.invoke({"facts": ["child fact"]})
+        delete_key_facts.invoke({"fact_ids": [2]})
+        emit_related_files.invoke({"files": ["b.py", "./a.py"]})
+        emit_research_notes.invoke({"notes": "child note"})
+
+    # The parent is unaffected until the merge
+    assert set(_global_memory['key_facts']) == parent_fact_ids
+    emit_key_facts.invoke({"facts": ["parent fact"]})
+
+    merge_memory_session(child)
+    contents = {fact['content'] for fact in _global_memory['key_facts'].values()}
+    assert contents == {"kept fact", "parent fact", "child fact"}
+    assert len(set(_global_memory['key_facts'])) == 3
+    assert sorted(_global_memory['related_files'].values()) == ["a.py", "b.py"]
+    assert [note['content'] for note in _global_memory['research_notes']] == ["child note"]
+    assert "Deleted facts [2]" in get_work_log()
+
+def test_merged_research_notes_get_new_sequence_numbers():
+    """Test notes added by a fork and its parent keep distinct, increasing sequence numbers."""
+    emit_research_notes.invoke({"notes": "before fork"})
+    child = fork_memory_session()
+    with memory_session(child):
+        emit_research_notes.invoke({"notes": "child note"})
+    emit_research_notes.invoke({"notes": "parent note"})
+
+    merge_memory_session(child)
+    notes = _global_memory['research_notes']
+    assert [note['content'] for note in notes] == ["before fork", "parent note", "child note"]
+    seqs = [note['seq'] for note in notes]
+    assert seqs == sorted(set(seqs))
+
+def test_merge_requires_forked_session():
+    """Test merging a session that was not forked is rejected."""
+    with pytest.raises(ValueError):
+        merge_memory_session(MemorySession())
+
 def test_tasks():
     """Test task operations."""
     # Add task
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from sparc_cli.tools.agent import request_parallel_task_implementation
+from sparc_cli.tools.memory import (
+    _global_memory,
+    new_memory,
+    emit_key_facts,
+    task_completed
+)
+
+@pytest.fixture(autouse=True)
+def setup_memory():
+    _global_memory.clear()
+    _global_memory.update(new_memory())
+    _global_memory['config'] = {'parallel_tasks': 2}
+    _global_memory['agent_depth'] = 1
+    _global_memory['tasks'] = {1: "task one", 2: "task two", 3: "task three"}
+    yield
+    _global_memory.clear()
+    _global_memory.update(new_memory())
+
+def test_parallel_tasks_run_concurrently_with_limit():
+    """Test tasks run concurrently in isolated memory, limited by parallel_tasks."""
+    running = 0
+    peak = 0
+
+    async def fake_agent(*, task, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Each task only sees its own facts while it runs
+        emit_key_facts.invoke({"facts": [f"fact from {task}"]})
+        assert len(_global_memory['key_facts']) == 1
+        await asyncio.sleep(0.05)
+        task_completed.invoke({"message": f"{task} done"})
+        running -= 1
+        return "Agent run completed successfully"
+
+    with patch('sparc_cli.tools.agent.initialize_llm'), \
+            patch('sparc_cli.agent_utils.run_task_implementation_agent_async', side_effect=fake_agent):
+        result = request_parallel_task_implementation.invoke({
+            "task_specs": ["task one", "task two", "task three"]
+        })
+
+    assert peak == 2
+    assert result["success"] is True
+    assert [r["completion_message"] for r in result["tasks"]] == [
+        "task one done", "task two done", "task three done"
+    ]
+    # Facts from all tasks are merged back, in task order
+    assert [f['content'] for _, f in sorted(_global_memory['key_facts'].items())] == [
+        "fact from task one", "fact from task two", "fact from task three"
+    ]
+    assert _global_memory['task_completed'] is False
+
+def test_parallel_task_failure_is_reported():
+    """Test a failing task is reported without losing the others' results."""
+    async def fake_agent(*, task, **kwargs):
+        if task == "task two":
+            raise RuntimeError("boom")
+        emit_key_facts.invoke({"facts": [f"fact from {task}"]})
+
+    with patch('sparc_cli.tools.agent.initialize_llm'), \
+            patch('sparc_cli.agent_utils.run_task_implementation_agent_async', side_effect=fake_agent):
+        result = request_parallel_task_implementation.invoke({
+            "task_specs": ["task one", "task two"]
+        })
+
+    assert result["success"] is False
+    assert result["tasks"][1]["reason"] == "error: boom"
+    assert len(_global_memory['key_facts']) == 1
+
+def test_parallel_tasks_do_not_inherit_completion_state():
+    """Test a task that does not complete itself does not report the parent's completion."""
+    _global_memory['completion_message'] = "parent done"
+    _global_memory['task_completed'] = True
+    seen = []
+
+    async def fake_agent(*, task, **kwargs):
+        seen.append(_global_memory['task_completed'])
+
+    with patch('sparc_cli.tools.agent.initialize_llm'), \
+            patch('sparc_cli.agent_utils.run_task_implementation_agent_async', side_effect=fake_agent):
+        result = request_parallel_task_implementation.invoke({"task_specs": ["task one"]})
+
+    assert seen == [False]
+    assert result["tasks"][0]["completion_message"] == "Task was completed successfully."
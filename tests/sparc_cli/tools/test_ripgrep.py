@@ -0,0 +1,192 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch, Mock
+
+from sparc_cli.search_cache import invalidate_search_cache
+from sparc_cli.tools import ripgrep
+from sparc_cli.tools.ripgrep import (
+    get_rg_command,
+    clear_rg_command_cache,
+    ripgrep_search,
+    parse_rg_json_line,
+    run_rg_json
+)
+
+@pytest.fixture(autouse=True)
+def fresh_rg_cache():
+    """Resolve the rg binary anew and search without cached results in every test."""
+    clear_rg_command_cache()
+    invalidate_search_cache()
+    yield
+    clear_rg_command_cache()
+
+@pytest.fixture
+def mock_console():
+    with patch('sparc_cli.tools.ripgrep.console') as mock:
+        yield mock
+
+def version_ok(cmd, **kwargs):
+    return subprocess.CompletedProcess(cmd, 0, stdout=b"ripgrep 14.1.0\n", stderr=b"")
+
+def test_rg_resolved_once():
+    """Test the binary is looked up and validated only on the first call."""
+    with patch('shutil.which', return_value='/usr/bin/rg') as mock_which, \
+            patch('subprocess.run', side_effect=version_ok) as mock_run:
+        assert get_rg_command() == '/usr/bin/rg'
+        assert get_rg_command() == '/usr/bin/rg'
+
+    mock_which.assert_called_once_with('rg')
+    mock_run.assert_called_once()
+
+def test_missing_rg_fails_fast_without_installing():
+    """Test a missing binary raises a clear error, caches it, and never installs implicitly."""
+    with patch('shutil.which', return_value=None) as mock_which, \
+            patch.object(ripgrep, '_bundled_rg', return_value=None), \
+            patch.object(ripgrep, 'install_ripgrep') as mock_install:
+        with pytest.raises(RuntimeError, match="--install-ripgrep"):
+            get_rg_command()
+        with pytest.raises(RuntimeError):
+            get_rg_command()
+
+    mock_install.assert_not_called()
+    assert mock_which.call_count == 1
+
+def test_install_is_opt_in():
+    """Test ripgrep is installed when asked to and then picked up."""
+    found = iter([None, '/usr/bin/rg'])
+    with patch('shutil.which', side_effect=lambda name: next(found)), \
+            patch.object(ripgrep, '_bundled_rg', return_value=None), \
+            patch('subprocess.run', side_effect=version_ok), \
+            patch.object(ripgrep, 'install_ripgrep', return_value=True) as mock_install:
+        assert get_rg_command(install=True) == '/usr/bin/rg'
+
+    mock_install.assert_called_once()
+
+def test_binary_that_is_not_ripgrep_rejected():
+    """Test a binary failing the version check is not used."""
+    not_rg = subprocess.CompletedProcess([], 0, stdout=b"something else", stderr=b"")
+    with patch('shutil.which', return_value='/usr/bin/rg'), \
+            patch.object(ripgrep, '_bundled_rg', return_value=None), \
+            patch('subprocess.run', return_value=not_rg):
+        with pytest.raises(RuntimeError):
+            get_rg_command()
+
+def test_search_without_rg_returns_error(mock_console):
+    """Test the search tool reports a missing binary instead of raising."""
+    with patch.object(ripgrep, 'get_rg_command', side_effect=RuntimeError(ripgrep.RG_NOT_FOUND_MESSAGE)), \
+            patch('sparc_cli.tools.ripgrep.run_rg_json') as mock_run:
+        result = ripgrep_search.invoke({"pattern": "foo"})
+
+    assert result["success"] is False
+    assert "ripgrep (rg) is not installed" in result["output"]
+    mock_run.assert_not_called()
+
+def rg_match(path, line_number, text, start=0):
+    return json.dumps({"type": "match", "data": {
+        "path": {"text": path},
+        "lines": {"text": text + "\n"},
+        "line_number": line_number,
+        "absolute_offset": 0,
+        "submatches": [{"match": {"text": text[start:]}, "start": start, "end": len(text)}]
+    }})
+
+@pytest.fixture
+def fake_rg(tmp_path):
+    """Write an executable that prints rg --json output for n matches and records its arguments."""
+    def make(count, line="x = 1", exit_code=0, stderr_bytes=0):
+        script = tmp_path / "rg"
+        args_file = tmp_path / "args.json"
+        lines = [json.dumps({"type": "begin", "data": {"path": {"text": "a.py"}}})]
+        lines += [rg_match(f"f{i % 3}.py", i + 1, line) for i in range(count)]
+        lines.append(json.dumps({"type": "summary", "data": {}}))
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import json, sys\n"
+            f"json.dump(sys.argv[1:], open({str(args_file)!r}, 'w'))\n"
+            f"sys.stderr.write('e' * {stderr_bytes})\n"
+            "sys.stderr.flush()\n"
+            f"for line in {lines!r}:\n"
+            "    print(line, flush=True)\n"
+            f"sys.exit({exit_code})\n"
+        )
+        os.chmod(script, 0o755)
+        return str(script), args_file
+    return make
+
+def test_parse_match_line():
+    """Test a match record is parsed into path, line, column and text."""
+    match = parse_rg_json_line(rg_match("src/app.py", 12, "def foo():", start=4).encode())
+
+    assert (match.path, match.line, match.column, match.text) == ("src/app.py", 12, 5, "def foo():")
+    assert str(match) == "src/app.py:12:5:def foo():"
+    assert parse_rg_json_line(b'{"type": "begin", "data": {}}') is None
+    assert parse_rg_json_line(b'not json') is None
+
+def test_parse_non_utf8_and_long_lines():
+    """Test base64 encoded paths are decoded and long lines cut."""
+    record = json.loads(rg_match("ignored", 1, "y" * 1000))
+    record["data"]["path"] = {"bytes": base64.b64encode(b"caf\xe9.txt").decode()}
+    match = parse_rg_json_line(json.dumps(record).encode())
+
+    assert match.path == "caf\ufffd.txt"
+    assert len(match.text) < 400
+
+def test_run_rg_json_stops_at_max_results(fake_rg):
+    """Test collection stops once the result limit is reached."""
+    rg, _ = fake_rg(50)
+    result = run_rg_json([rg], max_results=10)
+
+    assert len(result.matches) == 10
+    assert result.truncated
+    assert result.return_code == 0
+
+def test_run_rg_json_stops_at_max_bytes(fake_rg):
+    """Test collection stops once the byte limit is reached."""
+    rg, _ = fake_rg(50, line="z" * 100)
+    result = run_rg_json([rg], max_bytes=450)
+
+    assert len(result.matches) == 4
+    assert result.truncated
+
+def test_run_rg_json_no_matches(fake_rg):
+    """Test rg's exit code 1 means no matches, not an error."""
+    rg, _ = fake_rg(0, exit_code=1)
+    result = run_rg_json([rg])
+
+    assert result.matches == []
+    assert result.return_code == 1
+    assert result.error == ""
+
+def test_run_rg_json_reads_large_error_output(fake_rg):
+    """Test lots of error output neither blocks rg nor is kept in full."""
+    rg, _ = fake_rg(1, exit_code=2, stderr_bytes=200 * 1024)
+    result = run_rg_json([rg])
+
+    assert len(result.matches) == 1
+    assert result.return_code == 2
+    assert 0 < len(result.error) < 100 * 1024
+
+def test_search_returns_structured_matches(fake_rg, mock_console):
+    """Test the tool passes options to rg and returns structured matches."""
+    rg, args_file = fake_rg(3)
+    with patch.object(ripgrep, 'get_rg_command', return_value=rg):
+        result = ripgrep_search.invoke({"pattern": "-x", "max_count_per_file": 2, "case_sensitive": False})
+
+    args = json.loads(args_file.read_text())
+    assert args[:2] == ["--json", "--no-messages"]
+    assert ["--max-count", "2"] == args[args.index("--max-count"):args.index("--max-count") + 2]
+    assert "-i" in args
+    assert args[-2:] == ["-e", "-x"]
+
+    assert result["success"] is True
+    assert result["truncated"] is False
+    assert "matches" not in result
+    assert result["output"].splitlines()[1] == "f1.py:2:1:x = 1"
+
+    with patch.object(ripgrep, 'get_rg_command', return_value=rg):
+        result = ripgrep_search.invoke({"pattern": "-x", "include_matches": True})
+    assert result["matches"][0] == {"path": "f0.py", "line": 1, "column": 1, "text": "x = 1"}
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import patch, Mock
 from sparc_cli.tools.shell import run_shell_command
 from sparc_cli.tools.memory import _global_memory
+from sparc_cli.proc.shell_session import close_shell_sessions
 
 @pytest.fixture
 def mock_console():
@@ -62,3 +63,31 @@ def test_run_shell_command_error(mock_console, mock_run_interactive):
     assert result["success"] is False
     assert result["return_code"] == 1
     assert "error" in result["output"].lower()
+
+def test_run_shell_command_limits(mock_console, mock_run_interactive):
+    """Test the configured timeout applies unless the call passes its own."""
+    _global_memory['config'] = {'cowboy_mode': True, 'command_timeout': 30}
+
+    run_shell_command.invoke({"command": "make test"})
+    assert mock_run_interactive.call_args.kwargs["timeout"] == 30
+    assert mock_run_interactive.call_args.kwargs["max_lines"] > 0
+
+    run_shell_command.invoke({"command": "make test", "timeout": 1200})
+    assert mock_run_interactive.call_args.kwargs["timeout"] == 1200
+
+    _global_memory['config']['command_timeout'] = 0
+    run_shell_command.invoke({"command": "make test"})
+    assert mock_run_interactive.call_args.kwargs["timeout"] is None
+
+def test_run_shell_command_session_per_thread(mock_console):
+    """Test commands of one agent thread share a shell when sessions are enabled."""
+    _global_memory['config'] = {'cowboy_mode': True, 'shell_session': True}
+    first = {"configurable": {"thread_id": "thread-1"}}
+    second = {"configurable": {"thread_id": "thread-2"}}
+    try:
+        run_shell_command.invoke({"command": "export SPARC_TEST=kept"}, first)
+        assert run_shell_command.invoke({"command": "echo $SPARC_TEST"}, first)["output"] == "kept\n"
+        assert run_shell_command.invoke({"command": "echo ${SPARC_TEST:-none}"}, second)["output"] == "none\n"
+    finally:
+        close_shell_sessions()
+        _global_memory['config'] = {}